@@ -0,0 +1,40 @@
+"""notjira, programmer friendly task planning.
+
+Importing the package is cheap: the names below are only imported from
+their modules the first time they are used, so e.g. ``notjira.Task``
+loads the core model and nothing else, and renderers (see
+notjira.renderers) load only when drawing.
+"""
+
+_LAZY = {
+    'Task': 'notjira.task',
+    'Epic': 'notjira.task',
+    'TimeEstimate': 'notjira.time_estimate',
+    'Plan': 'notjira.context',
+    'PlanContext': 'notjira.context',
+    'WorkCalendar': 'notjira.work_calendar',
+    'CycleError': 'notjira.toposort',
+    'dependency_list': 'notjira.utils',
+    'schedule': 'notjira.utils',
+    'gantt_ascii': 'notjira.utils',
+    'gantt_matplotlib': 'notjira.chart',
+    'gantt_html': 'notjira.html_gantt',
+    'render': 'notjira.renderers',
+    'level': 'notjira.leveling',
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'notjira' has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -1,6 +1,9 @@
+from notjira import instrument
 from notjira.time_estimate import TimeEstimate
 from notjira.context import PlanContext
-from datetime import date, timedelta
+from notjira.work_calendar import DEFAULT_CALENDAR
+from contextlib import nullcontext
+from datetime import date
 
 from enum import Enum
 
@@ -11,6 +14,12 @@ class BaseStatus(Enum):
    CLOSED="closed"
 
 
+# Shared by every item without dependencies until its first add_dependency.
+NO_DEPENDS = frozenset()
+# Stands in for the plan lock of items that belong to no plan.
+_NO_LOCK = nullcontext()
+
+
 def depends_auto(items):
   if items is None:
     return set()
@@ -20,13 +29,49 @@ def depends_auto(items):
 
 
 
+def extra_working_days(hours):
+    """Working days an item of ``hours`` work takes after its start day.
+
+    Work is counted in 8h days rounded up and the end date is inclusive,
+    so up to 8h end on the start day, up to 16h the next working day, and
+    so on. Every scheduling engine goes through this rule.
+
+    ``hours`` is a number, or a float NumPy array that is converted in
+    place and returned (NaN must be replaced first).
+    """
+    if isinstance(hours, (int, float)):
+        return max(int((hours + 7) // 8) - 1, 0)
+    import numpy as np  # only arrays get here, so numpy is installed
+
+    # floor((h + 7) / 8) - 1 == floor((h - 1) / 8), and scaling by 1/8 is
+    # exact in binary floating point, so this matches the integer formula
+    hours -= 1
+    hours *= 0.125
+    np.floor(hours, out=hours)
+    np.maximum(hours, 0, out=hours)
+    return hours
+
+
+def working_end_date(start, estimate, calendar=DEFAULT_CALENDAR):
+    """Inclusive end date of ``estimate`` worth of work starting on ``start``."""
+    # Assume 1 day if estimate missing
+    if estimate is None:
+        return start
+    return calendar.add_working_days(start, extra_working_days(estimate.hours))
+
+
 class Base:
-    def __init__(self, name=None, depends=None, estimate=None, due_date=None, start_date=None, **kw):
+    __slots__ = ('_name', '_depends', '_estimate', '_due_date', '_id', '_plan',
+                 '_status', '_start_date', '_end_date')
+
+    def __init__(self, name=None, depends=None, estimate=None, due_date=None, start_date=None,
+                 plan=None, **kw):
         self._name = name
         self._depends = depends_auto(depends)
         self._estimate = TimeEstimate.auto(estimate)
         self._due_date = due_date
         self._id = None
+        self._plan = None
         self._status = BaseStatus.OPEN
         # scheduling attributes (optional)
         self._start_date = start_date
@@ -42,7 +87,30 @@ class Base:
                 self._depends = depends_auto(value)
             elif key == 'sd' and start_date is None:
                 self._start_date = value
-        PlanContext().default_plan.register_item(self)
+        if not self._depends:
+            self._depends = NO_DEPENDS
+        if plan is None:
+            plan = PlanContext().default_plan
+        plan.register_item(self)
+
+    @classmethod
+    def restore(cls, name=None, depends=NO_DEPENDS, estimate=None, due_date=None,
+                status=BaseStatus.OPEN, start_date=None, end_date=None):
+        """Rebuild a stored item without parsing, registering or checks.
+
+        The caller registers it (Plan.register_item with its stored id).
+        """
+        item = cls.__new__(cls)
+        item._name = name
+        item._depends = depends if depends else NO_DEPENDS
+        item._estimate = estimate
+        item._due_date = due_date
+        item._id = None
+        item._plan = None
+        item._status = status
+        item._start_date = start_date
+        item._end_date = end_date
+        return item
 
     @property
     def id(self):
@@ -52,45 +120,76 @@ class Base:
     def status(self):
         return self._status
 
+    @status.setter
+    def status(self, new_status):
+        new_status = BaseStatus(new_status)
+        with self._plan_lock():
+            old = self._status
+            self._status = new_status
+            if self._plan is not None and old is not new_status:
+                self._plan.item_changed(self._id, 'status', old, new_status)
+
     
     def set_id(self, new_id):
         self._id = new_id
+
+    def set_depends(self, depends):
+        self._depends = depends
+
+    def set_plan(self, plan):
+        self._plan = plan
+
+    @property
+    def plan(self):
+        return self._plan
+
+    def _plan_lock(self):
+        """The plan's lock, held while a setter changes the item and tells
+        the plan, so concurrent edits never work from a stale old value."""
+        plan = self._plan
+        if plan is None:
+            return _NO_LOCK
+        if plan._forks:
+            # forks still sharing this item keep a copy of it as it is
+            return plan._writing(self)
+        return plan.lock
         
     @property
     def name(self):
         return self._name
+
+    @name.setter
+    def name(self, new_name):
+        with self._plan_lock():
+            old = self._name
+            self._name = new_name
+            if self._plan is not None:
+                self._plan.item_changed(self._id, 'name', old, new_name)
         
     @property
     def depends(self):
         return self._depends
 
     def add_dependency(self, item):
+        if instrument.active:
+            instrument.count('add_dependency')
         new_deps = depends_auto([item])
-        # Lazy import to avoid circular dependency
-        try:
-            from notjira.utils import dependency_list
-        except Exception:
-            dependency_list = None
         for dep_id in new_deps:
             # Skip if already present
             if dep_id in self._depends:
                 continue
-            # Only check cycles if we can access dependency_list and we already have an id
-            if dependency_list is not None and self._id is not None:
-                try:
-                    # If adding dep_id would make a cycle, then self is reachable from dep_id
-                    if self._id == dep_id:
-                        raise ValueError("Cannot depend on itself")
-                    if self._id in dependency_list(dep_id):
-                        raise ValueError(f"Adding dependency creates cycle: {self._id} <- ... <- {dep_id}")
-                except KeyError:
-                    # If dep item not yet registered, ignore cycle check
-                    pass
-            self._depends.add(dep_id)
+            if self._plan is None:
+                self._depends = self._depends | {dep_id}
+            else:
+                # The plan index owns the edge and rejects cycles
+                self._plan.add_dependency(self._id, dep_id)
 
     def remove_dependency(self, other):
         if other.id in self._depends:
-            self._depends.remove(other.id)
+            if self._plan is None:
+                self._depends = self._depends - {other.id}
+            else:
+                self._plan.remove_dependency(self._id, other.id)
             return
         else:
             print(f'Warning: no such dependency {other}')
@@ -99,39 +198,68 @@ class Base:
     def estimate(self):
         return self._estimate
 
+    @estimate.setter
+    def estimate(self, new_estimate):
+        self.set_estimate(new_estimate)
+
+    def set_estimate(self, new_estimate, rollup=False):
+        """Set the estimate; ``rollup`` marks a change rolled up from a member."""
+        new_estimate = TimeEstimate.auto(new_estimate)
+        with self._plan_lock():
+            old = self._estimate
+            self._estimate = new_estimate
+            self._end_date = None  # invalidate
+            if self._plan is not None:
+                self._plan.estimate_changed(self._id, old, new_estimate, rollup)
+
+    @property
+    def due_date(self):
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, new_due):
+        with self._plan_lock():
+            old = self._due_date
+            self._due_date = new_due
+            if self._plan is not None:
+                self._plan.item_changed(self._id, 'due_date', old, new_due)
+
     @property
     def start_date(self):
         return self._start_date
 
     @start_date.setter
     def start_date(self, new_start):
-        self._start_date = new_start
-        self._end_date = None  # invalidate
+        with self._plan_lock():
+            old = self._start_date
+            self._start_date = new_start
+            self._end_date = None  # invalidate
+            if self._plan is not None:
+                self._plan.item_changed(self._id, 'start_date', old, new_start)
 
     @property
     def end_date(self):
         return self._end_date
 
+    def set_dates(self, start, end):
+        """Store scheduled dates computed elsewhere (e.g. by a bulk engine)."""
+        self._start_date = start
+        self._end_date = end
+
     def compute_end_date(self):
         if self._start_date is None:
             return None
-        # Assume 1 day if estimate missing
-        if self._estimate is None:
-            self._end_date = self._start_date
-            return self._end_date
-        # number of work days (ceil) based on 8h days
-        hours = self._estimate.hours
-        if hours == 0:
-            self._end_date = self._start_date
-            return self._end_date
-        work_days = int((hours + 7) // 8)  # ceil
-        current = self._start_date
-        days_added = 0
-        while days_added < work_days - 1:  # end date inclusive; 1 day task ends same day
-            current += timedelta(days=1)
-            if current.weekday() < 5:
-                days_added += 1
-        self._end_date = current
+        calendar = self._plan.calendar if self._plan is not None else DEFAULT_CALENDAR
+        self._end_date = working_end_date(self._start_date, self._estimate, calendar)
         return self._end_date
 
-        
+    def clone(self):
+        """Return an unregistered copy that shares no mutable state with this item."""
+        item = self.__class__.__new__(self.__class__)
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(self, slot):
+                    setattr(item, slot, getattr(self, slot))
+        item._depends = set(self._depends) if self._depends else NO_DEPENDS
+        item._plan = None
+        return item
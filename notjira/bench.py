@@ -0,0 +1,404 @@
+"""Benchmarks for notjira.
+
+Synthetic plans come from generate(), seeded so every run builds the same
+plan. run_benchmarks() times each hot path (best of ``repeat`` runs) and
+optionally records its peak traced memory; import_benchmark() times cold
+imports in fresh interpreters. compare() checks the results against a
+baseline saved from an earlier run.
+
+Run ``python -m notjira.bench --help`` (or ``notjira-bench``) for the
+command line; results are printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+from notjira.columnar import ColumnarPlan
+from notjira.context import Plan
+from notjira.task import Epic, Task
+from notjira.time_estimate import TimeEstimate
+from notjira.utils import _topological_sort, dependency_list, gc_paused, iter_gantt_ascii
+
+START = date(2024, 1, 1)
+_ESTIMATES = [TimeEstimate.from_string(x) for x in ('1h', '4h', '1d', '2d', '3d', '1w')]
+
+
+def _traced_peak(build):
+    tracemalloc.start()
+    try:
+        keep = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del keep
+    return peak
+
+
+# -- synthetic plans ------------------------------------------------------
+
+def _chain(n, rng):
+    # one long dependency chain
+    for i in range(n):
+        yield (i - 1,) if i else ()
+
+
+def _fanout(n, rng):
+    # wide and shallow: a few roots, every other item hangs off one of them
+    roots = max(1, n // 1000)
+    for i in range(n):
+        yield () if i < roots else (rng.randrange(roots),)
+
+
+def _dag(n, rng):
+    # deep random DAG: 1-3 dependencies among the previous 100 items
+    for i in range(n):
+        if not i:
+            yield ()
+        else:
+            window = range(max(0, i - 100), i)
+            yield tuple(rng.sample(window, min(len(window), rng.randint(1, 3))))
+
+
+def _epics(n, rng):
+    # epics of 20 chained tasks; most epics start after the last task of
+    # one of the five epics before them
+    for i in range(n):
+        position = i % 21
+        if position == 0:
+            yield 'epic'
+        elif position == 1:
+            yield (i - 2 - 21 * rng.randrange(5),) if i > 110 and rng.random() < 0.8 else ()
+        else:
+            yield (i - 1,)
+
+
+SHAPES = {
+    'chain': _chain,
+    'fanout': _fanout,
+    'dag': _dag,
+    'epics': _epics,
+}
+
+
+def generate(shape='dag', n=1000, seed=0, make_default=False):
+    """Build a synthetic Plan of ``n`` items with the given dependency shape.
+
+    Shapes: 'chain', 'fanout' (wide, two levels), 'dag' (deep, random
+    edges to recent items) and 'epics' (epics of 20 chained tasks). The
+    same shape, size and seed always give the same plan. Items are built
+    like importer.bulk_import does, so a million items take seconds.
+    """
+    rng = random.Random(seed)
+    plan = Plan(make_default=make_default)
+    with gc_paused():
+        members = []
+        epic = None
+        for i, spec in enumerate(SHAPES[shape](n, rng)):
+            if spec == 'epic':
+                if epic is not None:
+                    epic.tasks = members
+                    epic.recalculate_estimate()
+                epic, members = Epic.restore(name=f'epic {i}'), []
+                plan.register_item(epic)
+                continue
+            task = Task.restore(name=f'task {i}', depends=set(spec), estimate=rng.choice(_ESTIMATES))
+            plan.register_item(task)
+            if epic is not None:
+                members.append(task)
+        if epic is not None:
+            epic.tasks = members
+            epic.recalculate_estimate()
+    return plan
+
+
+# -- hot paths --------------------------------------------------------------
+# Each takes a plan and returns (prepare, run): ``prepare`` (or None) runs
+# untimed before every repetition of ``run``.
+
+def _schedule(plan):
+    scheduler = plan.scheduler()
+    return scheduler.invalidate, lambda: scheduler.run(START)
+
+
+def _reschedule(plan):
+    scheduler = plan.scheduler()
+    scheduler.run(START)
+    items = plan.items()
+    item = items[len(items) // 2]
+    estimates = iter(_ESTIMATES * 1000)
+
+    def run():
+        item.estimate = next(estimates)
+        scheduler.run(START)
+    return None, run
+
+
+def _toposort(plan):
+    return None, lambda: _topological_sort(plan.items())
+
+
+def _dependency_list(plan):
+    ids = [x.id for x in plan.items()[-10:]]
+
+    def run():
+        for item_id in ids:
+            dependency_list(item_id, plan)
+    # closures are memoised, so start every repetition cold
+    return plan._invalidate_closures, run
+
+
+def _add_dependency(plan):
+    edges = [(x, plan.get_item(d)) for x in plan.items() for d in sorted(x.depends)]
+
+    def prepare():
+        for item, dep in edges:
+            plan.remove_dependency(item.id, dep.id)
+
+    def run():
+        for item, dep in edges:
+            item.add_dependency(dep)
+    return prepare, run
+
+
+def _gantt_ascii(plan):
+    plan.scheduler().run(START)
+
+    def run():
+        for _ in iter_gantt_ascii(plan, START, granularity='auto', width=160):
+            pass
+    return None, run
+
+
+def _gantt_matplotlib(plan):
+    try:
+        import matplotlib
+    except ImportError:
+        return None
+    matplotlib.use('Agg')
+    from notjira.chart import gantt_matplotlib
+    plan.scheduler().run(START)
+    path = os.path.join(tempfile.mkdtemp(), 'bench.png')
+    return None, lambda: gantt_matplotlib(plan, START, filename=path)
+
+
+BENCHMARKS = {
+    'schedule': _schedule,
+    'reschedule': _reschedule,
+    'topological_sort': _toposort,
+    'dependency_list': _dependency_list,
+    'add_dependency': _add_dependency,
+    'gantt_ascii': _gantt_ascii,
+    'gantt_matplotlib': _gantt_matplotlib,
+}
+
+
+def _spread(timings):
+    """Standard deviation of repeated timings, 0 for a single run."""
+    return statistics.stdev(timings) if len(timings) > 1 else 0.0
+
+
+def _measure(prepare, run, repeat, memory):
+    timings = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    peak = None
+    if memory:
+        if prepare is not None:
+            prepare()
+        peak = _traced_peak(run)
+    return min(timings), _spread(timings), peak
+
+
+def run_benchmarks(shapes=None, sizes=(1000, 10000), benchmarks=None, repeat=3, memory=False,
+                   seed=0, progress=None):
+    """Run every benchmark on every shape and size; return a list of result dicts.
+
+    Each result has 'benchmark', 'shape', 'items', 'seconds' (best of
+    ``repeat``), 'stdev' (of the ``repeat`` timings) and 'peak_bytes'
+    (None unless ``memory``). 'build' times generate() itself, once.
+    Benchmarks that cannot run here (e.g. matplotlib missing) are left out.
+    """
+    results = []
+    for shape in shapes or SHAPES:
+        for n in sizes:
+            started = time.perf_counter()
+            plan = generate(shape, n, seed)
+            build = time.perf_counter() - started
+            peak = _traced_peak(lambda: generate(shape, n, seed)) if memory else None
+            results.append({'benchmark': 'build', 'shape': shape, 'items': n,
+                            'seconds': build, 'stdev': 0.0, 'peak_bytes': peak})
+            for name in benchmarks or BENCHMARKS:
+                setup = BENCHMARKS[name](plan)
+                if setup is None:
+                    continue
+                seconds, stdev, peak = _measure(*setup, repeat=repeat, memory=memory)
+                results.append({'benchmark': name, 'shape': shape, 'items': n,
+                                'seconds': seconds, 'stdev': stdev, 'peak_bytes': peak})
+                if progress is not None:
+                    progress(results[-1])
+    return results
+
+
+IMPORT_MODULES = ('notjira', 'notjira.task', 'notjira.utils', 'notjira.chart')
+# optional dependencies a plain import must not pull in
+HEAVY_MODULES = ('matplotlib', 'numpy')
+
+_IMPORT_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed, *[m for m in {heavy!r} if m in sys.modules])
+"""
+
+
+def import_benchmark(modules=IMPORT_MODULES, repeat=5):
+    """Time a cold import of each module in a fresh interpreter (best of ``repeat``).
+
+    Results have the same keys as run_benchmarks() ones, with 'benchmark'
+    'import', the module as 'shape' and 0 'items', so compare() guards
+    startup time too. 'heavy' lists the HEAVY_MODULES the import loaded.
+    """
+    results = []
+    for module in modules:
+        script = _IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+        timings, heavy = [], []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', script], check=True,
+                                 capture_output=True, text=True).stdout.split()
+            timings.append(float(out[0]))
+            heavy = out[1:]
+        results.append({'benchmark': 'import', 'shape': module, 'items': 0,
+                        'seconds': min(timings), 'stdev': _spread(timings), 'peak_bytes': None,
+                        'heavy': heavy})
+    return results
+
+
+def compare(results, baseline, tolerance=0.2, min_delta=0.005, noise=3.0):
+    """Compare results with a baseline list of results.
+
+    Returns one dict per result also found in the baseline, with the
+    'ratio' of current to baseline seconds and 'regression' set when the
+    ratio exceeds 1 + ``tolerance`` and the run got slower by more than its
+    noise floor: ``min_delta`` seconds, or ``noise`` times the larger
+    'stdev' of the two runs if that is more. Timings of a few
+    milliseconds vary by more than 20% between runs on a busy machine.
+    """
+    previous = {(r['benchmark'], r['shape'], r['items']): r for r in baseline}
+    report = []
+    for r in results:
+        old = previous.get((r['benchmark'], r['shape'], r['items']))
+        if old is None or not old['seconds']:
+            continue
+        ratio = r['seconds'] / old['seconds']
+        # baselines saved before 'stdev' was recorded count as noiseless
+        floor = max(min_delta, noise * max(r.get('stdev') or 0, old.get('stdev') or 0))
+        report.append({'benchmark': r['benchmark'], 'shape': r['shape'], 'items': r['items'],
+                       'baseline_seconds': old['seconds'], 'seconds': r['seconds'],
+                       'ratio': ratio,
+                       'regression': ratio > 1 + tolerance and r['seconds'] - old['seconds'] > floor})
+    return report
+
+
+def memory_benchmark(n=100000):
+    """Peak traced memory of a chain of ``n`` tasks, object Plan vs ColumnarPlan."""
+    estimates = ['1h', '4h', '1d', '2d', '1w']
+
+    def build_plan():
+        plan = Plan(make_default=False)
+        prev = None
+        for i in range(n):
+            prev = Task(f'task {i}', e=estimates[i % len(estimates)], d=prev, plan=plan)
+        return plan
+
+    def build_columnar():
+        store = ColumnarPlan()
+        for i in range(n):
+            store.add(f'task {i}', estimates[i % len(estimates)], (i - 1,) if i else ())
+        return store
+
+    plan_bytes = _traced_peak(build_plan)
+    columnar_bytes = _traced_peak(build_columnar)
+    return {
+        'items': n,
+        'plan_bytes': plan_bytes,
+        'columnar_bytes': columnar_bytes,
+        'plan_bytes_per_item': plan_bytes / n,
+        'columnar_bytes_per_item': columnar_bytes / n,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='notjira-bench', description=__doc__.splitlines()[0])
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), help="plan shapes (default: all)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000], help="plan sizes")
+    parser.add_argument('--benchmarks', nargs='+', choices=sorted(BENCHMARKS), help="hot paths (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark, best is kept")
+    parser.add_argument('--memory', action='store_true', help="also record peak traced memory")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the JSON results to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="baseline JSON from an earlier --output")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument('--noise', type=float, default=3.0,
+                        help="ignore slowdowns within this many standard deviations of the repeats")
+    parser.add_argument('--columnar-memory', type=int, metavar='N',
+                        help="only compare Plan and ColumnarPlan memory for N items")
+    parser.add_argument('--imports', action='store_true',
+                        help="also time cold imports; fails if they load matplotlib or numpy")
+    args = parser.parse_args(argv)
+
+    if args.columnar_memory:
+        print(json.dumps({'memory': memory_benchmark(args.columnar_memory)}, indent=2))
+        return 0
+    results = []
+    status = 0
+    if args.imports:
+        results.extend(import_benchmark())
+        for r in results:
+            print(f"{'import':>16} {r['shape']} {r['seconds']:.4f}s", file=sys.stderr)
+            if r['heavy']:
+                print(f"{r['shape']} imports {', '.join(r['heavy'])}", file=sys.stderr)
+                status = 1
+    results += run_benchmarks(args.shapes, args.sizes, args.benchmarks, args.repeat, args.memory,
+                              args.seed, progress=lambda r: print(
+                                  f"{r['benchmark']:>16} {r['shape']:>6} {r['items']:>8} "
+                                  f"{r['seconds']:.4f}s", file=sys.stderr))
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        output['comparison'] = compare(results, baseline['results'], args.tolerance, args.min_delta,
+                                       args.noise)
+        if any(r['regression'] for r in output['comparison']):
+            status = 1
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+    print(json.dumps(output, indent=2))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
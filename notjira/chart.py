@@ -3,10 +3,11 @@
 Provides matplotlib based Gantt chart rendering.
 """
 
+from collections import namedtuple
 from datetime import date
-from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Callable, Optional, List, Tuple
 
+from . import instrument
 from .utils import schedule
 from .task import Epic, Task
 from .context import PlanContext
@@ -16,71 +17,109 @@ from .context import PlanContext
 # ---------------------------------------------------------------------------
 
 ScheduleEntry = Tuple[Task, date, date]
+# stands in for a Task when drawing rows prepared elsewhere, see render_rows
+_Label = namedtuple('_Label', 'name estimate')
 
 
-def _aggregate_epics(sched: List[ScheduleEntry], plan) -> List[ScheduleEntry]:
-    """Aggregate task schedule into epic windows."""
-    items = plan.items()
-    epics = [x for x in items if isinstance(x, Epic)]
-    task_to_epic = {t.id: epic for epic in epics for t in epic.tasks}
-    epic_windows = {}
-    for task, s, e in sched:
-        parent = task_to_epic.get(task.id)
-        if parent is None:
-            continue
-        win = epic_windows.get(parent.id)
-        if win is None:
-            epic_windows[parent.id] = [parent, s, e]
-        else:
-            win[1] = min(win[1], s)
-            win[2] = max(win[2], e)
-    return [tuple(v) for v in epic_windows.values()]
+def _aggregate_epics(plan) -> List[ScheduleEntry]:
+    """Epic windows of the last schedule run, from the plan's epic index."""
+    with instrument.phase('chart.aggregate_epics') as span:
+        get_item = plan.get_item
+        epics = [(get_item(i), s, e) for i, (s, e) in plan.epic_windows().items()]
+        span.set(items=len(epics))
+    return epics
 
 
-def _prepare_schedule(plan, start_date, epic_only: bool) -> List[ScheduleEntry]:
+def _prepare_schedule(plan, start_date, epic_only: bool, window=None, rows=None,
+                      page: Optional[int] = None, page_size: Optional[int] = None) -> List[ScheduleEntry]:
     if plan is None:
         plan = PlanContext().default_plan
+    with instrument.phase('chart.prepare') as span:
+        sched = _select_rows(plan, start_date, epic_only, window, rows, page, page_size)
+        span.set(items=len(sched))
+    return sched
+
+
+def _select_rows(plan, start_date, epic_only, window, rows, page, page_size):
     sched = schedule(plan, start_date)
     if not sched:
         raise ValueError("Plan is empty; nothing to plot.")
     if epic_only:
-        sched = _aggregate_epics(sched, plan)
+        sched = _aggregate_epics(plan)
         if not sched:
             raise ValueError("No epic data to plot.")
+    # cull before sorting so the remaining work scales with visible rows
+    if window is not None:
+        w_start, w_end = window
+        sched = [x for x in sched if x[1] <= w_end and x[2] >= w_start]
+    if rows is not None:
+        sched = [x for x in sched if rows(x[0])]
     sched.sort(key=lambda x: (x[1], x[0].name))
+    if page_size is not None:
+        first = (page or 0) * page_size
+        sched = sched[first:first + page_size]
+    if not sched:
+        raise ValueError("No rows to plot in the selected window/page.")
     return sched
 
 
-def _plot_schedule(sched: List[ScheduleEntry], figsize, title: str):
+def _plot_schedule(sched: List[ScheduleEntry], figsize, title: str, window=None,
+                   max_height: float = 40.0, min_label_px: float = 8.0):
+    """Draw the schedule; all bars go into a single PolyCollection.
+
+    The figure is at most ``max_height`` inches tall; row labels and
+    estimate texts are skipped once a row gets thinner than
+    ``min_label_px`` pixels.
+    """
     try:
         import matplotlib.pyplot as plt
         import matplotlib.dates as mdates
+        from matplotlib.collections import PolyCollection
     except ImportError as e:
-        raise ImportError("matplotlib is required for plotting. Install with 'pip install matplotlib'.") from e
-    min_start = min(s for _, s, _ in sched)
-    max_end = max(e for _, _, e in sched)
-    task_count = len(sched)
-    height = max(2, task_count * 0.4)
-    fig, ax = plt.subplots(figsize=(figsize[0], height))
-    for idx, (task, s, e) in enumerate(sched):
-        start_num = mdates.date2num(s)
-        end_num = mdates.date2num(e) + 1
-        ax.barh(idx, end_num - start_num, left=start_num, height=0.3, align='center')
-        ax.text(start_num, idx, f" {task.estimate}", va='center', ha='left', fontsize=8)
-    ax.set_yticks(range(task_count))
-    ax.set_yticklabels([t.name for t, _, _ in sched])
-    ax.invert_yaxis()
-    ax.xaxis_date()
-    import matplotlib.dates as mdates  # reuse
-    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    fig.autofmt_xdate(rotation=30, ha='right')
-    ax.set_xlabel('Date')
-    ax.set_title(title)
-    today = date.today()
-    if min_start <= today <= max_end:
-        ax.axvline(mdates.date2num(today), color='red', linestyle='--', linewidth=1)
-    fig.tight_layout()
+        raise ImportError("matplotlib is required for plotting. Install with 'pip install notjira[matplotlib]'.") from e
+    with instrument.phase('chart.plot', items=len(sched)):
+        if window is None:
+            min_start = min(s for _, s, _ in sched)
+            max_end = max(e for _, _, e in sched)
+        else:
+            min_start, max_end = window
+        task_count = len(sched)
+        height = min(max(2, task_count * 0.4), max_height)
+        fig, ax = plt.subplots(figsize=(figsize[0], height))
+        colors = plt.rcParams['axes.prop_cycle'].by_key().get('color', ['C0'])
+        verts = []
+        facecolors = []
+        for idx, (task, s, e) in enumerate(sched):
+            start_num = mdates.date2num(s)
+            end_num = mdates.date2num(e) + 1
+            verts.append(((start_num, idx - 0.15), (start_num, idx + 0.15),
+                          (end_num, idx + 0.15), (end_num, idx - 0.15)))
+            facecolors.append(colors[idx % len(colors)])
+        ax.add_collection(PolyCollection(verts, facecolors=facecolors, linewidths=0))
+        ax.set_xlim(mdates.date2num(min_start), mdates.date2num(max_end) + 1)
+        ax.set_ylim(task_count - 0.5, -0.5)
+        # rough share of the figure height used by the axes
+        row_px = height * fig.dpi * 0.75 / task_count
+        if row_px >= min_label_px:
+            x_min = mdates.date2num(min_start)
+            for idx, (task, s, e) in enumerate(sched):
+                ax.text(max(mdates.date2num(s), x_min), idx, f" {task.estimate}", va='center', ha='left',
+                        fontsize=8, clip_on=True)
+            ax.set_yticks(range(task_count))
+            ax.set_yticklabels([t.name for t, _, _ in sched])
+        else:
+            ax.set_yticks([])
+            ax.set_ylabel(f'{task_count} rows')
+        ax.xaxis_date()
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        fig.autofmt_xdate(rotation=30, ha='right')
+        ax.set_xlabel('Date')
+        ax.set_title(title)
+        today = date.today()
+        if min_start <= today <= max_end:
+            ax.axvline(mdates.date2num(today), color='red', linestyle='--', linewidth=1)
+        fig.tight_layout()
     return fig, ax
 
 
@@ -88,14 +127,25 @@ def _plot_schedule(sched: List[ScheduleEntry], figsize, title: str):
 # Public API
 # ---------------------------------------------------------------------------
 
-def gantt_matplotlib(plan=None, start_date: Optional[date] = None, filename: str = "gantt.png", figsize=(10, 0.5), epic_only: bool = False):
-    """Render a Gantt chart of the plan to a PNG file using matplotlib."""
-    sched = _prepare_schedule(plan, start_date, epic_only)
+def gantt_matplotlib(plan=None, start_date: Optional[date] = None, filename: str = "gantt.png", figsize=(10, 0.5), epic_only: bool = False,
+                     window: Optional[Tuple[date, date]] = None, rows: Optional[Callable] = None,
+                     page: Optional[int] = None, page_size: Optional[int] = None, max_height: float = 40.0):
+    """Render a Gantt chart of the plan to a PNG file using matplotlib.
+
+    Large plans can be narrowed down before drawing:
+        window: (first, last) dates; only bars overlapping it are drawn
+        rows: callable(item) -> bool selecting the rows to draw
+        page, page_size: draw rows [page*page_size, (page+1)*page_size)
+        max_height: cap on the figure height in inches
+    """
+    sched = _prepare_schedule(plan, start_date, epic_only, window, rows, page, page_size)
     title = 'Plan Gantt' + (' [Epics]' if epic_only else '')
-    fig, ax = _plot_schedule(sched, figsize, title)
+    fig, ax = _plot_schedule(sched, figsize, title, window, max_height)
     from matplotlib import pyplot as plt
+    from pathlib import Path
     out_path = Path(filename)
-    fig.savefig(out_path, dpi=150)
+    with instrument.phase('chart.save'):
+        fig.savefig(out_path, dpi=150)
     plt.close(fig)
     return out_path
 
@@ -103,10 +153,34 @@ def gantt_matplotlib(plan=None, start_date: Optional[date] = None, filename: str
 __all__ = ["gantt_matplotlib"]
 
 
-def gantt_matplotlib_inline(plan=None, start_date: Optional[date] = None, figsize=(10, 0.5), epic_only: bool = False):
+def render_rows(rows, title: str = 'Plan Gantt', figsize=(10, 0.5), window: Optional[Tuple[date, date]] = None,
+                max_height: float = 40.0) -> bytes:
+    """Draw prepared rows of (name, estimate text, start, end) and return PNG bytes.
+
+    Takes only plain data, so it can run in a worker process that never
+    sees the plan (see notjira.server).
+    """
+    import io
+    from matplotlib import pyplot as plt
+    sched = [(_Label(name, estimate), s, e) for name, estimate, s, e in rows]
+    fig, _ = _plot_schedule(sched, figsize, title, window, max_height)
+    out = io.BytesIO()
+    with instrument.phase('chart.save'):
+        fig.savefig(out, format='png', dpi=150)
+    plt.close(fig)
+    return out.getvalue()
+
+
+__all__.append("render_rows")
+
+
+def gantt_matplotlib_inline(plan=None, start_date: Optional[date] = None, figsize=(10, 0.5), epic_only: bool = False,
+                            window: Optional[Tuple[date, date]] = None, rows: Optional[Callable] = None,
+                            page: Optional[int] = None, page_size: Optional[int] = None, max_height: float = 40.0):
     """Display a Gantt chart inline (Jupyter-friendly) and return (fig, ax).
 
-    Does not write a file. Accepts same epic_only flag as gantt_matplotlib.
+    Does not write a file. Accepts the same epic_only, window, rows and
+    paging options as gantt_matplotlib.
     """
     try:
         import matplotlib.pyplot as plt
@@ -114,11 +188,9 @@ def gantt_matplotlib_inline(plan=None, start_date: Optional[date] = None, figsiz
         from IPython.display import display
     except ImportError as e:
         raise ImportError("matplotlib (and IPython for display) required for gantt_matplotlib_inline().") from e
-    sched = _prepare_schedule(plan, start_date, epic_only)
+    sched = _prepare_schedule(plan, start_date, epic_only, window, rows, page, page_size)
     title = 'Plan Gantt (inline)' + (' [Epics]' if epic_only else '')
-    min_start = min(s for _, s, _ in sched)
-    max_end = max(e for _, _, e in sched)
-    fig, ax = _plot_schedule(sched, figsize, title)
+    fig, ax = _plot_schedule(sched, figsize, title, window, max_height)
     return fig, ax
 
 __all__.append("gantt_matplotlib_inline")
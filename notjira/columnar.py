@@ -0,0 +1,394 @@
+"""Columnar plan storage for very large plans.
+
+ColumnarPlan keeps ids, estimate hours, dates, dependency edges and epic
+members in flat ``array`` columns instead of one Python object per item.
+Items are handed out as ItemView objects that read from the columns on
+access; dates are stored as ordinals (0 meaning unset) and dependencies
+are compressed into CSR form on first use.
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+from notjira.base import Base, BaseStatus, extra_working_days
+from notjira.task import Epic, Task
+from notjira.time_estimate import TimeEstimate
+from notjira.toposort import CycleError
+from notjira.work_calendar import DEFAULT_CALENDAR, as_date
+
+_STATUSES = list(BaseStatus)
+_NO_DATE = 0
+_NO_ESTIMATE = float('nan')
+# kind codes, shared with the store format; higher bits hold its flags
+_KINDS = [Task, Epic, Base]
+_KIND_MASK = 0x0f
+
+
+def _to_ordinal(value):
+    value = as_date(value)
+    return _NO_DATE if value is None else value.toordinal()
+
+
+def _from_ordinal(ordinal):
+    return None if ordinal == _NO_DATE else date.fromordinal(ordinal)
+
+
+def _kind(cls):
+    for code, kind in enumerate(_KINDS):
+        if issubclass(cls, kind):
+            return code
+    raise TypeError(f"Cannot store {cls.__name__} items")
+
+
+class ItemView:
+    """Read-only view of one row of a ColumnarPlan."""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def __repr__(self):
+        kinds = self._store._kinds
+        kind = 'Task' if kinds is None else _KINDS[kinds[self._row] & _KIND_MASK].__name__
+        return f"<{kind} {self.id} {self.name} {self.estimate}>"
+
+    def __eq__(self, other):
+        return isinstance(other, ItemView) and other._store is self._store and other._row == self._row
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+    @property
+    def id(self):
+        return self._store._ids[self._row]
+
+    @property
+    def name(self):
+        return self._store._names[self._row]
+
+    @property
+    def estimate(self):
+        hours = self._store._hours[self._row]
+        return None if hours != hours else TimeEstimate.intern(hours)
+
+    @property
+    def depends(self):
+        return frozenset(self._store.depends(self.id))
+
+    @property
+    def status(self):
+        return _STATUSES[self._store._status[self._row]]
+
+    @property
+    def due_date(self):
+        return _from_ordinal(self._store._due[self._row])
+
+    @property
+    def start_date(self):
+        return _from_ordinal(self._store._start[self._row])
+
+    @property
+    def end_date(self):
+        return _from_ordinal(self._store._end[self._row])
+
+
+class ColumnarPlan:
+    def __init__(self, calendar=None):
+        self.calendar = calendar if calendar is not None else DEFAULT_CALENDAR
+        self._ids = array('q')
+        self._names = []
+        self._hours = array('d')
+        self._status = array('b')
+        self._kinds = array('b')
+        self._due = array('l')
+        self._start = array('l')
+        self._end = array('l')
+        # one entry per dependency edge: dependant row -> dependency id
+        self._edge_rows = array('q')
+        self._edge_deps = array('q')
+        self._forward = None
+        self._reverse = None
+        # epic member ids in CSR form by row; rows are only appended
+        self._member_offsets = array('q', [0])
+        self._members = array('q')
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return self.items()
+
+    def __contains__(self, item_id):
+        try:
+            self.row(item_id)
+        except KeyError:
+            return False
+        return True
+
+    def add(self, name=None, estimate=None, depends=(), due_date=None,
+            status=BaseStatus.OPEN, item_id=None, kind=Task, members=()):
+        """Append an item and return its id.
+
+        Ids must be increasing; by default the next one after the last row.
+        ``depends`` holds ids, which may refer to rows added later. ``kind``
+        is the item class the row stands for (Task, Epic or Base), and
+        ``members`` the ids of an epic's tasks.
+        """
+        if self._edge_rows is None:
+            raise TypeError("This ColumnarPlan wraps external columns and is read-only")
+        if item_id is None:
+            item_id = self._ids[-1] + 1 if self._ids else 0
+        elif self._ids and item_id <= self._ids[-1]:
+            raise ValueError(f"Ids must be increasing: {item_id} after {self._ids[-1]}")
+        row = len(self._ids)
+        estimate = TimeEstimate.auto(estimate)
+        self._ids.append(item_id)
+        self._names.append(name)
+        self._hours.append(_NO_ESTIMATE if estimate is None else estimate.hours)
+        self._status.append(_STATUSES.index(status))
+        self._kinds.append(_kind(kind))
+        self._due.append(_to_ordinal(due_date))
+        self._start.append(_NO_DATE)
+        self._end.append(_NO_DATE)
+        for dep_id in depends:
+            self._edge_rows.append(row)
+            self._edge_deps.append(dep_id)
+        if depends:
+            self._forward = self._reverse = None
+        self._members.extend(members)
+        self._member_offsets.append(len(self._members))
+        return item_id
+
+    @classmethod
+    def from_plan(cls, plan):
+        """Copy an object Plan into columns, keeping its ids."""
+        store = cls(calendar=plan.calendar)
+        for item in sorted(plan.items(), key=lambda x: x.id):
+            members = [t.id for t in item.tasks] if isinstance(item, Epic) else ()
+            store.add(item.name, item.estimate, item.depends, item.due_date,
+                      item.status, item_id=item.id, kind=type(item), members=members)
+            store._start[-1] = _to_ordinal(item.start_date)
+            store._end[-1] = _to_ordinal(item.end_date)
+        return store
+
+    @classmethod
+    def from_columns(cls, ids, names, hours, status, due, start, end,
+                     depends_offsets, depends, calendar=None, kinds=None,
+                     member_offsets=None, members=None):
+        """Wrap existing columns without copying them.
+
+        Any sequences of the right item types work, e.g. memoryviews over a
+        memory-mapped file (see store.open_mapped). ``status`` holds indexes
+        into BaseStatus, dates are ordinals and ``depends`` is CSR by row,
+        as is ``members`` for the tasks of epic rows. ``kinds`` holds store
+        kind codes; without it every row is a Task. No rows can be added
+        afterwards.
+        """
+        store = cls(calendar=calendar)
+        store._ids = ids
+        store._names = names
+        store._hours = hours
+        store._status = status
+        store._kinds = kinds
+        store._due = due
+        store._start = start
+        store._end = end
+        store._edge_rows = store._edge_deps = None
+        store._forward = (depends_offsets, depends)
+        if members is not None:
+            store._member_offsets, store._members = member_offsets, members
+        else:
+            store._member_offsets, store._members = array('q', bytes(8 * (len(ids) + 1))), array('q')
+        return store
+
+    def row(self, item_id):
+        """Return the row index of ``item_id``; KeyError if unknown."""
+        ids = self._ids
+        # ids are usually dense, which makes the row the id itself
+        if 0 <= item_id < len(ids) and ids[item_id] == item_id:
+            return item_id
+        row = bisect_left(ids, item_id)
+        if row == len(ids) or ids[row] != item_id:
+            raise KeyError(item_id)
+        return row
+
+    def get_item(self, item_id):
+        return ItemView(self, self.row(item_id))
+
+    __getitem__ = get_item
+
+    def items(self):
+        """Iterate over views of all rows."""
+        return (ItemView(self, row) for row in range(len(self._ids)))
+
+    def depends(self, item_id):
+        offsets, targets = self._forward_csr()
+        row = self.row(item_id)
+        return targets[offsets[row]:offsets[row + 1]]
+
+    def dependents(self, item_id):
+        offsets, targets = self._reverse_csr()
+        row = self.row(item_id)
+        return targets[offsets[row]:offsets[row + 1]]
+
+    def epic_windows(self):
+        """Return {epic id: (start, end)} spanning each epic's scheduled members.
+
+        Nested epics contribute their own window, as in Plan.epic_windows.
+        """
+        kinds = self._kinds
+        if kinds is None:
+            return {}
+        epic = _KINDS.index(Epic)
+        windows = {}
+
+        def window(row):
+            if row not in windows:
+                windows[row] = None
+                first = last = _NO_DATE
+                for k in range(self._member_offsets[row], self._member_offsets[row + 1]):
+                    try:
+                        member = self.row(self._members[k])
+                    except KeyError:
+                        continue
+                    if kinds[member] & _KIND_MASK == epic:
+                        span = window(member)
+                        if span is None:
+                            continue
+                        s, e = span
+                    else:
+                        s, e = self._start[member], self._end[member]
+                        if s == _NO_DATE or e == _NO_DATE:
+                            continue
+                    first = s if first == _NO_DATE else min(first, s)
+                    last = max(last, e)
+                if first != _NO_DATE:
+                    windows[row] = (first, last)
+            return windows[row]
+
+        result = {}
+        for row in range(len(self._ids)):
+            if kinds[row] & _KIND_MASK == epic and window(row) is not None:
+                first, last = windows[row]
+                result[self._ids[row]] = (date.fromordinal(first), date.fromordinal(last))
+        return result
+
+    def _forward_csr(self):
+        """(offsets, dependency ids) indexed by dependant row."""
+        if self._forward is None:
+            self._forward = self._csr(self._edge_rows, self._edge_deps)
+        return self._forward
+
+    def _reverse_csr(self):
+        """(offsets, dependant ids) indexed by dependency row."""
+        if self._reverse is None:
+            offsets, deps = self._forward_csr()
+            rows, ids = array('q'), array('q')
+            for src in range(len(self._ids)):
+                for k in range(offsets[src], offsets[src + 1]):
+                    try:
+                        rows.append(self.row(deps[k]))
+                    except KeyError:
+                        continue
+                    ids.append(self._ids[src])
+            self._reverse = self._csr(rows, ids)
+        return self._reverse
+
+    def _csr(self, rows, values):
+        # counting sort of the edge list by row
+        offsets = array('q', bytes(8 * (len(self._ids) + 1)))
+        for row in rows:
+            offsets[row + 1] += 1
+        for i in range(len(self._ids)):
+            offsets[i + 1] += offsets[i]
+        fill = array('q', offsets)
+        targets = array('q', bytes(8 * len(values)))
+        for row, value in zip(rows, values):
+            targets[fill[row]] = value
+            fill[row] += 1
+        return offsets, targets
+
+    def to_numpy(self):
+        """Return the columns as NumPy arrays sharing this plan's buffers."""
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("numpy is required for to_numpy(). Install with 'pip install notjira[numpy]'.") from e
+        fwd_offsets, fwd_targets = self._forward_csr()
+        return {
+            'ids': np.frombuffer(self._ids, dtype=np.int64),
+            'hours': np.frombuffer(self._hours, dtype=np.float64),
+            'status': np.frombuffer(self._status, dtype=np.int8),
+            'due': np.frombuffer(self._due, dtype=np.dtype(f'i{self._due.itemsize}')),
+            'start': np.frombuffer(self._start, dtype=np.dtype(f'i{self._start.itemsize}')),
+            'end': np.frombuffer(self._end, dtype=np.dtype(f'i{self._end.itemsize}')),
+            'depends_offsets': np.frombuffer(fwd_offsets, dtype=np.int64),
+            'depends': np.frombuffer(fwd_targets, dtype=np.int64),
+        }
+
+    def schedule(self, start_date=None):
+        """ASAP-schedule the rows in place, same rules as utils.schedule().
+
+        Works on working-day indexes of the plan calendar, so no per-item
+        objects are created. Returns a list of (view, start, end).
+        """
+        if start_date is None:
+            start_date = date.today()
+        calendar = self.calendar
+        n = len(self._ids)
+        fwd_offsets, fwd_deps = self._forward_csr()
+        rev_offsets, rev_ids = self._reverse_csr()
+        indeg = array('q', bytes(8 * n))
+        for row in range(n):
+            for k in range(fwd_offsets[row], fwd_offsets[row + 1]):
+                if fwd_deps[k] in self:
+                    indeg[row] += 1
+        first = calendar.index(calendar.next_working_day(start_date))
+        start_idx = array('q', [first]) * n
+        end_idx = array('q', bytes(8 * n))
+        # Kahn's algorithm; the list doubles as the queue and the result order
+        ordered = [row for row in range(n) if indeg[row] == 0]
+        for row in ordered:
+            hours = self._hours[row]
+            extra = 0 if hours != hours else extra_working_days(hours)
+            end_idx[row] = start_idx[row] + extra
+            for k in range(rev_offsets[row], rev_offsets[row + 1]):
+                nxt = self.row(rev_ids[k])
+                if end_idx[row] + 1 > start_idx[nxt]:
+                    start_idx[nxt] = end_idx[row] + 1
+                indeg[nxt] -= 1
+                if indeg[nxt] == 0:
+                    ordered.append(nxt)
+        if len(ordered) != n:
+            raise CycleError(self._find_cycle(indeg))
+        dates = {}
+        result = []
+        for row in ordered:
+            s, e = start_idx[row], end_idx[row]
+            for idx in (s, e):
+                if idx not in dates:
+                    dates[idx] = calendar.from_index(idx)
+            self._start[row] = dates[s].toordinal()
+            self._end[row] = dates[e].toordinal()
+            result.append((ItemView(self, row), dates[s], dates[e]))
+        return result
+
+    def _find_cycle(self, indeg):
+        fwd_offsets, fwd_deps = self._forward_csr()
+        row = next(r for r in range(len(indeg)) if indeg[r] > 0)
+        position = {}
+        path = []
+        while row not in position:
+            position[row] = len(path)
+            path.append(row)
+            for k in range(fwd_offsets[row], fwd_offsets[row + 1]):
+                try:
+                    dep_row = self.row(fwd_deps[k])
+                except KeyError:
+                    continue
+                if indeg[dep_row] > 0:
+                    row = dep_row
+                    break
+        return [self._ids[r] for r in path[position[row]:]]
@@ -1,23 +1,668 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+import threading
+import weakref
+
+from notjira import instrument
+from notjira.time_estimate import TimeEstimate
+from notjira.work_calendar import DEFAULT_CALENDAR
+
+# Plan made active by Plan.active() in the current thread / asyncio task;
+# takes precedence over the process-wide default plan.
+_active_plan = ContextVar('notjira_active_plan', default=None)
+
 
 class Plan:
-    def __init__(self, make_default=True):
+    # Upper bound on memoised ancestor/descendant closures kept between edits.
+    closure_cache_size = 4096
+
+    def __init__(self, make_default=True, calendar=None):
         self._id_counter = 0
+        # guards the id counter and the indexes against concurrent edits
+        self._lock = threading.RLock()
+        self._calendar = calendar if calendar is not None else DEFAULT_CALENDAR
         self._item_pool = dict()
+        # Dependency index. _depends[id] is the item's own depends set, so the
+        # forward edges never drift from Base.depends; _dependents holds the
+        # reverse edges.
+        self._depends = dict()
+        self._dependents = dict()
+        self._ancestors_cache = dict()
+        self._descendants_cache = dict()
+        # Set once the plan was forked: ids whose _dependents set this plan
+        # has copied since, the others may still be shared (see fork).
+        self._private = None
+        self._parent = None
+        # Live forks of this plan; they get their own copy of an item this
+        # plan still shares with them before this plan changes it.
+        self._forks = None
+        # Change log for diff, kept once the plan is forked or is a fork:
+        # item id -> epoch of its last change or reschedule. fork() starts a
+        # new epoch; _all_touched is the last epoch of a plan-wide change.
+        self._touched = None
+        self._epoch = 0
+        self._fork_epoch = None
+        self._all_touched = None
+        # Epic index: member id -> epic id, plus the ids of epics and their
+        # cached schedule windows. A window is rebuilt lazily once one of its
+        # members (or a nested epic's members) moved.
+        self._epic_of = dict()
+        self._epics = set()
+        self._epic_windows = dict()
+        self._stale_windows = set()
+        # Secondary indexes for query(), created by the first query.
+        self._index = None
+        self._listeners = []
+        self._version = 0
+        self._scheduler = None
         if make_default:
             self.make_default()
         
-    def register_item(self, task):
-        new_id = self._id_counter
-        self._id_counter += 1
-        task.set_id(new_id)
-        self._item_pool[new_id] = task
+    def register_item(self, task, item_id=None):
+        """Add ``task`` to the plan and give it an id.
+
+        ``item_id`` keeps a known id (e.g. when loading a saved plan);
+        later ids continue after the largest one seen.
+        """
+        with self._lock:
+            if item_id is None:
+                new_id = self._id_counter
+            elif item_id in self._item_pool:
+                raise ValueError(f"Id {item_id} is already registered")
+            else:
+                new_id = item_id
+            self._id_counter = max(self._id_counter, new_id + 1)
+            task.set_id(new_id)
+            task.set_plan(self)
+            self._item_pool[new_id] = task
+            depends = task.depends
+            self._depends[new_id] = depends
+            if self._private is None:
+                for dep_id in depends:
+                    self._dependents.setdefault(dep_id, set()).add(new_id)
+            else:
+                for dep_id in depends:
+                    self._own_dependents(dep_id).add(new_id)
+            if depends:
+                self._invalidate_closures()
+            if self._index is not None:
+                self._index.registered(task)
+            self.notify('register', new_id)
+            if instrument.active:
+                instrument.count('register_item')
         
     def deregister_item(self, task_id):
-        del self._item_pool[task_id]
+        with self._lock:
+            item = self._item_pool.pop(task_id)
+            epic_id = self._epic_of.get(task_id)
+            if item.plan is self:
+                if self._forks:
+                    self._detach(item)
+                item.set_plan(None)
+            for dep_id in self._depends.pop(task_id, ()):
+                if dep_id in self._dependents:
+                    self._own_dependents(dep_id).discard(task_id)
+            self._invalidate_closures()
+            self._unlink_epic_item(item, task_id)
+            if self._index is not None:
+                self._index.deregistered(item)
+            self.notify('deregister', task_id, item, epic_id)
+
+    @property
+    def lock(self):
+        """Re-entrant lock held while the plan is edited or scheduled.
+
+        Hold it to read a consistent plan across several calls while other
+        threads may change it.
+        """
+        return self._lock
+
+    @property
+    def calendar(self):
+        """WorkCalendar used for all date arithmetic in this plan."""
+        return self._calendar
+
+    @calendar.setter
+    def calendar(self, new_calendar):
+        with self._lock:
+            old = self._calendar
+            self._calendar = new_calendar
+            self.notify('calendar', None, old, new_calendar)
+
+    # -- change notification ----------------------------------------------
+
+    def add_listener(self, listener):
+        """Call ``listener(event, item_id, *args)`` after every plan change.
+
+        Events and their args:
+            'register'
+            'deregister': item, id of the epic it belonged to or None
+            'add_dependency', 'remove_dependency': dep_id
+            'estimate': old, new, rollup (True when the change only
+                rolls a member's change up into its epic)
+            'assignee', 'status', 'name', 'due_date', 'start_date': old, new
+            'tasks': ids removed from and then appended to an epic's tasks
+            'calendar' (item_id None): old, new
+            'clear' (item_id None): keep_ids
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    @property
+    def version(self):
+        """Counter bumped by every change listeners are notified of.
+
+        Results derived from the plan (schedules, charts) can be cached
+        under it; schedule dates themselves do not count as changes.
+        """
+        return self._version
+
+    def notify(self, event, item_id, *args):
+        # listeners (e.g. the Scheduler) update state that runs read under the lock
+        with self._lock:
+            self._version += 1
+            if self._touched is not None:
+                if item_id is None:
+                    self._all_touched = self._epoch
+                else:
+                    self._touched[item_id] = self._epoch
+            for listener in self._listeners:
+                listener(event, item_id, *args)
+
+    def estimate_changed(self, item_id, old, new, rollup=False):
+        """Roll an item's estimate change up into its epics, then notify.
+
+        Called by Base.set_estimate; each enclosing epic is adjusted by the
+        difference instead of re-summing its tasks. Listeners hear of the
+        epics first, so the plan is consistent when the item's event comes.
+        """
+        with self._lock:
+            epic_id = self._epic_of.get(item_id)
+            self._mark_window_stale(epic_id)
+            delta = (new.hours if new is not None else 0) - (old.hours if old is not None else 0)
+            if epic_id is not None and delta:
+                epic = self.edit(epic_id)
+                epic.set_estimate(TimeEstimate(epic.estimate.hours + delta if epic.estimate is not None else delta),
+                                  rollup=True)
+            self.notify('estimate', item_id, old, new, rollup)
+
+    def item_changed(self, item_id, field, old, new):
+        """Update the query indexes after a field of an item changed, then notify.
+
+        Called by the Base setters for status, name, due_date and start_date.
+        """
+        with self._lock:
+            if self._index is not None:
+                self._index.changed(item_id, field, old, new)
+            self.notify(field, item_id, old, new)
+
+    def scheduler(self):
+        """Return the plan's cached incremental Scheduler."""
+        with self._lock:
+            if self._scheduler is None:
+                from notjira.scheduler import Scheduler
+                self._scheduler = Scheduler(self)
+            return self._scheduler
+
+    # -- dependency index -------------------------------------------------
+
+    def add_dependency(self, item_id, dep_id, check_cycle=True):
+        """Record that ``item_id`` depends on ``dep_id``.
+
+        Raises ValueError if the new edge would close a cycle. Bulk loaders
+        pass ``check_cycle=False`` and validate the whole graph once instead.
+        """
+        with self._lock:
+            if item_id == dep_id:
+                raise ValueError("Cannot depend on itself")
+            depends = self._depends[item_id]
+            if dep_id in depends:
+                return
+            if check_cycle and self.creates_cycle(item_id, dep_id):
+                raise ValueError(f"Adding dependency creates cycle: {item_id} <- ... <- {dep_id}")
+            item = self.edit(item_id)
+            depends = self._depends[item_id]
+            if isinstance(depends, frozenset):
+                # first edge of an item still sharing Base.NO_DEPENDS
+                depends = set(depends)
+                self._depends[item_id] = depends
+                item.set_depends(depends)
+            depends.add(dep_id)
+            self._own_dependents(dep_id).add(item_id)
+            self._invalidate_closures()
+            self.notify('add_dependency', item_id, dep_id)
+
+    def remove_dependency(self, item_id, dep_id):
+        with self._lock:
+            if dep_id not in self._depends[item_id]:
+                return
+            self.edit(item_id)
+            self._depends[item_id].discard(dep_id)
+            if dep_id in self._dependents:
+                self._own_dependents(dep_id).discard(item_id)
+            self._invalidate_closures()
+            self.notify('remove_dependency', item_id, dep_id)
+
+    def _own_dependents(self, dep_id):
+        """The dependents set of ``dep_id``, copied first if a fork may share it."""
+        dependents = self._dependents.get(dep_id)
+        if self._private is None:
+            if dependents is None:
+                dependents = self._dependents[dep_id] = set()
+        elif dep_id not in self._private:
+            dependents = self._dependents[dep_id] = set(dependents or ())
+            self._private.add(dep_id)
+        return dependents
+
+    def dependents(self, item_id):
+        """Return ids of items depending directly on ``item_id``."""
+        return self._dependents.get(item_id, frozenset())
+
+    def ancestors(self, item_id):
+        """Return ids ``item_id`` transitively depends on (frozenset)."""
+        if item_id not in self._item_pool:
+            raise KeyError(item_id)
+        return self._closure(item_id, self._depends, self._ancestors_cache)
+
+    def descendants(self, item_id):
+        """Return ids transitively depending on ``item_id`` (frozenset)."""
+        if item_id not in self._item_pool:
+            raise KeyError(item_id)
+        return self._closure(item_id, self._dependents, self._descendants_cache)
+
+    def creates_cycle(self, item_id, dep_id):
+        """Return True if making ``item_id`` depend on ``dep_id`` closes a cycle.
+
+        Walks the dependents of ``item_id`` looking for ``dep_id``; freshly
+        created items have no dependents, so building a plan stays linear.
+        """
+        if item_id == dep_id:
+            return True
+        cached = self._descendants_cache.get(item_id)
+        if cached is not None:
+            return dep_id in cached
+        seen = set()
+        stack = [item_id]
+        while stack:
+            node = stack.pop()
+            for nxt in self._dependents.get(node, ()):
+                if nxt == dep_id:
+                    return True
+                if nxt in seen:
+                    continue
+                seen.add(nxt)
+                cached = self._descendants_cache.get(nxt)
+                if cached is not None:
+                    if dep_id in cached:
+                        return True
+                    continue
+                stack.append(nxt)
+        return False
+
+    def _closure(self, item_id, edges, cache):
+        cached = cache.get(item_id)
+        if cached is not None:
+            return cached
+        result = set()
+        stack = list(edges.get(item_id, ()))
+        while stack:
+            node = stack.pop()
+            if node in result:
+                continue
+            result.add(node)
+            sub = cache.get(node)
+            if sub is not None:
+                result |= sub
+                continue
+            stack.extend(edges.get(node, ()))
+        result = frozenset(result)
+        if len(cache) >= self.closure_cache_size:
+            cache.clear()
+        cache[item_id] = result
+        return result
+
+    def _invalidate_closures(self):
+        if self._ancestors_cache:
+            self._ancestors_cache.clear()
+        if self._descendants_cache:
+            self._descendants_cache.clear()
     
+    # -- epic index -------------------------------------------------------
+
+    def add_epic_members(self, epic_id, member_ids):
+        """Record ``member_ids`` as members of epic ``epic_id``.
+
+        An item belongs to at most one epic; adding it to another epic
+        moves it there.
+        """
+        with self._lock:
+            self._epics.add(epic_id)
+            for member_id in member_ids:
+                self._mark_window_stale(self._epic_of.get(member_id))
+                self._epic_of[member_id] = epic_id
+            self._mark_window_stale(epic_id)
+
+    def remove_epic_members(self, epic_id, member_ids):
+        with self._lock:
+            for member_id in member_ids:
+                if self._epic_of.get(member_id) == epic_id:
+                    del self._epic_of[member_id]
+            self._mark_window_stale(epic_id)
+
+    def epic_of(self, item_id):
+        """Return the id of the epic ``item_id`` belongs to, or None."""
+        return self._epic_of.get(item_id)
+
+    def epic_window(self, epic_id):
+        """Return (start, end) spanning the epic's scheduled members, or None.
+
+        Nested epics contribute their own window. Windows follow the dates
+        of the last schedule run and are only rebuilt after they moved.
+        """
+        if epic_id in self._stale_windows or epic_id not in self._epic_windows:
+            start = end = None
+            for member in self._item_pool[epic_id].tasks:
+                if member.id in self._epics:
+                    window = self.epic_window(member.id)
+                    if window is None:
+                        continue
+                    s, e = window
+                else:
+                    if member.id not in self._item_pool:
+                        continue
+                    s, e = self.dates(member.id)
+                    if s is None or e is None:
+                        continue
+                if start is None:
+                    start, end = s, e
+                else:
+                    start, end = min(start, s), max(end, e)
+            self._epic_windows[epic_id] = None if start is None else (start, end)
+            self._stale_windows.discard(epic_id)
+        return self._epic_windows[epic_id]
+
+    def epic_windows(self):
+        """Return {epic id: (start, end)} for every epic with scheduled members."""
+        windows = {}
+        for epic_id in self._epics:
+            window = self.epic_window(epic_id)
+            if window is not None:
+                windows[epic_id] = window
+        return windows
+
+    def dates_changed(self, item_ids):
+        """Mark the windows of epics containing ``item_ids`` as stale.
+
+        Called by the schedulers with the items whose dates moved.
+        """
+        # a whole-plan run moves every item but only a few epics
+        for epic_id in set(map(self._epic_of.get, item_ids)):
+            self._mark_window_stale(epic_id)
+        if self._touched is not None:
+            self._touched.update(dict.fromkeys(item_ids, self._epoch))
+        if self._index is not None:
+            self._index.dates_changed(item_ids)
+
+    def _mark_window_stale(self, epic_id):
+        # an epic's window is stale whenever a nested epic's is, so walk up
+        # until an epic that is already marked
+        while epic_id is not None and epic_id not in self._stale_windows:
+            self._stale_windows.add(epic_id)
+            epic_id = self._epic_of.get(epic_id)
+
+    def _unlink_epic_item(self, item, item_id):
+        self._mark_window_stale(self._epic_of.pop(item_id, None))
+        if item_id in self._epics:
+            self.remove_epic_members(item_id, [t.id for t in item.tasks])
+            self._epics.discard(item_id)
+            self._epic_windows.pop(item_id, None)
+            self._stale_windows.discard(item_id)
+
+    # -- forks --------------------------------------------------------------
+
+    def fork(self):
+        """Return a copy-on-write scenario of this plan.
+
+        The fork shares items and dependency sets with this plan and only
+        copies the indexes that map ids to them, so forking costs a few
+        dict copies. Change the fork through fork.edit(item_id), which
+        copies an item into the fork on first use; dependency and epic
+        changes made through the fork copy what they touch themselves.
+        The fork also starts from a copy of this plan's scheduler, so its
+        next schedule run only recomputes what changed in the fork, and it
+        keeps its own dates (see dates) instead of writing them onto shared
+        items.
+
+        Copying works both ways: before this plan changes an item a fork
+        still shares (through its setters, edit or the dependency methods),
+        the fork gets its own copy, so a fork keeps the items, dependencies
+        and dates it was forked with. Dates this plan writes later do not
+        reach the fork either, as long as this plan was scheduled before
+        forking (the fork then reads shared items' dates from its own
+        scheduler).
+
+        To reschedule a fork, fork.scheduler().update(start_date) is the
+        fast path: it recomputes only what changed, while schedule(fork)
+        and Scheduler.run() also build a list of every item in the plan.
+        """
+        with self._lock:
+            if self._touched is None:
+                self._touched = {}
+            self._epoch += 1
+            fork = Plan(make_default=False, calendar=self._calendar)
+            fork._parent = self
+            fork._touched = {}
+            fork._fork_epoch = self._epoch
+            fork._id_counter = self._id_counter
+            fork._item_pool = dict(self._item_pool)
+            fork._depends = dict(self._depends)
+            fork._dependents = dict(self._dependents)
+            # from now on both sides copy a dependents set before changing it
+            fork._private = set()
+            self._private = set()
+            fork._epic_of = dict(self._epic_of)
+            fork._epics = set(self._epics)
+            fork._epic_windows = dict(self._epic_windows)
+            fork._stale_windows = set(self._stale_windows)
+            if self._scheduler is not None:
+                fork._scheduler = self._scheduler.fork(fork)
+            if self._forks is None:
+                self._forks = weakref.WeakSet()
+            self._forks.add(fork)
+            return fork
+
+    def _detach(self, item):
+        """Give forks still sharing ``item`` a copy before this plan changes it."""
+        with self._lock:
+            for fork in list(self._forks):
+                if fork._item_pool.get(item._id) is item:
+                    fork.edit(item._id)
+
+    @contextmanager
+    def _writing(self, item):
+        """Hold the lock while ``item`` changes, detached from forks first."""
+        with self._lock:
+            self._detach(item)
+            yield
+
+    @property
+    def parent(self):
+        """The plan this one was forked from, or None."""
+        return self._parent
+
+    def edit(self, item_id):
+        """Return the item ``item_id`` for changing it in this plan.
+
+        A fork copies an item it still shares with its parent on first
+        edit (see fork); for every other item this is get_item().
+        """
+        item = self._item_pool[item_id]
+        if item.plan is self:
+            if self._forks:
+                self._detach(item)
+            return item
+        with self._lock:
+            copy = item.clone()
+            self._item_pool[item_id] = copy
+            if self._touched is not None:
+                self._touched[item_id] = self._epoch
+            self._depends[item_id] = copy.depends
+            copy.set_id(item_id)
+            copy.set_plan(self)
+            if self._scheduler is not None:
+                dates = self._scheduler.dates(item_id)
+                if dates is not None:
+                    copy.set_dates(*dates)
+            return copy
+
+    def dates(self, item_id):
+        """Return the scheduled (start, end) of ``item_id`` in this plan.
+
+        Items a fork shares with its parent take the dates of the fork's
+        own schedule; every other item carries its dates itself.
+        """
+        item = self._item_pool[item_id]
+        if item.plan is not self and self._scheduler is not None:
+            dates = self._scheduler.dates(item_id)
+            if dates is not None:
+                return dates
+        return item.start_date, item.end_date
+
+    def set_dates(self, scheduled):
+        """Store dates computed outside the plan's Scheduler, e.g. by a bulk engine.
+
+        ``scheduled`` holds (item, start, end). Items a fork shares with its
+        parent keep the parent's dates: the fork's Scheduler records them
+        instead (see dates). An existing Scheduler takes all the dates, so
+        forks made afterwards start from them. Epic windows and indexes are
+        updated as for a schedule run.
+        """
+        with self._lock:
+            dates = {}
+            shared = False
+            for item, start, end in scheduled:
+                # two stores inline instead of a method call per item
+                if item._plan is self:
+                    item._start_date = start
+                    item._end_date = end
+                else:
+                    shared = True
+                dates[item._id] = (start, end)
+            if shared or self._scheduler is not None:
+                self.scheduler().override(dates)
+            self.dates_changed(dates)
+
+    def diff(self, other):
+        """Return the items whose dates differ between this plan and ``other``.
+
+        The result maps item id to ((start, end) here, (start, end) in
+        other); items missing from one of the plans have None on that side.
+        Typically ``other`` is a fork of this plan, or both are forks of one
+        plan: then only the items either side copied, changed or rescheduled
+        since the fork are compared. Any other pair of plans, or a fork
+        whose plan was cleared or got a new calendar, is compared item by
+        item.
+        """
+        # a plan is locked before its forks, as in _detach
+        parent = self._parent if self._parent is not None and self._parent is other._parent else None
+        first, second = (other, self) if self._parent is other else (self, other)
+        with parent.lock if parent is not None else nullcontext(), first.lock, second.lock:
+            ids = self._diff_candidates(other)
+            mine, theirs = self._all_dates(ids), other._all_dates(ids)
+        changes = {}
+        for item_id, dates in mine.items():
+            other_dates = theirs.get(item_id)
+            if dates != other_dates:
+                changes[item_id] = (dates, other_dates)
+        for item_id, dates in theirs.items():
+            if item_id not in mine:
+                changes[item_id] = (None, dates)
+        return changes
+
+    def _diff_candidates(self, other):
+        """Ids whose dates may differ from ``other``'s, or None for all."""
+        if other._parent is self:
+            parent, forks = self, (other,)
+        elif self._parent is other:
+            parent, forks = other, (self,)
+        elif self._parent is not None and self._parent is other._parent:
+            parent, forks = self._parent, (self, other)
+        else:
+            return None
+        with parent.lock:
+            ids = parent._changed_since(min(f._fork_epoch for f in forks))
+        if ids is None:
+            return None
+        for fork in forks:
+            changed = fork._changed_since(0)
+            if changed is None:
+                return None
+            ids.update(changed)
+        return ids
+
+    def _changed_since(self, epoch):
+        """Set of ids changed or rescheduled from ``epoch`` on, None for all."""
+        if self._all_touched is not None and self._all_touched >= epoch:
+            return None
+        return {item_id for item_id, touched in self._touched.items() if touched >= epoch}
+
+    def _all_dates(self, ids=None):
+        """{item id: dates(item id)} for the whole plan, or for ``ids`` in it."""
+        pool = self._item_pool
+        if ids is not None:
+            pool = {item_id: pool[item_id] for item_id in ids if item_id in pool}
+        scheduled = self._scheduler._dates if self._scheduler is not None else {}
+        # a diff of unrelated plans lands here with every id, so read the
+        # date attributes directly rather than through their properties
+        return {item_id: (item._start_date, item._end_date) if item._plan is self
+                else scheduled.get(item_id) or (item._start_date, item._end_date)
+                for item_id, item in pool.items()}
+
     def make_default(self):
+        """Make this the process-wide default plan."""
         PlanContext().default_plan = self
+
+    @contextmanager
+    def active(self):
+        """Use this plan as the default inside a ``with`` block.
+
+        The scope is a context variable, so it covers only the current
+        thread or asyncio task: items created there register into this
+        plan, and utilities called without a plan use it.
+        """
+        token = _active_plan.set(self)
+        try:
+            yield self
+        finally:
+            _active_plan.reset(token)
     
+    def bulk_import(self, rows, batch_size=10000, progress=None):
+        """Import task rows in bulk, see importer.bulk_import."""
+        from notjira.importer import bulk_import
+        return bulk_import(self, rows, batch_size=batch_size, progress=progress)
+
+    def save(self, path):
+        """Write the plan to ``path`` in notjira's binary format (see store)."""
+        from notjira.store import save_plan
+        save_plan(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=False, make_default=True):
+        """Read a plan written by save().
+
+        With ``mmap=True`` the file is memory-mapped and a read-only
+        ColumnarPlan is returned instead; no Task objects are built.
+        """
+        from notjira import store
+        if mmap:
+            return store.open_mapped(path)
+        return store.load_plan(path, make_default=make_default)
+
+    def __contains__(self, item_id):
+        return item_id in self._item_pool
+
     def get_item(self, item_id):
         return self._item_pool[item_id]
 
@@ -25,6 +670,34 @@ class Plan:
         """Return all registered planning items."""
         return list(self._item_pool.values())
 
+    def query(self, status=None, name=None, due_before=None, due_after=None, overlaps=None):
+        """Return an iterator over the items matching every given filter.
+
+        Answered from secondary indexes (see notjira.query) instead of a
+        scan of items(); each index is built by the first query using it.
+
+        Args:
+            status: a BaseStatus or a collection of them
+            name: words that must each start a word of the item's name
+                  (case-insensitive), e.g. 'deploy api'
+            due_before: due_date earlier than this date
+            due_after: due_date later than this date
+            overlaps: (first, last); scheduled between start_date and
+                      end_date on at least one of these days
+        Items come in date order when a date filter is the most selective,
+        otherwise in no particular order. The candidates are fixed when
+        query() returns; items removed while iterating are skipped.
+        """
+        from notjira.query import query
+        with self._lock:
+            return query(self, status, name, due_before, due_after, overlaps)
+
+    def _query_index(self):
+        if self._index is None:
+            from notjira.query import PlanIndex
+            self._index = PlanIndex(self)
+        return self._index
+
     def clear(self, keep_ids=False):
         """Remove all items from the plan.
 
@@ -32,9 +705,19 @@ class Plan:
             keep_ids: If True, keep incrementing id counter (ids won't be reused).
                       If False, reset id counter to 0.
         """
-        self._item_pool.clear()
-        if not keep_ids:
-            self._id_counter = 0
+        with self._lock:
+            self._item_pool.clear()
+            self._depends.clear()
+            self._dependents.clear()
+            self._invalidate_closures()
+            self._epic_of.clear()
+            self._epics.clear()
+            self._epic_windows.clear()
+            self._stale_windows.clear()
+            self._index = None
+            if not keep_ids:
+                self._id_counter = 0
+            self.notify('clear', None, keep_ids)
 
 
 def clear_default_plan(keep_ids=False):
@@ -48,17 +731,22 @@ def clear_default_plan(keep_ids=False):
 
 class PlanContext(object):
     _context = None
+    _context_lock = threading.Lock()
     
     def __new__(cls):
         if cls._context is None:
-            print('creating new PlanContext')
-            cls._context = super(PlanContext, cls).__new__(cls)
-            cls._context.default_plan = None
+            with cls._context_lock:
+                if cls._context is None:
+                    context = super(PlanContext, cls).__new__(cls)
+                    context.default_plan = None
+                    cls._context = context
         return cls._context
         
     @property
     def default_plan(self) -> Plan:
-        return self._default_plan
+        """The plan active in this context (see Plan.active), else the process default."""
+        plan = _active_plan.get()
+        return plan if plan is not None else self._default_plan
     
     @default_plan.setter
     def default_plan(self, new_plan):
@@ -0,0 +1,120 @@
+"""Critical path and float analysis.
+
+One forward pass (earliest dates, as in utils.schedule) and one backward
+pass (latest dates) over the topological order, both in working-day
+indexes of the plan calendar, so the whole analysis is O(items + edges).
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+
+from notjira.base import extra_working_days
+from notjira.context import PlanContext
+from notjira.toposort import topological_sort
+from notjira.work_calendar import as_date
+
+# Dates are inclusive working days; floats are counted in working days.
+ItemFloat = namedtuple('ItemFloat', [
+    'earliest_start', 'earliest_finish', 'latest_start', 'latest_finish',
+    'total_float', 'free_float'])
+
+
+class CriticalPath:
+    """Result of critical_path()."""
+
+    def __init__(self, floats, critical, chain, finish):
+        self.floats = floats
+        self.critical = critical
+        self.chain = chain
+        self.finish = finish
+
+    def __repr__(self):
+        names = ' -> '.join(str(x.name) for x in self.chain)
+        return f"<CriticalPath finish {self.finish}: {names}>"
+
+    def __getitem__(self, item_or_id):
+        return self.floats[getattr(item_or_id, 'id', item_or_id)]
+
+
+def critical_path(plan=None, start_date=None):
+    """Compute earliest/latest dates, total and free float for every item.
+
+    ``due_date`` is treated as a deadline: an item must finish on or before
+    its last working day up to the due date, which can make floats negative.
+
+    Returns: CriticalPath with
+        floats: dict id -> ItemFloat
+        critical: items with the smallest total float, in topological order
+        chain: one dependency chain through critical items, first to last
+        finish: earliest project finish date
+    """
+    if plan is None:
+        plan = PlanContext().default_plan
+    if start_date is None:
+        start_date = date.today()
+    calendar = plan.calendar
+    ordered = topological_sort(plan.items(), dependents=plan.dependents)
+    if not ordered:
+        return CriticalPath({}, [], [], None)
+
+    first = calendar.index(calendar.next_working_day(start_date))
+    duration = {}
+    es, ef = {}, {}
+    for item in ordered:
+        n = item.id
+        start = first
+        for d in item.depends:
+            if d in ef and ef[d] + 1 > start:
+                start = ef[d] + 1
+        duration[n] = 0 if item.estimate is None else extra_working_days(item.estimate.hours)
+        es[n] = start
+        ef[n] = start + duration[n]
+    finish = max(ef.values())
+
+    ls, lf = {}, {}
+    for item in reversed(ordered):
+        n = item.id
+        latest = finish
+        for m in plan.dependents(n):
+            if m in ls and ls[m] - 1 < latest:
+                latest = ls[m] - 1
+        due = as_date(item.due_date)
+        if due is not None:
+            # last working day on or before the due date
+            latest = min(latest, calendar.index(due + timedelta(days=1)) - 1)
+        lf[n] = latest
+        ls[n] = latest - duration[n]
+
+    dates = {}
+
+    def to_date(index):
+        day = dates.get(index)
+        if day is None:
+            day = dates[index] = calendar.from_index(index)
+        return day
+
+    floats = {}
+    for item in ordered:
+        n = item.id
+        successors = [es[m] for m in plan.dependents(n) if m in es]
+        total = ls[n] - es[n]
+        free = (min(successors) - 1 if successors else finish) - ef[n]
+        # a deadline can leave less total float than successors allow
+        free = min(free, total)
+        floats[n] = ItemFloat(to_date(es[n]), to_date(ef[n]), to_date(ls[n]), to_date(lf[n]),
+                              total, free)
+
+    slack = min(f.total_float for f in floats.values())
+    critical = [x for x in ordered if floats[x.id].total_float == slack]
+    # walk back from the latest finishing critical item through the
+    # dependencies that actually drive its start
+    tail = max(critical, key=lambda x: ef[x.id])
+    chain = [tail]
+    while True:
+        drivers = [d for d in chain[-1].depends
+                   if d in ef and ef[d] + 1 == es[chain[-1].id] and floats[d].total_float == slack]
+        if not drivers:
+            break
+        chain.append(plan.get_item(min(drivers)))
+    chain.reverse()
+    return CriticalPath(floats, critical, chain, to_date(finish))
@@ -0,0 +1,233 @@
+"""Monte Carlo completion forecasts.
+
+Estimates created with TimeEstimate.pert() or TimeEstimate.lognormal()
+carry a distribution; every other estimate is a fixed amount. A forecast
+draws a (items, samples) matrix of durations per distribution kind and
+pushes all samples through the topological levels at once (see
+numpy_engine.propagate), so there is no Python loop per sample or per
+item. Samples are processed in chunks that bound memory, and each chunk
+only adds to a per-item histogram of end days from which the percentiles
+are read.
+"""
+
+from datetime import date
+
+from notjira.base import extra_working_days
+from notjira.context import PlanContext
+from notjira.numpy_engine import _numpy, level_edges, plan_arrays, propagate, topological_levels
+from notjira.task import Epic
+from notjira.time_estimate import LogNormalEstimate, PertEstimate
+
+# sample matrix cells per chunk (int32, so ~40MB per matrix)
+_CHUNK_CELLS = 10_000_000
+# resolution of the PERT quantile tables, see _beta_quantiles
+_GRID = 4096
+
+
+class Forecast:
+    """Result of forecast().
+
+    ``items`` (tasks) and ``epics`` map an id to one completion date per
+    requested percentile; ``finish`` holds the same for the whole plan.
+    """
+
+    def __init__(self, percentiles, samples, items, epics, finish):
+        self.percentiles = percentiles
+        self.samples = samples
+        self.items = items
+        self.epics = epics
+        self.finish = finish
+
+    def __repr__(self):
+        spread = ', '.join(f"P{q}={d}" for q, d in zip(self.percentiles, self.finish))
+        return f"<Forecast {self.samples} samples: {spread}>"
+
+    def __getitem__(self, item_or_id):
+        """Return {percentile: completion date} for an item or epic."""
+        item_id = getattr(item_or_id, 'id', item_or_id)
+        dates = self.epics.get(item_id) or self.items[item_id]
+        return dict(zip(self.percentiles, dates))
+
+
+def _beta_quantiles(np, a, b):
+    """Quantile tables of beta(a, b), one row of _GRID values per shape.
+
+    rng.beta is several times slower than a uniform draw, so PERT samples
+    are taken by inverse transform: the CDF is integrated numerically on a
+    grid and uniform integers index its quantiles.
+    """
+    x = (np.arange(_GRID) + 0.5) / _GRID
+    tables = np.empty((len(a), _GRID))
+    # a block of shapes at a time keeps the CDF matrix small
+    for lo in range(0, len(a), 256):
+        hi = min(lo + 256, len(a))
+        cdf = np.cumsum(np.exp(np.outer(a[lo:hi] - 1, np.log(x)) + np.outer(b[lo:hi] - 1, np.log1p(-x))), axis=1)
+        cdf /= cdf[:, -1:]
+        # invert every row in one search by lifting row i into [2i, 2i + 1]
+        lift = 2 * np.arange(hi - lo)[:, None]
+        pos = (np.searchsorted((cdf + lift).ravel(), (x + lift).ravel())
+               - np.repeat(np.arange(hi - lo) * _GRID, _GRID))
+        tables[lo:hi] = x[np.minimum(pos, _GRID - 1)].reshape(hi - lo, _GRID)
+    return tables
+
+
+class _Sampler:
+    """Draws (items, samples) matrices of extra working days, int32."""
+
+    def __init__(self, np, estimates):
+        self._np = np
+        self._n = len(estimates)
+        pert, lognormal, fixed = [], [], []
+        for row, estimate in enumerate(estimates):
+            if isinstance(estimate, PertEstimate):
+                pert.append(row)
+            elif isinstance(estimate, LogNormalEstimate):
+                lognormal.append(row)
+            elif estimate is not None:
+                fixed.append(row)
+        self._pert = pert
+        if pert:
+            low, likely, high = (np.array([[getattr(estimates[r], f)] for r in pert])
+                                 for f in ('low', 'likely', 'high'))
+            spread = high - low
+            # a zero spread is a fixed value; keep the beta parameters finite
+            safe = np.where(spread > 0, spread, 1)
+            shapes, shape_rows = np.unique(np.hstack(((likely - low) / safe, (high - likely) / safe)),
+                                           axis=0, return_inverse=True)
+            self._tables = _beta_quantiles(np, 1 + 4 * shapes[:, 0], 1 + 4 * shapes[:, 1])
+            self._shape_rows = shape_rows.reshape(-1, 1)
+            self._low, self._spread = low, spread
+        self._lognormal = lognormal
+        if lognormal:
+            self._mu = np.array([[estimates[r].mu] for r in lognormal], dtype=np.float32)
+            self._sigma = np.array([[estimates[r].sigma] for r in lognormal], dtype=np.float32)
+        self._fixed = fixed
+        if fixed:
+            self._fixed_days = extra_working_days(np.array([[estimates[r].hours] for r in fixed], dtype=float))
+
+    def draw(self, rng, samples):
+        np = self._np
+        durations = np.zeros((self._n, samples), dtype=np.int32)
+        if self._pert:
+            hours = self._tables[self._shape_rows,
+                                 rng.integers(0, _GRID, (len(self._pert), samples), dtype=np.int16)]
+            hours *= self._spread
+            hours += self._low
+            durations[self._pert] = extra_working_days(hours)
+        if self._lognormal:
+            # exp(mu + sigma * z) is much cheaper than broadcasting rng.lognormal
+            hours = rng.standard_normal((len(self._lognormal), samples), dtype=np.float32)
+            hours *= self._sigma
+            hours += self._mu
+            np.exp(hours, out=hours)
+            durations[self._lognormal] = extra_working_days(hours)
+        if self._fixed:
+            durations[self._fixed] = self._fixed_days
+        return durations
+
+
+def _epic_rows(plan, row_of):
+    """Return (epic ids, member rows, group starts) with nested epics flattened."""
+    leaves = {}
+
+    def collect(epic):
+        rows = leaves.get(epic.id)
+        if rows is None:
+            rows = leaves[epic.id] = []
+            for member in epic.tasks:
+                if isinstance(member, Epic):
+                    rows.extend(collect(member))
+                elif member.id in row_of:
+                    rows.append(row_of[member.id])
+        return rows
+
+    epic_ids, members, starts = [], [], []
+    for item in plan.items():
+        if isinstance(item, Epic):
+            rows = collect(item)
+            if rows:
+                epic_ids.append(item.id)
+                starts.append(len(members))
+                members.extend(rows)
+    return epic_ids, members, starts
+
+
+def forecast(plan=None, start_date=None, samples=10000, percentiles=(50, 85, 95), seed=None):
+    """Sample the plan's schedule and return completion date percentiles.
+
+    Dependencies and working days follow utils.schedule(); only the
+    durations vary between samples. A percentile is the first date by
+    which that share of the samples had finished. Epics are not sampled
+    themselves: they finish with the last of their tasks (nested epics
+    included), and the plan finishes with its last task.
+
+    Args:
+        plan: Plan instance or None for default
+        start_date: date to begin (defaults to today)
+        samples: number of sampled schedules
+        percentiles: completion percentiles to report
+        seed: seed for numpy.random.default_rng, for reproducible forecasts
+    Returns: Forecast
+    Raises: CycleError if dependencies form a cycle
+    """
+    np = _numpy()
+    if plan is None:
+        plan = PlanContext().default_plan
+    if start_date is None:
+        start_date = date.today()
+    calendar = plan.calendar
+    first = calendar.index(calendar.next_working_day(start_date))
+    rng = np.random.default_rng(seed)
+    with plan.lock:
+        items = plan.items()
+        ids, _, src, dep = plan_arrays(plan)
+        levels = topological_levels(ids, src, dep)
+        edges = level_edges(levels, src, dep)
+        epic_mask = np.fromiter((isinstance(x, Epic) for x in items), bool, len(items))
+        # an epic's own estimate is its tasks' sum; it takes no time of its own
+        sampler = _Sampler(np, [None if is_epic else x.estimate for x, is_epic in zip(items, epic_mask)])
+        row_of = {item_id: row for row, item_id in enumerate(ids.tolist())}
+        epic_ids, members, group_starts = _epic_rows(plan, row_of)
+    n = len(items)
+    task_rows = np.flatnonzero(~epic_mask)
+    if not len(task_rows):
+        return Forecast(tuple(percentiles), samples, {}, {}, ())
+
+    # rows: items, then epics, then the whole plan
+    total_rows = n + len(epic_ids) + 1
+    members = np.array(members, dtype=np.int64)
+    group_starts = np.array(group_starts, dtype=np.int64)
+    counts = np.zeros((total_rows, 0), dtype=np.int64)
+    chunk = max(1, min(samples, _CHUNK_CELLS // n))
+    done = 0
+    while done < samples:
+        size = min(chunk, samples - done)
+        _, ef = propagate(levels, edges, sampler.draw(rng, size), first)
+        ends = [ef]
+        if len(epic_ids):
+            ends.append(np.maximum.reduceat(ef[members], group_starts, axis=0))
+        ends.append((ef[task_rows] if len(task_rows) < n else ef).max(axis=0, keepdims=True))
+        days = np.concatenate(ends) - first
+        width = int(days.max()) + 1
+        if width > counts.shape[1]:
+            counts = np.pad(counts, ((0, 0), (0, width - counts.shape[1])))
+        width = counts.shape[1]
+        flat = (np.arange(total_rows, dtype=np.int64)[:, None] * width + days).ravel()
+        counts += np.bincount(flat, minlength=total_rows * width).reshape(total_rows, width)
+        done += size
+
+    cumulative = np.cumsum(counts, axis=1)
+    by_row = []
+    for q in percentiles:
+        # samples that must have finished, at least one
+        needed = max(1, -(-q * samples // 100))
+        by_row.append((cumulative < needed).sum(axis=1))
+    by_row = np.stack(by_row, axis=1) + first
+    to_date = {}
+    for i in np.unique(by_row).tolist():
+        to_date[i] = calendar.from_index(i)
+    rows = [tuple(to_date[i] for i in row) for row in by_row.tolist()]
+    id_list = ids.tolist()
+    item_dates = {id_list[row]: rows[row] for row in task_rows.tolist()}
+    epic_dates = dict(zip(epic_ids, rows[n:n + len(epic_ids)]))
+    return Forecast(tuple(percentiles), samples, item_dates, epic_dates, rows[-1])
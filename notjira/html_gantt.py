@@ -0,0 +1,335 @@
+"""Interactive HTML Gantt export.
+
+gantt_html() writes one self-contained HTML file: the schedule as a
+compact JSON payload followed by a small viewer script. The viewer draws
+only the rows and dates on screen into SVG, so plans with 100k rows open
+and scroll as fast as small ones. It zooms (ctrl+wheel, +/-), pans (drag,
+shift+wheel) and collapses epics (click the row label).
+
+Rows are written in epic order: each epic, using its window from
+Plan.epic_windows(), followed by its members sorted by start. They are
+streamed to the file in chunks of ``chunk_size`` rows, each one a
+<script type="application/json"> block holding columns:
+
+    id      item ids
+    name    item names
+    start   start day, as the difference to the previous row's start
+            (the first row of a chunk: to meta.base, a Unix epoch day)
+    dur     end - start in days
+    parent  row index minus the row index of the enclosing epic, 0 for none
+    est     index into meta.estimates
+    epics   offsets of the epic rows in the chunk
+
+A last block, nj-meta, holds the title, row count, base and today as
+Unix epoch days, and the estimate texts.
+"""
+
+import json
+from datetime import date
+from html import escape
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from . import instrument
+from .context import PlanContext
+from .task import Epic
+from .utils import schedule
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def _json(value):
+    # keeps "</script>" in a name from ending the block
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('<', '\\u003c')
+
+
+def _tree_rows(plan, start_date, epic_only, window, rows):
+    """Return [(item, start, end, parent row or -1)] in epic order."""
+    windows = plan.epic_windows()
+    kept = {}
+    for item, s, e in schedule(plan, start_date):
+        if isinstance(item, Epic):
+            s, e = windows.get(item.id, (s, e))
+        elif epic_only:
+            continue
+        if window is not None and (s > window[1] or e < window[0]):
+            continue
+        if rows is not None and not rows(item):
+            continue
+        kept[item.id] = (item, s, e)
+    epic_of = plan.epic_of
+    children = {}
+    for item_id, entry in kept.items():
+        parent = epic_of(item_id)
+        # rows filtered out hand their members to the nearest kept epic
+        while parent is not None and parent not in kept:
+            parent = epic_of(parent)
+        children.setdefault(parent, []).append(entry)
+    for members in children.values():
+        members.sort(key=lambda x: (x[1], x[0].name))
+    out = []
+    stack = [(iter(children.get(None, ())), -1)]
+    while stack:
+        entry = next(stack[-1][0], None)
+        if entry is None:
+            stack.pop()
+            continue
+        out.append(entry + (stack[-1][1],))
+        members = children.get(entry[0].id)
+        if members:
+            stack.append((iter(members), len(out) - 1))
+    return out
+
+
+def _write_chunks(out, tree, chunk_size, estimates):
+    base = min((s for _, s, _, _ in tree), default=date.today()).toordinal()
+    for first in range(0, len(tree), chunk_size):
+        ids, names, starts, durs, parents, ests, epics = [], [], [], [], [], [], []
+        previous = base
+        for offset, (item, s, e, parent) in enumerate(tree[first:first + chunk_size]):
+            row = first + offset
+            ordinal = s.toordinal()
+            ids.append(item.id)
+            names.append(item.name)
+            starts.append(ordinal - previous)
+            durs.append(e.toordinal() - ordinal)
+            parents.append(0 if parent < 0 else row - parent)
+            ests.append(estimates.setdefault(str(item.estimate), len(estimates)))
+            if isinstance(item, Epic):
+                epics.append(offset)
+            previous = ordinal
+        out.write('<script type="application/json" class="nj-rows">')
+        out.write(_json({'id': ids, 'name': names, 'start': starts, 'dur': durs,
+                         'parent': parents, 'est': ests, 'epics': epics}))
+        out.write('</script>\n')
+    return base
+
+
+def gantt_html(plan=None, start_date: Optional[date] = None, filename: str = "gantt.html",
+               epic_only: bool = False, window: Optional[Tuple[date, date]] = None,
+               rows: Optional[Callable] = None, title: str = 'Plan Gantt', collapsed: bool = False,
+               chunk_size: int = 10000):
+    """Write an interactive, self-contained HTML Gantt chart of the plan.
+
+    Args:
+        window: (first, last) dates; only rows overlapping it are exported
+        rows: callable(item) -> bool selecting the rows to export
+        collapsed: open the chart with every epic collapsed
+        chunk_size: rows per JSON block written to the file
+
+    Returns: the Path written
+    """
+    if plan is None:
+        plan = PlanContext().default_plan
+    with instrument.phase('html.prepare') as span:
+        tree = _tree_rows(plan, start_date, epic_only, window, rows)
+        span.set(items=len(tree))
+    out_path = Path(filename)
+    with instrument.phase('html.write', items=len(tree)), \
+            open(out_path, 'w', encoding='utf-8', newline='\n') as out:
+        out.write(_HEAD.replace('__TITLE__', escape(title)))
+        estimates = {}
+        base = _write_chunks(out, tree, chunk_size, estimates)
+        meta = {'title': title, 'rows': len(tree), 'base': base - _EPOCH,
+                'today': date.today().toordinal() - _EPOCH, 'estimates': list(estimates),
+                'collapsed': collapsed}
+        out.write(f'<script type="application/json" id="nj-meta">{_json(meta)}</script>\n')
+        out.write(_VIEWER)
+    return out_path
+
+
+__all__ = ["gantt_html"]
+
+
+_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  body { margin: 0; font: 12px sans-serif; color: #222; }
+  #nj-bar { display: flex; gap: 6px; align-items: center; padding: 6px 8px; border-bottom: 1px solid #ccc; }
+  #nj-bar b { margin-right: 12px; }
+  #nj-info { margin-left: auto; color: #666; }
+  #nj-axis { display: block; height: 24px; border-bottom: 1px solid #ccc; }
+  #nj-scroll { position: relative; overflow-y: auto; overflow-x: hidden; height: calc(100vh - 62px); }
+  #nj-rows { position: absolute; left: 0; }
+  .nj-label { cursor: default; }
+  .nj-epic .nj-label { cursor: pointer; font-weight: bold; }
+  .nj-bar { fill: #4c78a8; }
+  .nj-epic .nj-bar { fill: #72b7b2; }
+  .nj-est { fill: #555; font-size: 10px; }
+  .nj-grid { stroke: #eee; }
+  .nj-today { stroke: red; stroke-dasharray: 4 3; }
+</style>
+</head>
+<body>
+<div id="nj-bar"><b>__TITLE__</b>
+  <button id="nj-out" title="Zoom out (-)">&minus;</button>
+  <button id="nj-in" title="Zoom in (+)">+</button>
+  <button id="nj-fit" title="Fit dates (0)">Fit</button>
+  <button id="nj-collapse">Collapse all</button>
+  <button id="nj-expand">Expand all</button>
+  <span id="nj-info"></span>
+</div>
+<svg id="nj-axis"></svg>
+<div id="nj-scroll"><div id="nj-spacer"></div><svg id="nj-rows"></svg></div>
+"""
+
+_VIEWER = """<script>
+(function () {
+  'use strict';
+  var ROW = 20, LABEL = 260, DAY = 864e5;
+  var meta = JSON.parse(document.getElementById('nj-meta').textContent);
+  var n = meta.rows;
+  var start = new Int32Array(n), end = new Int32Array(n), parent = new Int32Array(n);
+  var depth = new Uint8Array(n), isEpic = new Uint8Array(n), est = new Int32Array(n);
+  var ids = new Int32Array(n), names = new Array(n), subtreeEnd = new Int32Array(n);
+  var collapsed = new Uint8Array(n);
+  var i = 0, lo = Infinity, hi = -Infinity;
+  document.querySelectorAll('script.nj-rows').forEach(function (el) {
+    var c = JSON.parse(el.textContent), s = meta.base, first = i;
+    for (var k = 0; k < c.id.length; k++, i++) {
+      s += c.start[k];
+      start[i] = s; end[i] = s + c.dur[k];
+      parent[i] = c.parent[k] ? i - c.parent[k] : -1;
+      depth[i] = parent[i] < 0 ? 0 : Math.min(depth[parent[i]] + 1, 255);
+      ids[i] = c.id[k]; names[i] = c.name[k]; est[i] = c.est[k];
+      if (s < lo) lo = s;
+      if (end[i] > hi) hi = end[i];
+    }
+    c.epics.forEach(function (k) { isEpic[first + k] = 1; });
+    el.textContent = '';
+  });
+  if (!n) { lo = hi = meta.today; }
+  // rows are in epic order, so a subtree is the contiguous run [i, subtreeEnd[i])
+  for (i = 0; i < n; i++) subtreeEnd[i] = i + 1;
+  for (i = n - 1; i >= 0; i--) {
+    if (parent[i] >= 0 && subtreeEnd[i] > subtreeEnd[parent[i]]) subtreeEnd[parent[i]] = subtreeEnd[i];
+  }
+  if (meta.collapsed) collapsed.set(isEpic);
+
+  var scroll = document.getElementById('nj-scroll'), spacer = document.getElementById('nj-spacer');
+  var svg = document.getElementById('nj-rows'), axis = document.getElementById('nj-axis');
+  var info = document.getElementById('nj-info');
+  var visible = new Int32Array(n), shown = 0, x0 = lo, scale = 1, pending = false;
+
+  function relayout() {
+    shown = 0;
+    for (var r = 0; r < n; r = collapsed[r] ? subtreeEnd[r] : r + 1) visible[shown++] = r;
+    spacer.style.height = shown * ROW + 'px';
+    info.textContent = shown + ' of ' + n + ' rows';
+    redraw();
+  }
+  function fit() {
+    x0 = lo - 1;
+    scale = Math.max((scroll.clientWidth - LABEL) / (hi - lo + 3), 0.01);
+    redraw();
+  }
+  function zoom(factor, atX) {
+    var day = x0 + (atX - LABEL) / scale;
+    scale = Math.min(Math.max(scale * factor, 0.01), 400);
+    x0 = day - (atX - LABEL) / scale;
+    redraw();
+  }
+  function redraw() {
+    if (!pending) { pending = true; requestAnimationFrame(draw); }
+  }
+  function esc(s) {
+    return String(s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+  }
+  function iso(day) { return new Date(day * DAY).toISOString().slice(0, 10); }
+  function ticks(width) {
+    var steps = [1, 2, 7, 14, 28, 91, 182, 364, 728, 1820], step = steps[steps.length - 1];
+    for (var k = 0; k < steps.length; k++) if (steps[k] * scale >= 90) { step = steps[k]; break; }
+    var out = [], last = x0 + (width - LABEL) / scale;
+    for (var d = Math.ceil(x0 / step) * step; d <= last; d += step) out.push(d);
+    return out;
+  }
+  function draw() {
+    pending = false;
+    var width = scroll.clientWidth, height = scroll.clientHeight;
+    var first = Math.floor(scroll.scrollTop / ROW), last = Math.min(shown, first + Math.ceil(height / ROW) + 1);
+    var d0 = x0, d1 = x0 + (width - LABEL) / scale, grid = ticks(width), parts = [], head = [];
+    parts.push('<defs><clipPath id="nj-lc"><rect width="' + (LABEL - 6) + '" height="100%"/></clipPath>' +
+               '<clipPath id="nj-bc"><rect x="' + LABEL + '" width="' + (width - LABEL) + '" height="100%"/></clipPath></defs>');
+    parts.push('<g clip-path="url(#nj-bc)">');
+    grid.forEach(function (d) {
+      var x = LABEL + (d - x0) * scale;
+      parts.push('<line class="nj-grid" x1="' + x + '" x2="' + x + '" y2="' + (last - first) * ROW + '"/>');
+      head.push('<line class="nj-grid" x1="' + x + '" x2="' + x + '" y2="24"/><text x="' + (x + 3) + '" y="16">' + iso(d) + '</text>');
+    });
+    if (meta.today >= d0 && meta.today <= d1) {
+      var tx = LABEL + (meta.today - x0) * scale;
+      parts.push('<line class="nj-today" x1="' + tx + '" x2="' + tx + '" y2="' + (last - first) * ROW + '"/>');
+    }
+    parts.push('</g>');
+    for (var r = first; r < last; r++) {
+      var i = visible[r], y = (r - first) * ROW;
+      parts.push('<g class="nj-row' + (isEpic[i] ? ' nj-epic' : '') + '" transform="translate(0,' + y + ')">');
+      parts.push('<text class="nj-label" data-row="' + i + '" clip-path="url(#nj-lc)" x="' + (4 + depth[i] * 12) + '" y="14">' +
+                 (isEpic[i] ? (collapsed[i] ? '\\u25b8 ' : '\\u25be ') : '') + esc(names[i]) + '</text>');
+      if (end[i] >= d0 && start[i] <= d1) {
+        var x = LABEL + (Math.max(start[i], d0 - 1) - x0) * scale;
+        var w = Math.max((Math.min(end[i], d1 + 1) + 1 - Math.max(start[i], d0 - 1)) * scale, 2);
+        parts.push('<g clip-path="url(#nj-bc)"><rect class="nj-bar" x="' + x + '" y="4" width="' + w + '" height="12">' +
+                   '<title>#' + ids[i] + ' ' + esc(names[i]) + '\\n' + iso(start[i]) + ' \\u2013 ' + iso(end[i]) +
+                   ' (' + esc(meta.estimates[est[i]]) + ')</title></rect>');
+        if (w > 40) parts.push('<text class="nj-est" x="' + (Math.max(x, LABEL) + 3) + '" y="14">' + esc(meta.estimates[est[i]]) + '</text>');
+        parts.push('</g>');
+      }
+      parts.push('</g>');
+    }
+    svg.setAttribute('width', width);
+    svg.setAttribute('height', (last - first) * ROW);
+    svg.style.top = first * ROW + 'px';
+    svg.innerHTML = parts.join('');
+    axis.setAttribute('width', width);
+    axis.innerHTML = '<g clip-path="url(#nj-ac)"><defs><clipPath id="nj-ac"><rect x="' + LABEL + '" width="' +
+                     (width - LABEL) + '" height="24"/></clipPath></defs>' + head.join('') + '</g>';
+  }
+
+  scroll.addEventListener('scroll', redraw);
+  window.addEventListener('resize', redraw);
+  scroll.addEventListener('wheel', function (ev) {
+    var rect = scroll.getBoundingClientRect();
+    if (ev.ctrlKey) {
+      ev.preventDefault();
+      zoom(ev.deltaY < 0 ? 1.25 : 0.8, ev.clientX - rect.left);
+    } else if (ev.shiftKey || Math.abs(ev.deltaX) > Math.abs(ev.deltaY)) {
+      ev.preventDefault();
+      x0 += (ev.shiftKey ? ev.deltaY : ev.deltaX) / scale;
+      redraw();
+    }
+  }, {passive: false});
+  var dragX = null;
+  scroll.addEventListener('mousedown', function (ev) { if (ev.target.tagName !== 'text') dragX = ev.clientX; });
+  window.addEventListener('mouseup', function () { dragX = null; });
+  window.addEventListener('mousemove', function (ev) {
+    if (dragX === null) return;
+    x0 -= (ev.clientX - dragX) / scale;
+    dragX = ev.clientX;
+    redraw();
+  });
+  svg.addEventListener('click', function (ev) {
+    var row = ev.target.getAttribute('data-row');
+    if (row !== null && isEpic[+row]) { collapsed[+row] ^= 1; relayout(); }
+  });
+  document.addEventListener('keydown', function (ev) {
+    var middle = LABEL + (scroll.clientWidth - LABEL) / 2;
+    if (ev.key === '+' || ev.key === '=') zoom(1.25, middle);
+    else if (ev.key === '-') zoom(0.8, middle);
+    else if (ev.key === '0') fit();
+  });
+  document.getElementById('nj-in').onclick = function () { zoom(1.25, LABEL + (scroll.clientWidth - LABEL) / 2); };
+  document.getElementById('nj-out').onclick = function () { zoom(0.8, LABEL + (scroll.clientWidth - LABEL) / 2); };
+  document.getElementById('nj-fit').onclick = fit;
+  document.getElementById('nj-collapse').onclick = function () { collapsed.set(isEpic); relayout(); };
+  document.getElementById('nj-expand').onclick = function () { collapsed.fill(0); relayout(); };
+  fit();
+  relayout();
+})();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,145 @@
+"""Streaming bulk import of tracker dumps.
+
+Rows are plain dicts, e.g. from iter_csv() or iter_jsonl():
+
+    id          external key other rows refer to (optional)
+    name        item name
+    estimate    '4h', '2d', '1w' ... (optional)
+    depends     keys this row depends on: a list or a 'a;b' string
+    due_date    ISO date (optional)
+    epic        key of the epic row this task belongs to (optional)
+    type        'task' (default) or 'epic'
+    status      BaseStatus name or value (optional)
+    assignee    person or resource doing a task (optional)
+
+Items are built with Base.restore and registered batch by batch; edges are
+added without per-edge cycle checks and the imported subgraph is
+validated by a single topological pass at the end.
+"""
+
+import csv
+import json
+import re
+from functools import partial
+
+from notjira.base import BaseStatus
+from notjira.task import Epic, Task
+from notjira.time_estimate import TimeEstimate
+from notjira.toposort import topological_sort
+from notjira.utils import gc_paused
+from notjira.work_calendar import as_date
+
+_KEY_SPLIT = re.compile(r'[;,\s]+')
+_STATUSES = {}
+for _status in BaseStatus:
+    _STATUSES[_status.name.lower()] = _status
+    _STATUSES[str(_status.value).lower()] = _status
+
+
+def iter_csv(path, delimiter=','):
+    """Yield one dict per CSV row (header row gives the keys)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+
+def iter_jsonl(path):
+    """Yield one dict per non-empty line of a JSON Lines file."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _keys(value):
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return [k for k in _KEY_SPLIT.split(value) if k]
+    return [str(k) for k in value]
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_import(plan, rows, batch_size=10000, progress=None):
+    """Stream ``rows`` into ``plan`` and return a dict of row key -> item id.
+
+    Only the current batch and the key map are held besides the items
+    themselves. If the rows reference an unknown key or form a cycle,
+    every imported item is removed again and the error is raised.
+
+    Args:
+        plan: Plan to import into
+        rows: iterable of dicts, see the module docstring
+        batch_size: rows parsed and registered per batch
+        progress: optional callable(imported_count) run after each batch
+    """
+    keys = {}
+    imported = []
+    pending = []    # (item_id, dependency key) not resolvable yet
+    members = {}    # epic key -> [task ids]
+    try:
+        with gc_paused():
+            for batch in _batches(rows, batch_size):
+                # parse each distinct estimate string once per batch
+                estimates = {}
+                for row in batch:
+                    value = row.get('estimate')
+                    if value and value not in estimates:
+                        estimates[value] = TimeEstimate.auto(value)
+                for row in batch:
+                    depends = set()
+                    unresolved = []
+                    for key in _keys(row.get('depends')):
+                        dep_id = keys.get(key)
+                        if dep_id is None:
+                            unresolved.append(key)
+                        else:
+                            depends.add(dep_id)
+                    status = row.get('status')
+                    if str(row.get('type') or 'task').lower() == 'epic':
+                        restore = Epic.restore
+                    else:
+                        restore = partial(Task.restore, assignee=row.get('assignee') or None)
+                    item = restore(
+                        name=row.get('name'),
+                        depends=depends,
+                        estimate=estimates.get(row.get('estimate')),
+                        due_date=as_date(row.get('due_date') or None),
+                        status=_STATUSES[str(status).lower()] if status else BaseStatus.OPEN)
+                    plan.register_item(item)
+                    imported.append(item.id)
+                    if row.get('id') not in (None, ''):
+                        keys[str(row['id'])] = item.id
+                    for key in unresolved:
+                        pending.append((item.id, key))
+                    epic_key = row.get('epic')
+                    if epic_key not in (None, ''):
+                        members.setdefault(str(epic_key), []).append(item.id)
+                if progress is not None:
+                    progress(len(imported))
+            for item_id, key in pending:
+                if key not in keys:
+                    raise ValueError(f"Unknown dependency key {key!r} for item {item_id}")
+                plan.add_dependency(item_id, keys[key], check_cycle=False)
+            for key, task_ids in members.items():
+                epic = plan.get_item(keys[key]) if key in keys else None
+                if not isinstance(epic, Epic):
+                    raise ValueError(f"Unknown epic key {key!r}")
+                epic.tasks = epic.tasks + [plan.get_item(i) for i in task_ids]
+                epic.recalculate_estimate()
+            # one pass over the new subgraph; old items never depend on new ones
+            topological_sort([plan.get_item(i) for i in imported], dependents=plan.dependents)
+    except BaseException:
+        for item_id in reversed(imported):
+            plan.deregister_item(item_id)
+        raise
+    return keys
@@ -0,0 +1,222 @@
+"""Opt-in instrumentation of scheduling and rendering.
+
+Nothing is recorded until a sink is added. Instrumented code opens phases
+with phase(), which times the block, counts the net memory blocks it
+allocated (sys.getallocatedblocks) and hands the numbers to every sink,
+and bumps per-call counters with count():
+
+    from notjira import instrument
+
+    stats = instrument.StatsSink()
+    with instrument.instrumented(stats):
+        gantt_matplotlib(plan)
+    print(stats.summary())
+
+Without sinks phase() returns a shared no-op object and hot paths test
+``instrument.active`` before counting, so the cost is one attribute check.
+
+Phases: 'schedule' (with 'schedule.toposort' and 'schedule.propagate'
+for the incremental scheduler), 'chart.prepare', 'chart.aggregate_epics',
+'chart.plot', 'chart.save' and 'gantt_ascii'. Counters: 'register_item'
+and 'add_dependency'.
+"""
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+# True while at least one sink is installed; checked by hot paths.
+active = False
+_sinks = []
+
+
+class _Phase:
+    __slots__ = ('name', 'counts', '_start', '_blocks')
+
+    def __init__(self, name, counts):
+        self.name = name
+        self.counts = counts
+
+    def __enter__(self):
+        self._blocks = sys.getallocatedblocks()
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = perf_counter() - self._start
+        self.counts['allocations'] = sys.getallocatedblocks() - self._blocks
+        for sink in _sinks:
+            sink.phase(self.name, seconds, self.counts)
+        return False
+
+    def set(self, **counts):
+        """Record item/edge/... counts known only inside the block."""
+        self.counts.update(counts)
+
+
+class _NoPhase:
+    """Stand-in while instrumentation is off; falsy, so callers can skip
+    computing counts nobody records."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **counts):
+        pass
+
+    def __bool__(self):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name, **counts):
+    """Return a context manager recording the wall time of a phase."""
+    if not active:
+        return _NO_PHASE
+    return _Phase(name, counts)
+
+
+def count(name, value=1):
+    """Add ``value`` to the counter ``name`` in every sink."""
+    for sink in _sinks:
+        sink.count(name, value)
+
+
+def add_sink(sink):
+    global active
+    _sinks.append(sink)
+    active = True
+
+
+def remove_sink(sink):
+    global active
+    _sinks.remove(sink)
+    active = bool(_sinks)
+
+
+@contextmanager
+def instrumented(*sinks):
+    """Install ``sinks`` for the duration of a ``with`` block."""
+    for sink in sinks:
+        add_sink(sink)
+    try:
+        yield sinks[0] if len(sinks) == 1 else sinks
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
+
+
+# -- sinks ------------------------------------------------------------------
+# A sink has phase(name, seconds, counts) and count(name, value).
+
+class LoggingSink:
+    """Log every phase (and, optionally, counter) to a logger."""
+
+    def __init__(self, logger=None, level=None, counters=False):
+        # logging is imported here so importing notjira stays cheap
+        import logging
+        self._logger = logger or logging.getLogger('notjira.instrument')
+        self._level = logging.DEBUG if level is None else level
+        self._counters = counters
+
+    def phase(self, name, seconds, counts):
+        if self._logger.isEnabledFor(self._level):
+            details = ' '.join(f"{k}={v}" for k, v in counts.items())
+            self._logger.log(self._level, "%s %.6fs %s", name, seconds, details)
+
+    def count(self, name, value):
+        if self._counters and self._logger.isEnabledFor(self._level):
+            self._logger.log(self._level, "%s +%s", name, value)
+
+
+class StatsSink:
+    """Aggregate phases and counters in memory.
+
+    summary() returns {'phases': {name: {'calls', 'seconds', 'min', 'max',
+    <count>: total}}, 'counters': {name: total}}.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._phases = {}
+            self._counters = {}
+
+    def phase(self, name, seconds, counts):
+        with self._lock:
+            stats = self._phases.get(name)
+            if stats is None:
+                stats = self._phases[name] = {'calls': 0, 'seconds': 0.0, 'min': seconds, 'max': seconds}
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['min'] = min(stats['min'], seconds)
+            stats['max'] = max(stats['max'], seconds)
+            for key, value in counts.items():
+                stats[key] = stats.get(key, 0) + value
+
+    def count(self, name, value):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def summary(self):
+        with self._lock:
+            return {'phases': {k: dict(v) for k, v in self._phases.items()},
+                    'counters': dict(self._counters)}
+
+
+class PrometheusSink(StatsSink):
+    """StatsSink that renders its totals in the Prometheus text format."""
+
+    def __init__(self, prefix='notjira'):
+        self._prefix = prefix
+        super().__init__()
+
+    def render(self):
+        p = self._prefix
+        summary = self.summary()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{p}_{name}{{{label_text}}} {value}")
+
+        phases = summary['phases']
+        family('phase_seconds_total', 'counter', "Wall time spent in each phase.",
+               [((('phase', n),), s['seconds']) for n, s in phases.items()])
+        family('phase_calls_total', 'counter', "Times each phase ran.",
+               [((('phase', n),), s['calls']) for n, s in phases.items()])
+        family('phase_count_total', 'counter', "Items and edges handled per phase.",
+               [((('phase', n), ('count', k)), v) for n, s in phases.items()
+                for k, v in s.items() if k not in ('calls', 'seconds', 'min', 'max', 'allocations')])
+        # a phase may free more blocks than it allocates, so this can go down
+        family('phase_allocated_blocks_delta', 'gauge',
+               "Net memory blocks allocated by each phase, summed over its calls.",
+               [((('phase', n),), s['allocations']) for n, s in phases.items() if 'allocations' in s])
+        family('events_total', 'counter', "Instrumented calls, e.g. register_item.",
+               [((('event', n),), v) for n, v in summary['counters'].items()])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write render() to ``path`` atomically (e.g. for a textfile collector)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
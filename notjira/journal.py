@@ -0,0 +1,482 @@
+"""Append-only journal of plan changes.
+
+A Journal listens to a plan (see Plan.add_listener) and records every
+change as a compact operation, a JSON-ready list such as
+``['add_dependency', 12, 7]``. Only inputs are recorded: dates computed by
+the schedulers and epic estimate roll-ups are derived from them again on
+replay.
+
+    journal = Journal(plan)                                # in memory
+    journal = Journal(plan, 'plan.journal', snapshot_every=10000)
+    with journal.group():
+        ...                                                # one undo step
+    journal.undo(); journal.redo()
+    journal.subscribe(lambda seq, op: ...)                 # deltas
+    copy = replay('plan.journal')                          # snapshot + tail
+    with recording(plan) as ops:                           # no journal needed
+        ...
+    revert(plan, ops)
+
+A file journal appends one ``[seq, *op]`` line per operation and keeps
+its latest snapshot next to it in ``<path>.snapshot``; an in-memory
+journal keeps the latest snapshot and the operations after it.
+
+Operations (ids are item ids, dates are ordinals or None):
+
+    ['register', id, item, epic id or None]
+    ['deregister', id, item, epic id or None]
+    ['add_dependency', id, dep_id]
+    ['remove_dependency', id, dep_id]
+    ['set', id, field, old, new]     field: estimate, status, name,
+                                     due_date, start_date or assignee
+    ['tasks', epic id, removed ids, appended ids]
+    ['calendar', old, new]           [workdays, holiday ordinals]
+    ['clear', keep_ids]
+    ['snapshot', id counter, calendar, [[id, item], ...]]
+
+An ``item`` is [kind, name, estimate, due_date, status, start_date,
+end_date, depends, assignee or epic member ids]; an estimate is None, its
+hours, ['pert', low, likely, high] or ['lognormal', mu, sigma, hours].
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from datetime import date
+
+from notjira.base import Base, BaseStatus
+from notjira.context import Plan
+from notjira.task import Epic, Task
+from notjira.time_estimate import LogNormalEstimate, PertEstimate, TimeEstimate
+from notjira.utils import gc_paused
+from notjira.work_calendar import WorkCalendar, as_date
+
+_KINDS = {'task': Task, 'epic': Epic, 'base': Base}
+_FIELDS = ('estimate', 'status', 'name', 'due_date', 'start_date', 'assignee')
+
+
+# -- encoding -----------------------------------------------------------------
+
+def _ordinal(value):
+    value = as_date(value)
+    return None if value is None else value.toordinal()
+
+
+def _date(ordinal):
+    return None if ordinal is None else date.fromordinal(ordinal)
+
+
+def _encode_estimate(estimate):
+    if estimate is None:
+        return None
+    if isinstance(estimate, PertEstimate):
+        return ['pert', estimate.low, estimate.likely, estimate.high]
+    if isinstance(estimate, LogNormalEstimate):
+        return ['lognormal', estimate.mu, estimate.sigma, estimate.hours]
+    return estimate.hours
+
+
+def _decode_estimate(value):
+    if value is None:
+        return None
+    if not isinstance(value, list):
+        return TimeEstimate.intern(value)
+    if value[0] == 'pert':
+        return PertEstimate(*value[1:])
+    # rebuilt from its parameters, low and high are not kept
+    return LogNormalEstimate.restore(*value[1:])
+
+
+def _encode_value(field, value):
+    if field == 'estimate':
+        return _encode_estimate(value)
+    if field == 'status':
+        return value.name
+    if field in ('due_date', 'start_date'):
+        return _ordinal(value)
+    return value
+
+
+def _decode_value(field, value):
+    if field == 'estimate':
+        return _decode_estimate(value)
+    if field == 'status':
+        return BaseStatus[value]
+    if field in ('due_date', 'start_date'):
+        return _date(value)
+    return value
+
+
+def _encode_item(item):
+    if isinstance(item, Epic):
+        kind, extra = 'epic', [t.id for t in item.tasks]
+    elif isinstance(item, Task):
+        kind, extra = 'task', item.assignee
+    else:
+        kind, extra = 'base', None
+    return [kind, item.name, _encode_estimate(item.estimate), _ordinal(item.due_date),
+            item.status.name, _ordinal(item.start_date), _ordinal(item.end_date),
+            sorted(item.depends), extra]
+
+
+def _decode_item(plan, fields, with_tasks=True):
+    kind, name, estimate, due, status, start, end, depends, extra = fields
+    cls = _KINDS[kind]
+    restored = dict(name=name, depends=set(depends), estimate=_decode_estimate(estimate),
+                    due_date=_date(due), status=BaseStatus[status], start_date=_date(start),
+                    end_date=_date(end))
+    if cls is Task:
+        restored['assignee'] = extra
+    elif cls is Epic and with_tasks:
+        restored['tasks'] = [plan.get_item(i) for i in extra if i in plan]
+    return cls.restore(**restored)
+
+
+def _encode_calendar(calendar):
+    return [list(calendar.workdays), [d.toordinal() for d in calendar.holidays]]
+
+
+def _decode_calendar(value):
+    return WorkCalendar(value[0], [date.fromordinal(d) for d in value[1]])
+
+
+def encode_snapshot(plan):
+    """Return the whole of ``plan`` as one 'snapshot' operation."""
+    with plan.lock:
+        items = sorted(plan.items(), key=lambda x: x.id)
+        return ['snapshot', plan._id_counter, _encode_calendar(plan.calendar),
+                [[x.id, _encode_item(x)] for x in items]]
+
+
+# -- applying -----------------------------------------------------------------
+
+def apply(plan, op):
+    """Apply one journal operation to ``plan``."""
+    kind = op[0]
+    if kind == 'register':
+        _, item_id, fields, epic_id = op
+        if epic_id is not None:
+            plan.add_epic_members(epic_id, [item_id])
+        plan.register_item(_decode_item(plan, fields), item_id)
+    elif kind == 'deregister':
+        plan.deregister_item(op[1])
+    elif kind == 'add_dependency':
+        plan.add_dependency(op[1], op[2])
+    elif kind == 'remove_dependency':
+        plan.remove_dependency(op[1], op[2])
+    elif kind == 'set':
+        _, item_id, field, _, new = op
+        setattr(plan.edit(item_id), field, _decode_value(field, new))
+    elif kind == 'tasks':
+        _, epic_id, removed, added = op
+        epic = plan.edit(epic_id)
+        removed = set(removed)
+        epic.tasks = [t for t in epic.tasks if t.id not in removed] + [plan.get_item(i) for i in added]
+    elif kind == 'calendar':
+        plan.calendar = _decode_calendar(op[2])
+    elif kind == 'clear':
+        plan.clear(keep_ids=op[1])
+    elif kind == 'snapshot':
+        _restore(plan, op)
+    else:
+        raise ValueError(f"Unknown journal operation {kind!r}")
+
+
+def _restore(plan, snapshot):
+    _, counter, calendar, entries = snapshot
+    plan.clear()
+    plan.calendar = _decode_calendar(calendar)
+    epics = []
+    for item_id, fields in entries:
+        item = _decode_item(plan, fields, with_tasks=False)
+        plan.register_item(item, item_id)
+        if isinstance(item, Epic):
+            epics.append((item, fields[-1]))
+    for epic, member_ids in epics:
+        epic.tasks = [plan.get_item(i) for i in member_ids if i in plan]
+    plan._id_counter = max(plan._id_counter, counter)
+
+
+def invert(op):
+    """Return the operation undoing ``op``."""
+    kind = op[0]
+    if kind == 'register':
+        return ['deregister', op[1], op[2], op[3]]
+    if kind == 'deregister':
+        return ['register', op[1], op[2], op[3]]
+    if kind == 'add_dependency':
+        return ['remove_dependency', op[1], op[2]]
+    if kind == 'remove_dependency':
+        return ['add_dependency', op[1], op[2]]
+    if kind == 'set':
+        return ['set', op[1], op[2], op[4], op[3]]
+    if kind == 'tasks':
+        return ['tasks', op[1], op[3], op[2]]
+    if kind == 'calendar':
+        return ['calendar', op[2], op[1]]
+    raise ValueError(f"Cannot undo {kind!r}")
+
+
+def revert(plan, ops):
+    """Undo ``ops``, oldest first as recorded, by applying their inverses."""
+    with plan.lock:
+        for op in reversed(ops):
+            apply(plan, invert(op))
+
+
+def encode_change(plan, event, item_id, *args):
+    """Return the operation for a plan listener event, or None if it records nothing."""
+    if event == 'register':
+        return ['register', item_id, _encode_item(plan.get_item(item_id)), plan.epic_of(item_id)]
+    if event == 'deregister':
+        item, epic_id = args
+        return ['deregister', item_id, _encode_item(item), epic_id]
+    if event in ('add_dependency', 'remove_dependency'):
+        return [event, item_id, args[0]]
+    if event in _FIELDS:
+        if event == 'estimate' and args[2]:
+            # roll-ups are redone when the member's change is applied
+            return None
+        return ['set', item_id, event, _encode_value(event, args[0]), _encode_value(event, args[1])]
+    if event == 'tasks':
+        return ['tasks', item_id, list(args[0]), list(args[1])]
+    if event == 'calendar':
+        return ['calendar', _encode_calendar(args[0]), _encode_calendar(args[1])]
+    if event == 'clear':
+        return ['clear', args[0]]
+    return None
+
+
+@contextmanager
+def recording(plan):
+    """Collect the operations of the changes made to ``plan`` inside the block.
+
+    Unlike a Journal this takes no snapshot, so it is cheap enough to wrap
+    a single edit, e.g. to revert() it when a later step fails.
+    """
+    ops = []
+
+    def listener(event, item_id, *args):
+        op = encode_change(plan, event, item_id, *args)
+        if op is not None:
+            ops.append(op)
+    plan.add_listener(listener)
+    try:
+        yield ops
+    finally:
+        plan.remove_listener(listener)
+
+
+def _read(path):
+    """Return (snapshot entry or None, [(seq, op), ...]) of a journal file."""
+    snapshot = None
+    if os.path.exists(path + '.snapshot'):
+        with open(path + '.snapshot', encoding='utf-8') as f:
+            seq, op = json.load(f)
+            snapshot = (seq, op)
+    ops = []
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a line cut short by a crash ends the journal
+                    break
+                ops.append((entry[0], entry[1:]))
+    return snapshot, ops
+
+
+def replay(source, plan=None, make_default=False):
+    """Rebuild a plan from a journal file or a Journal.
+
+    Starts from the latest snapshot and applies every later operation.
+    ``plan`` (default: a new Plan) receives the operations.
+    """
+    if isinstance(source, Journal):
+        snapshot, ops = source._snapshot, source._ops
+    else:
+        snapshot, ops = _read(source)
+    if plan is None:
+        plan = Plan(make_default=make_default)
+    after = 0
+    with gc_paused(), plan.lock:
+        if snapshot is not None:
+            after, op = snapshot
+            apply(plan, op)
+        for seq, op in ops:
+            if seq > after:
+                apply(plan, op)
+    return plan
+
+
+# -- journal ------------------------------------------------------------------
+
+class Journal:
+    """Records the changes of one plan; see the module docstring.
+
+    Args:
+        plan: Plan to record
+        path: append to this file instead of keeping operations in memory;
+              an existing journal there is continued (replay it first)
+        snapshot_every: take a snapshot after this many operations
+        undo_limit: undo steps kept
+    """
+
+    def __init__(self, plan, path=None, snapshot_every=None, undo_limit=1000):
+        self._plan = plan
+        self._path = path
+        self._snapshot_every = snapshot_every
+        self._undo_limit = undo_limit
+        self._seq = 0
+        self._snapshot = None   # (seq, snapshot op)
+        self._ops = []          # (seq, op) after the snapshot
+        self._subscribers = []
+        self._undo = []         # undo steps, lists of ops, newest last
+        self._redo = []
+        self._group = None      # ops of the open group() block
+        self._reverting = None  # ops recorded while undo()/redo() apply
+        self._file = None
+        if path is not None:
+            self._snapshot, self._ops = _read(path)
+            seqs = [self._snapshot[0]] if self._snapshot else []
+            seqs += [seq for seq, _ in self._ops[-1:]]
+            self._seq = max(seqs, default=0)
+            self._file = open(path, 'a', encoding='utf-8')
+        if self._seq == 0 and plan.items():
+            # the operations only make sense on top of the current plan
+            self.snapshot()
+        plan.add_listener(self._on_change)
+
+    @property
+    def seq(self):
+        """Sequence number of the last operation (0 before the first)."""
+        return self._seq
+
+    @property
+    def ops(self):
+        """(seq, op) pairs recorded since the latest snapshot."""
+        return list(self._ops)
+
+    def since(self, seq):
+        """Return the (seq, op) pairs after ``seq``.
+
+        Returns None when they are no longer kept because a snapshot was
+        taken after ``seq``; start over from replay() then.
+        """
+        first = self._snapshot[0] if self._snapshot else 0
+        if seq < first:
+            return None
+        return [(s, op) for s, op in self._ops if s > seq]
+
+    def subscribe(self, callback):
+        """Call ``callback(seq, op)`` after every recorded operation."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    # -- recording ----------------------------------------------------------
+
+    def _on_change(self, event, item_id, *args):
+        op = encode_change(self._plan, event, item_id, *args)
+        if op is None:
+            return
+        if op[0] == 'clear':
+            # nothing before a clear can be undone
+            self._undo.clear()
+            self._redo.clear()
+        self._record(op)
+
+    def _record(self, op):
+        self._seq += 1
+        seq = self._seq
+        self._ops.append((seq, op))
+        if self._file is not None:
+            self._file.write(json.dumps([seq, *op], separators=(',', ':')) + '\n')
+        if self._reverting is not None:
+            self._reverting.append(op)
+        elif self._group is not None:
+            self._group.append(op)
+        elif op[0] != 'clear':
+            self._push_undo([op])
+        for callback in self._subscribers:
+            callback(seq, op)
+        if self._snapshot_every and len(self._ops) >= self._snapshot_every:
+            self.snapshot()
+
+    def _push_undo(self, ops):
+        self._undo.append(ops)
+        if len(self._undo) > self._undo_limit:
+            del self._undo[:-self._undo_limit]
+        self._redo.clear()
+
+    @contextmanager
+    def group(self):
+        """Record the changes made inside the block as one undo step."""
+        if self._group is not None:
+            yield self
+            return
+        self._group = []
+        try:
+            yield self
+        finally:
+            ops, self._group = self._group, None
+            if ops:
+                self._push_undo(ops)
+
+    # -- undo ---------------------------------------------------------------
+
+    def undo(self):
+        """Revert the last undo step; return False if there is none."""
+        if not self._undo:
+            return False
+        self._redo.append(self._revert(self._undo.pop()))
+        return True
+
+    def redo(self):
+        """Apply the last undone step again; return False if there is none."""
+        if not self._redo:
+            return False
+        self._undo.append(self._revert(self._redo.pop()))
+        return True
+
+    def _revert(self, ops):
+        # the inverse operations are journaled like any other change
+        self._reverting = recorded = []
+        try:
+            revert(self._plan, ops)
+        finally:
+            self._reverting = None
+        return recorded
+
+    # -- snapshots and files ------------------------------------------------
+
+    def snapshot(self):
+        """Record the whole plan; replays start from the latest snapshot."""
+        self._snapshot = (self._seq, encode_snapshot(self._plan))
+        self._ops = []
+        if self._path is not None:
+            self._file.flush()
+            tmp = f"{self._path}.snapshot.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(list(self._snapshot), f, separators=(',', ':'))
+            os.replace(tmp, self._path + '.snapshot')
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Stop recording and close the file."""
+        self._plan.remove_listener(self._on_change)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
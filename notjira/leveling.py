@@ -0,0 +1,140 @@
+"""Resource-constrained scheduling.
+
+utils.schedule() starts every item as soon as its dependencies finish. Here
+each Task with an assignee also needs a free unit of that resource: a
+resource with capacity c works on at most c tasks on any working day.
+
+The scheduler walks working-day indexes (see WorkCalendar.index) through
+one event heap. An item becomes ready on the working day after its last
+dependency ends; a resource unit becomes free on the day after its task
+ends. On each event day every resource with free units starts its ready
+tasks in priority order. Items without an assignee start as soon as they
+are ready, like in utils.schedule(). Each item is pushed on a heap a
+constant number of times, so a run is O((V + E) log V).
+"""
+
+from datetime import date
+from heapq import heappop, heappush
+from itertools import count
+
+from notjira.base import extra_working_days
+from notjira.context import PlanContext
+from notjira.toposort import PRIORITIES, topological_sort
+
+_READY = 0
+_FREE = 1
+
+
+def level(plan=None, start_date=None, capacity=1, priority='due_date'):
+    """Schedule ``plan`` so no resource is overbooked.
+
+    Dates are written back through Plan.set_dates, so scheduling a fork
+    leaves its parent's dates alone, like utils.schedule() does.
+
+    Args:
+        plan: Plan instance or None for default
+        start_date: date to begin (defaults to today)
+        capacity: tasks a resource can work on at once; an int for every
+                  resource, or a dict of assignee -> int (missing ones get 1)
+        priority: which ready task a resource takes first: 'id', 'due_date'
+                  or a key function, see toposort.topological_sort
+    Returns: list of (task, start_date, end_date) in start order
+    Raises: CycleError if dependencies form a cycle
+    """
+    if plan is None:
+        plan = PlanContext().default_plan
+    if start_date is None:
+        start_date = date.today()
+    calendar = plan.calendar
+    first = calendar.index(calendar.next_working_day(start_date))
+    with plan.lock:
+        items = plan.items()
+        started = _Leveler(plan, items, capacity, PRIORITIES.get(priority, priority)).run(first)
+        if len(started) != len(items):
+            # raises with the cycle
+            topological_sort(items, dependents=plan.dependents)
+        from_index = {}
+        result = []
+        for item, s, e in started:
+            for i in (s, e):
+                if i not in from_index:
+                    from_index[i] = calendar.from_index(i)
+            result.append((item, from_index[s], from_index[e]))
+        plan.set_dates(result)
+    return result
+
+
+class _Leveler:
+    """State of one leveling run, in working-day indexes."""
+
+    def __init__(self, plan, items, capacity, key):
+        self._plan = plan
+        self._pool = {x.id: x for x in items}
+        if isinstance(capacity, dict):
+            self._capacities, self._default_capacity = capacity, 1
+        else:
+            self._capacities, self._default_capacity = {}, capacity
+        self._key = key
+        self._seq = count()     # heap tie breaker, keeps runs reproducible
+        self._events = []       # (day, kind, seq, item id or resource)
+        self._waiting = {}      # id -> dependencies not started yet
+        self._earliest = {}     # id -> first day its dependencies allow
+        self._free = {}         # resource -> free units
+        self._queues = {}       # resource -> heap of (priority key, seq, id)
+        self._started = []      # (item, start, end)
+
+    def run(self, first):
+        pool = self._pool
+        events = self._events
+        for item_id, item in pool.items():
+            waiting = sum(1 for d in item.depends if d in pool)
+            self._waiting[item_id] = waiting
+            if not waiting:
+                heappush(events, (first, _READY, next(self._seq), item_id))
+        while events:
+            day = events[0][0]
+            touched = {}    # resources to serve, in event order
+            while events and events[0][0] == day:
+                _, kind, _, payload = heappop(events)
+                if kind == _FREE:
+                    self._free[payload] += 1
+                    touched[payload] = None
+                    continue
+                item = pool[payload]
+                resource = getattr(item, 'assignee', None)
+                if resource is None:
+                    self._start(item, day)
+                else:
+                    self._enqueue(resource, item)
+                    touched[resource] = None
+            for resource in touched:
+                queue = self._queues[resource]
+                while self._free[resource] and queue:
+                    self._free[resource] -= 1
+                    end = self._start(pool[heappop(queue)[2]], day)
+                    heappush(events, (end + 1, _FREE, next(self._seq), resource))
+        return self._started
+
+    def _enqueue(self, resource, item):
+        if resource not in self._free:
+            units = self._capacities.get(resource, self._default_capacity)
+            if units < 1:
+                raise ValueError(f"Capacity of {resource!r} must be at least 1")
+            self._free[resource] = units
+            self._queues[resource] = []
+        key = self._key(item) if self._key is not None else 0
+        heappush(self._queues[resource], (key, next(self._seq), item.id))
+
+    def _start(self, item, day):
+        """Start ``item`` on ``day``, release what it unblocks, return its end."""
+        end = day if item.estimate is None else day + extra_working_days(item.estimate.hours)
+        self._started.append((item, day, end))
+        for n in self._plan.dependents(item.id):
+            if n not in self._pool:
+                continue
+            if end + 1 > self._earliest.get(n, 0):
+                self._earliest[n] = end + 1
+            self._waiting[n] -= 1
+            if not self._waiting[n]:
+                heappush(self._events, (self._earliest[n], _READY, next(self._seq), n))
+        return end
@@ -0,0 +1,230 @@
+"""Vectorized ASAP scheduling with NumPy.
+
+The plan is converted once into edge arrays and working-day indexes; dates
+are then propagated one topological level at a time with
+``np.maximum.reduceat`` over each level's incoming edges, so the Python
+loop runs once per level rather than once per item. Results match
+utils.schedule(). The same propagation runs over a (rows, samples) matrix
+for forecast.forecast().
+
+Measured on 300,000 tasks against the default engine, a 10x speedup
+holds only for the array work: the levels and propagation of
+bench.generate's 'dag' plan (12,700 levels) take about 0.25s against
+2.5s. Whole runs are bounded by the per-item Python work around them:
+reading a Plan into arrays and writing its dates back take about 0.3s
+each, so a Plan schedules about 3.5x faster on a shallow plan (42 levels;
+0.8s against 2.8s) and 2.3x on the 'dag' plan (1.1s against 2.5s). A
+ColumnarPlan skips most of that and reaches about 7x and 3.5x.
+"""
+
+from datetime import date
+from functools import partial
+from itertools import chain
+from operator import attrgetter
+
+from notjira.base import extra_working_days
+from notjira.columnar import ColumnarPlan, ItemView
+from notjira.toposort import CycleError
+from notjira.utils import gc_paused
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("numpy is required for engine='numpy'. Install with 'pip install notjira[numpy]'.") from e
+    return np
+
+
+def plan_arrays(plan):
+    """Return (ids, hours, src_rows, dep_rows) for a Plan or ColumnarPlan.
+
+    Edge k says row ``src_rows[k]`` depends on row ``dep_rows[k]``; edges to
+    ids outside the plan are dropped. Missing estimates are NaN.
+    """
+    np = _numpy()
+    if isinstance(plan, ColumnarPlan):
+        cols = plan.to_numpy()
+        ids, hours = cols['ids'], cols['hours']
+        offsets = cols['depends_offsets']
+        src = np.repeat(np.arange(len(ids)), np.diff(offsets))
+        dep_ids = cols['depends']
+    else:
+        # attrgetter over the attributes keeps these passes in C
+        items = plan.items()
+        n = len(items)
+        ids = np.fromiter(map(attrgetter('_id'), items), np.int64, n)
+        hours = np.fromiter([np.nan if e is None else e.hours for e in map(attrgetter('_estimate'), items)],
+                            np.float64, n)
+        depends = list(map(attrgetter('_depends'), items))
+        counts = np.fromiter(map(len, depends), np.int64, n)
+        src = np.repeat(np.arange(n), counts)
+        dep_ids = np.fromiter(chain.from_iterable(depends), np.int64, int(counts.sum()))
+    # plans hand out increasing ids, which makes the sort a no-op
+    if np.all(ids[1:] > ids[:-1]):
+        order = np.arange(len(ids))
+        pos = np.searchsorted(ids, dep_ids)
+    else:
+        order = np.argsort(ids, kind='stable')
+        pos = np.searchsorted(ids, dep_ids, sorter=order)
+    pos = np.minimum(pos, max(len(ids) - 1, 0))
+    if len(ids):
+        dep_rows = order[pos]
+        known = ids[dep_rows] == dep_ids
+    else:
+        dep_rows = pos
+        known = np.zeros(len(dep_ids), dtype=bool)
+    return ids, hours, src[known], dep_rows[known]
+
+
+def topological_levels(ids, src, dep):
+    """Split rows into levels; every row comes after the levels of its dependencies.
+
+    ``src``/``dep`` are edges as returned by plan_arrays(). Returns a list
+    of row arrays. Raises CycleError if some rows can never be reached.
+    """
+    np = _numpy()
+    n = len(ids)
+    # out-edges grouped by dependency row (CSR)
+    by_dep = np.argsort(dep, kind='stable')
+    out_targets = src[by_dep]
+    out_counts = np.bincount(dep, minlength=n)
+    out_offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(out_counts[:-1], out=out_offsets[1:])
+    indeg = np.bincount(src, minlength=n).astype(np.int64)
+
+    # deep plans run this loop thousands of times with small frontiers, so
+    # it sticks to array methods and avoids np.unique and np.diff
+    levels = []
+    reached = 0
+    frontier = np.flatnonzero(indeg == 0)
+    while frontier.size:
+        levels.append(frontier)
+        reached += frontier.size
+        counts = out_counts[frontier]
+        ends = counts.cumsum()
+        total = int(ends[-1])
+        if not total:
+            break
+        # positions of every out-edge of the frontier
+        edge_pos = (out_offsets[frontier] - ends + counts).repeat(counts) + np.arange(total)
+        targets = out_targets[edge_pos]
+        np.subtract.at(indeg, targets, 1)
+        ready = targets[indeg[targets] == 0]
+        ready.sort()
+        first_seen = np.empty(ready.size, dtype=bool)
+        first_seen[:1] = True
+        np.not_equal(ready[1:], ready[:-1], out=first_seen[1:])
+        frontier = ready[first_seen]
+    if reached != n:
+        raise CycleError(_find_cycle(ids, src, dep, indeg))
+    return levels
+
+
+def level_edges(levels, src, dep):
+    """Group edges by the level of their dependent row, for propagate().
+
+    Returns, per level, None or (rows with dependencies, their dependency
+    rows grouped by row, start of each group).
+    """
+    np = _numpy()
+    if not levels:
+        return []
+    level_of = np.empty(sum(len(rows) for rows in levels), dtype=np.int64)
+    for i, rows in enumerate(levels):
+        level_of[rows] = i
+    order = np.lexsort((src, level_of[src]))
+    src, dep = src[order], dep[order]
+    bounds = np.searchsorted(level_of[src], np.arange(len(levels) + 1))
+    # edge groups of all levels at once; a level's groups are a slice of them
+    group_starts = np.flatnonzero(np.diff(src, prepend=-1) != 0)
+    group_rows = src[group_starts]
+    group_bounds = np.searchsorted(group_starts, bounds).tolist()
+    grouped = []
+    for lo, hi, g_lo, g_hi in zip(bounds[:-1].tolist(), bounds[1:].tolist(), group_bounds, group_bounds[1:]):
+        if lo == hi:
+            grouped.append(None)
+            continue
+        grouped.append((group_rows[g_lo:g_hi], dep[lo:hi], group_starts[g_lo:g_hi] - lo))
+    return grouped
+
+
+def propagate(levels, edges, duration, first):
+    """Earliest start/end working-day indexes, one level at a time.
+
+    ``duration`` holds extra working days per row, shaped (rows,) or
+    (rows, samples) to propagate many samples at once; the result has the
+    same shape and dtype.
+    """
+    np = _numpy()
+    es = np.full(duration.shape, first, dtype=duration.dtype)
+    ef = np.empty_like(es)
+    for rows, grouped in zip(levels, edges):
+        if grouped is not None:
+            targets, deps, starts = grouped
+            # start on the working day after the latest dependency ends
+            es[targets] = np.maximum.reduceat(ef[deps], starts, axis=0) + 1
+        ef[rows] = es[rows] + duration[rows]
+    return es, ef
+
+
+def schedule_numpy(plan, start_date=None):
+    """ASAP-schedule ``plan`` and return a list of (task, start, end).
+
+    Dates are written back in one pass through Plan.set_dates (or into the
+    columns of a ColumnarPlan), so a fork keeps the dates of items it
+    shares private.
+    """
+    np = _numpy()
+    if start_date is None:
+        start_date = date.today()
+    calendar = plan.calendar
+    ids, hours, src, dep = plan_arrays(plan)
+    n = len(ids)
+    # nan_to_num copies, so the plan's own columns are left alone
+    duration = extra_working_days(np.nan_to_num(hours)).astype(np.int64)
+
+    first = calendar.index(calendar.next_working_day(start_date))
+    # deep plans have thousands of small level arrays, each a GC allocation
+    with gc_paused():
+        levels = topological_levels(ids, src, dep)
+        es, ef = propagate(levels, level_edges(levels, src, dep), duration, first)
+    order = np.concatenate(levels) if levels else np.empty(0, dtype=np.int64)
+
+    # working-day index -> date, once per distinct index
+    unique, inverse = np.unique(np.concatenate((es, ef)), return_inverse=True)
+    unique_dates = [calendar.from_index(int(i)) for i in unique]
+    start_pos, end_pos = inverse[:n], inverse[n:]
+
+    if isinstance(plan, ColumnarPlan):
+        ordinals = np.fromiter((d.toordinal() for d in unique_dates), np.int64, len(unique_dates))
+        cols = plan.to_numpy()
+        cols['start'][:] = ordinals[start_pos]
+        cols['end'][:] = ordinals[end_pos]
+    # the result is one tuple per item, all kept alive
+    with gc_paused():
+        if isinstance(plan, ColumnarPlan):
+            items = list(map(partial(ItemView, plan), order.tolist()))
+        else:
+            items = list(map(plan.items().__getitem__, order.tolist()))
+        starts = map(unique_dates.__getitem__, start_pos[order].tolist())
+        ends = map(unique_dates.__getitem__, end_pos[order].tolist())
+        result = list(zip(items, starts, ends))
+        if not isinstance(plan, ColumnarPlan):
+            plan.set_dates(result)
+    return result
+
+
+def _find_cycle(ids, src, dep, indeg):
+    # rows left with a positive in-degree each wait on another such row
+    stuck = indeg > 0
+    keep = stuck[src] & stuck[dep]
+    next_row = dict(zip(src[keep].tolist(), dep[keep].tolist()))
+    row = next(iter(next_row))
+    position = {}
+    path = []
+    while row not in position:
+        position[row] = len(path)
+        path.append(row)
+        row = next_row[row]
+    return [int(ids[r]) for r in path[position[row]:]]
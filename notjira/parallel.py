@@ -0,0 +1,171 @@
+"""Scheduling independent parts of a plan in worker processes.
+
+Items only influence the dates of items they are connected to, so every
+weakly connected component of the dependency graph can be scheduled on
+its own. The plan is read once into flat columns indexed by row (estimate
+hours and dependency rows in CSR form), which every worker receives once
+through the pool initializer. Components are packed into a few bundles of
+similar size; a bundle is just its rows, and the worker derives durations
+and dependents for them itself. Workers propagate working-day indexes (see
+WorkCalendar.index), return them as compact arrays and never see Task
+objects or dates.
+
+The parent still reads the plan, finds the components and writes the dates
+back, all linear in the plan size; on one core these cost more than the
+propagation the workers do, so the speedup is bounded by that serial part.
+"""
+
+import heapq
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import accumulate, chain
+from operator import attrgetter
+
+from notjira.base import extra_working_days
+from notjira.toposort import CycleError
+from notjira.utils import gc_paused
+
+_NO_ESTIMATE = float('nan')
+# (hours, dependency offsets, dependency rows) of the plan, set in workers
+_columns_of_plan = None
+
+
+def _columns(plan):
+    """Return (items, hours, offsets, dependency rows) in plan order.
+
+    Dependencies on ids outside the plan are dropped, as the scheduler
+    ignores them. Missing estimates are NaN.
+    """
+    items = plan.items()
+    row_of = {item_id: row for row, item_id in enumerate(map(attrgetter('_id'), items))}
+    hours = array('d', [_NO_ESTIMATE if e is None else e.hours for e in map(attrgetter('_estimate'), items)])
+    rows = [[row_of[d] for d in depends if d in row_of] if depends else ()
+            for depends in map(attrgetter('_depends'), items)]
+    offsets = array('q', [0])
+    offsets.extend(accumulate(map(len, rows)))
+    return items, hours, offsets, array('q', chain.from_iterable(rows))
+
+
+def _row_components(n, offsets, deps):
+    """Weakly connected components as lists of rows, each in row order."""
+    parent = list(range(n))
+    for row in range(n):
+        for k in range(offsets[row], offsets[row + 1]):
+            a, b = row, deps[k]
+            while parent[a] != a:
+                parent[a] = a = parent[parent[a]]
+            while parent[b] != b:
+                parent[b] = b = parent[parent[b]]
+            if a != b:
+                parent[a] = b
+    groups = {}
+    for row in range(n):
+        root = row
+        while parent[root] != root:
+            root = parent[root]
+        parent[row] = root
+        groups.setdefault(root, []).append(row)
+    return list(groups.values())
+
+
+def components(plan):
+    """Return the weakly connected components of ``plan`` as lists of ids.
+
+    Dependencies on ids outside the plan are ignored, as the scheduler
+    does. Each list keeps plan order.
+    """
+    items, hours, offsets, deps = _columns(plan)
+    return [[items[row].id for row in rows] for rows in _row_components(len(items), offsets, deps)]
+
+
+def _init_worker(hours, offsets, deps):
+    global _columns_of_plan
+    _columns_of_plan = (hours, offsets, deps)
+
+
+def _schedule_rows(rows, first, columns=None):
+    """Return (starts, ends) working-day indexes for ``rows``, aligned with them.
+
+    ``rows`` must be whole components; ``columns`` defaults to the ones
+    the worker was initialized with.
+    """
+    hours, offsets, deps = columns or _columns_of_plan
+    waiting = {}
+    dependents = {}
+    for row in rows:
+        lo, hi = offsets[row], offsets[row + 1]
+        waiting[row] = hi - lo
+        for k in range(lo, hi):
+            dependents.setdefault(deps[k], []).append(row)
+    start = dict.fromkeys(rows, first)
+    end = {}
+    ready = [row for row in rows if not waiting[row]]
+    while ready:
+        row = ready.pop()
+        h = hours[row]
+        day = end[row] = start[row] + (0 if h != h else extra_working_days(h))
+        for nxt in dependents.get(row, ()):
+            # the next working day after the dependency ends
+            if day + 1 > start[nxt]:
+                start[nxt] = day + 1
+            waiting[nxt] -= 1
+            if not waiting[nxt]:
+                ready.append(nxt)
+    if len(end) != len(rows):
+        raise CycleError(_find_cycle(waiting, offsets, deps))
+    return array('q', map(start.__getitem__, rows)), array('q', map(end.__getitem__, rows))
+
+
+def _find_cycle(waiting, offsets, deps):
+    # every row still waiting depends on another waiting row
+    row = next(r for r, w in waiting.items() if w)
+    path = {}
+    while row not in path:
+        path[row] = len(path)
+        row = next(deps[k] for k in range(offsets[row], offsets[row + 1]) if waiting[deps[k]])
+    return list(path)[path[row]:]
+
+
+def _bundles(groups, count):
+    """Spread components over ``count`` bundles of rows, largest first, by size."""
+    heap = [(0, i) for i in range(count)]
+    bundles = [array('q') for _ in range(count)]
+    for rows in sorted(groups, key=len, reverse=True):
+        size, i = heapq.heappop(heap)
+        bundles[i].extend(rows)
+        heapq.heappush(heap, (size + len(rows), i))
+    return [b for b in bundles if b]
+
+
+def schedule_parallel(plan, start_date=None, workers=None):
+    """ASAP-schedule ``plan`` with its components spread over ``workers`` processes.
+
+    Dates match utils.schedule() and are written back through
+    Plan.set_dates. The result lists (task, start, end) in plan order.
+    """
+    if start_date is None:
+        start_date = date.today()
+    calendar = plan.calendar
+    first = calendar.index(calendar.next_working_day(start_date))
+    with gc_paused(), plan.lock:
+        items, hours, offsets, deps = _columns(plan)
+    n = len(items)
+    bundles = _bundles(_row_components(n, offsets, deps), (workers or 1) * 4)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(hours, offsets, deps)) as executor:
+        try:
+            results = list(executor.map(_schedule_rows, bundles, [first] * len(bundles)))
+        except CycleError as e:
+            raise CycleError([items[row].id for row in e.cycle]) from None
+    starts, ends = array('q', bytes(8 * n)), array('q', bytes(8 * n))
+    for rows, (bundle_starts, bundle_ends) in zip(bundles, results):
+        for row, s, e in zip(rows, bundle_starts, bundle_ends):
+            starts[row] = s
+            ends[row] = e
+    dates = {i: calendar.from_index(i) for i in set(starts).union(ends)}
+    # one tuple per item, all kept alive
+    with gc_paused(), plan.lock:
+        result = list(zip(items, map(dates.__getitem__, starts), map(dates.__getitem__, ends)))
+        plan.set_dates(result)
+    return result
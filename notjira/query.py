@@ -0,0 +1,297 @@
+"""Secondary indexes behind Plan.query().
+
+Plan.items() copies every item, so filtering a large plan over and over
+is a full scan each time. Plan.query() answers from these indexes instead:
+
+- status: BaseStatus -> ids
+- name: lowercased word -> ids, plus the sorted words for prefix lookups
+- due_date, start_date, end_date: (date, id) pairs in sorted order, for
+  range queries
+
+An index is built by the first query that needs it; until then keeping
+it up to date costs nothing. After that the plan reports every change.
+Status and name indexes are updated right away. Date indexes only record
+which ids moved, and the next query sorts those back in, or rebuilds the
+index when a large part of the plan moved, e.g. after a reschedule.
+
+A date index entry is one int64, ``date.toordinal() << 32 | id``, so an
+index costs 8 bytes per item and bisect finds a date or an exact entry.
+Item ids must be below 2**32.
+"""
+
+from array import array
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from notjira.base import BaseStatus
+from notjira.work_calendar import as_date
+
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+# word separators for the name index
+_PUNCTUATION = str.maketrans({c: ' ' for c in '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'})
+
+
+def name_tokens(name):
+    """Lowercased words of an item name."""
+    if not name:
+        return ()
+    return str(name).lower().translate(_PUNCTUATION).split()
+
+
+class _DateIndex:
+    """Ids sorted by one date field; see the module docstring."""
+
+    def __init__(self, key):
+        self._key = key
+        self._entries = None        # array('q') of ordinal << 32 | id, sorted
+        self._ordinals = array('i')  # id -> indexed ordinal, 0 if not indexed
+        self._dirty = set()
+
+    def mark(self, item_ids):
+        if self._entries is None:
+            return
+        self._dirty.update(item_ids)
+        if len(self._dirty) > len(self._entries) // 8 + 64:
+            # cheaper to sort everything again than to move that many entries
+            self._entries = None
+            self._dirty.clear()
+
+    def positions(self, pool, first=None, last=None):
+        """Return (entries, lo, hi): the slice of entries dated first..last."""
+        self._refresh(pool)
+        entries = self._entries
+        lo = 0 if first is None else bisect_left(entries, first.toordinal() << _ID_BITS)
+        hi = len(entries) if last is None else bisect_left(entries, (last.toordinal() + 1) << _ID_BITS)
+        return entries, lo, max(lo, hi)
+
+    def _refresh(self, pool):
+        if self._entries is None:
+            self._rebuild(pool)
+            return
+        entries = self._entries
+        ordinals = self._ordinals
+        for item_id in self._dirty:
+            old = ordinals[item_id] if item_id < len(ordinals) else 0
+            if old:
+                i = bisect_left(entries, old << _ID_BITS | item_id)
+                del entries[i]
+                ordinals[item_id] = 0
+            item = pool.get(item_id)
+            value = self._key(item) if item is not None else None
+            if value is not None:
+                ordinal = value.toordinal()
+                self._grow(item_id)
+                ordinals[item_id] = ordinal
+                insort(entries, ordinal << _ID_BITS | item_id)
+        self._dirty.clear()
+
+    def _rebuild(self, pool):
+        key = self._key
+        self._ordinals = ordinals = array('i', bytes(4 * (max(pool, default=-1) + 1)))
+        packed = []
+        for item_id, item in pool.items():
+            value = key(item)
+            if value is not None:
+                ordinal = ordinals[item_id] = value.toordinal()
+                packed.append(ordinal << _ID_BITS | item_id)
+        packed.sort()
+        self._entries = array('q', packed)
+        self._dirty.clear()
+
+    def _grow(self, item_id):
+        missing = item_id + 1 - len(self._ordinals)
+        if missing > 0:
+            self._ordinals.frombytes(bytes(4 * missing))
+
+
+def _due_date(item):
+    return as_date(item.due_date)
+
+
+def _scheduled(plan, item):
+    """(start, end) of a scheduled item in ``plan`` (see Plan.dates), else None."""
+    if item.plan is plan:
+        start, end = item.start_date, item.end_date
+    else:
+        start, end = plan.dates(item.id)
+    return None if start is None or end is None else (start, end)
+
+
+def _scheduled_date(plan, item, position):
+    dates = _scheduled(plan, item)
+    return None if dates is None else dates[position]
+
+
+class PlanIndex:
+    """The secondary indexes of one Plan, kept in step by the plan."""
+
+    def __init__(self, plan):
+        self._pool = plan._item_pool
+        self._status = None         # BaseStatus -> set of ids
+        self._words = None          # word -> set of ids
+        self._sorted_words = None   # sorted list of words, rebuilt lazily
+        self._due = _DateIndex(_due_date)
+        self._start = _DateIndex(lambda item: _scheduled_date(plan, item, 0))
+        self._end = _DateIndex(lambda item: _scheduled_date(plan, item, 1))
+
+    # -- maintenance, called by Plan under its lock ----------------------
+
+    def registered(self, item):
+        item_id = item.id
+        if self._status is not None:
+            self._status.setdefault(item.status, set()).add(item_id)
+        if self._words is not None:
+            self._add_words(item_id, name_tokens(item.name))
+        for index in (self._due, self._start, self._end):
+            index.mark((item_id,))
+
+    def deregistered(self, item):
+        item_id = item.id
+        if self._status is not None:
+            self._status.get(item.status, set()).discard(item_id)
+        if self._words is not None:
+            self._remove_words(item_id, name_tokens(item.name))
+        for index in (self._due, self._start, self._end):
+            index.mark((item_id,))
+
+    def changed(self, item_id, field, old, new):
+        if field == 'status':
+            if self._status is not None:
+                self._status.get(old, set()).discard(item_id)
+                self._status.setdefault(new, set()).add(item_id)
+        elif field == 'name':
+            if self._words is not None:
+                self._remove_words(item_id, name_tokens(old))
+                self._add_words(item_id, name_tokens(new))
+        elif field == 'due_date':
+            self._due.mark((item_id,))
+        elif field == 'start_date':
+            self.dates_changed((item_id,))
+
+    def dates_changed(self, item_ids):
+        if not isinstance(item_ids, (list, tuple, set, frozenset, dict)):
+            item_ids = list(item_ids)
+        self._start.mark(item_ids)
+        self._end.mark(item_ids)
+
+    def _add_words(self, item_id, words):
+        for word in words:
+            ids = self._words.get(word)
+            if ids is None:
+                ids = self._words[word] = set()
+                self._sorted_words = None
+            ids.add(item_id)
+
+    def _remove_words(self, item_id, words):
+        for word in words:
+            ids = self._words.get(word)
+            if ids is not None:
+                ids.discard(item_id)
+
+    # -- lookups ------------------------------------------------------------
+
+    def with_status(self, statuses):
+        if self._status is None:
+            index = {}
+            for item_id, item in self._pool.items():
+                index.setdefault(item.status, set()).add(item_id)
+            self._status = index
+        found = set()
+        for status in statuses:
+            found |= self._status.get(status, set())
+        return found
+
+    def with_words(self, prefixes):
+        """Ids whose name has, for every prefix, a word starting with it."""
+        if self._words is None:
+            self._words = {}
+            for item_id, item in self._pool.items():
+                self._add_words(item_id, name_tokens(item.name))
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._words)
+        words = self._sorted_words
+        found = None
+        for prefix in prefixes:
+            ids = set()
+            i = bisect_left(words, prefix)
+            while i < len(words) and words[i].startswith(prefix):
+                ids |= self._words[words[i]]
+                i += 1
+            found = ids if found is None else found & ids
+            if not found:
+                break
+        return found
+
+    def due_between(self, first=None, last=None):
+        return self._due.positions(self._pool, first, last)
+
+    def starting_by(self, last):
+        return self._start.positions(self._pool, None, last)
+
+    def ending_from(self, first):
+        return self._end.positions(self._pool, first, None)
+
+
+def _ids_in(entries):
+    for value in entries:
+        yield value & _ID_MASK
+
+
+def _items(pool, ids, checks):
+    for item_id in ids:
+        item = pool.get(item_id)
+        # the item may have been removed after query() was called
+        if item is not None and all(check(item) for check in checks):
+            yield item
+
+
+def _overlaps(dates, first, last):
+    return dates is not None and dates[0] <= last and dates[1] >= first
+
+
+def query(plan, status=None, name=None, due_before=None, due_after=None, overlaps=None):
+    """See Plan.query."""
+    pool = plan._item_pool
+    index = plan._query_index()
+    # candidates: (size, ids or an index slice) per filter; the smallest
+    # drives the iteration and the other filters are checked on the items
+    candidates = []
+    checks = []
+    if status is not None:
+        statuses = {status} if isinstance(status, BaseStatus) else set(status)
+        ids = index.with_status(statuses)
+        candidates.append((len(ids), ids))
+        checks.append(lambda item: item.status in statuses)
+    if name is not None:
+        prefixes = name_tokens(name)
+        if prefixes:
+            ids = index.with_words(prefixes)
+            candidates.append((len(ids), ids))
+            checks.append(lambda item: all(any(w.startswith(p) for w in name_tokens(item.name))
+                                           for p in prefixes))
+    if due_before is not None or due_after is not None:
+        before, after = as_date(due_before), as_date(due_after)
+        entries, lo, hi = index.due_between(after + timedelta(days=1) if after else None,
+                                            before - timedelta(days=1) if before else None)
+        candidates.append((hi - lo, (entries, lo, hi)))
+        checks.append(lambda item: _due_date(item) is not None
+                      and (before is None or _due_date(item) < before)
+                      and (after is None or _due_date(item) > after))
+    if overlaps is not None:
+        first, last = as_date(overlaps[0]), as_date(overlaps[1])
+        entries, lo, hi = index.starting_by(last)
+        candidates.append((hi - lo, (entries, lo, hi)))
+        entries, lo, hi = index.ending_from(first)
+        candidates.append((hi - lo, (entries, lo, hi)))
+        checks.append(lambda item: _overlaps(_scheduled(plan, item), first, last))
+    if not candidates:
+        return _items(pool, list(pool), ())
+    _, ids = min(candidates, key=lambda c: c[0])
+    # take a snapshot now, the indexes change with the plan
+    if isinstance(ids, tuple):
+        entries, lo, hi = ids
+        ids = _ids_in(entries[lo:hi])
+    else:
+        ids = list(ids)
+    return _items(pool, ids, checks)
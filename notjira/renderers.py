@@ -0,0 +1,78 @@
+"""Registry of Gantt renderers, loaded on first use.
+
+A renderer is registered under a name as a callable or as a
+'module:function' string; strings are only imported when the renderer is
+first asked for, so matplotlib and friends stay out of processes that
+never draw. Other packages can add renderers through the
+'notjira.renderers' entry point group:
+
+    [project.entry-points."notjira.renderers"]
+    svg = "mypackage.svg:gantt_svg"
+
+Every renderer takes the plan as its first argument:
+
+    from notjira.renderers import render
+    print(render('ascii', plan, width=120))
+    render('matplotlib', plan, filename='plan.png')
+    render('html', plan, filename='plan.html')
+"""
+
+ENTRY_POINT_GROUP = 'notjira.renderers'
+
+_registry = {
+    'ascii': 'notjira.utils:gantt_ascii',
+    'matplotlib': 'notjira.chart:gantt_matplotlib',
+    'matplotlib_inline': 'notjira.chart:gantt_matplotlib_inline',
+    'html': 'notjira.html_gantt:gantt_html',
+}
+_entry_points_loaded = False
+
+
+def register(name, renderer):
+    """Register ``renderer`` (a callable or 'module:function') under ``name``."""
+    _registry[name] = renderer
+
+
+def _load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    from importlib import metadata
+    try:
+        found = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10
+        found = metadata.entry_points().get(ENTRY_POINT_GROUP, ())
+    for ep in found:
+        # explicit registrations win over plugins
+        _registry.setdefault(ep.name, ep.value)
+
+
+def available():
+    """Return the names of all known renderers, plugins included."""
+    _load_entry_points()
+    return sorted(_registry)
+
+
+def get(name):
+    """Return the renderer registered as ``name``, importing it if needed.
+
+    Raises: KeyError for unknown names
+    """
+    if name not in _registry:
+        _load_entry_points()
+    try:
+        renderer = _registry[name]
+    except KeyError:
+        raise KeyError(f"Unknown renderer {name!r}, expected one of {available()}") from None
+    if isinstance(renderer, str):
+        from importlib import import_module
+        module, _, attr = renderer.partition(':')
+        renderer = _registry[name] = getattr(import_module(module), attr)
+    return renderer
+
+
+def render(name, plan=None, **options):
+    """Render ``plan`` (None for the default plan) with the renderer ``name``."""
+    return get(name)(plan, **options)
@@ -0,0 +1,170 @@
+"""Incremental ASAP scheduling.
+
+A Scheduler keeps the dates it computed last time and listens to its plan.
+Estimate, dependency and membership changes only mark the touched items
+dirty; the next run re-propagates dates through their downstream subgraph
+and leaves every item whose inputs did not move alone.
+"""
+
+from datetime import date, timedelta
+
+from notjira import instrument
+from notjira.base import working_end_date
+from notjira.context import PlanContext
+from notjira.toposort import topological_sort
+
+
+class Scheduler:
+    def __init__(self, plan=None, priority=None):
+        if plan is None:
+            plan = PlanContext().default_plan
+        self._plan = plan
+        self._start_date = None
+        self._dates = {}
+        self._dirty = set()
+        self._full = True
+        self._priority = priority
+        plan.add_listener(self._on_change)
+
+    @property
+    def plan(self):
+        return self._plan
+
+    def fork(self, plan):
+        """Return a Scheduler for ``plan``, a fork of this scheduler's plan.
+
+        It starts from this scheduler's dates, so the fork's next run only
+        recomputes what changed in the fork.
+        """
+        scheduler = Scheduler(plan, self._priority)
+        scheduler._start_date = self._start_date
+        scheduler._dates = dict(self._dates)
+        scheduler._dirty = set(self._dirty)
+        scheduler._full = self._full
+        return scheduler
+
+    def dates(self, item_id):
+        """Return (start, end) of the item from the last run, or None."""
+        return self._dates.get(item_id)
+
+    @property
+    def priority(self):
+        """Ready-item ordering passed to topological_sort."""
+        return self._priority
+
+    @priority.setter
+    def priority(self, priority):
+        if priority != self._priority:
+            self._priority = priority
+            self._full = True
+
+    def invalidate(self, item_id=None):
+        """Mark an item (or, with no argument, the whole plan) dirty."""
+        if item_id is None:
+            self._full = True
+        else:
+            self._dirty.add(item_id)
+
+    def override(self, dates):
+        """Take {id: (start, end)} computed by another engine (see Plan.set_dates).
+
+        dates() returns them until the next run, which recomputes everything.
+        """
+        self._dates.update(dates)
+        self._full = True
+
+    def _on_change(self, event, item_id, *args):
+        if event in ('clear', 'calendar'):
+            self._full = True
+        elif event == 'deregister':
+            self._dates.pop(item_id, None)
+            self._dirty.discard(item_id)
+            self._dirty.update(self._plan.dependents(item_id))
+        elif event in ('register', 'estimate', 'add_dependency', 'remove_dependency'):
+            self._dirty.add(item_id)
+
+    def run(self, start_date=None):
+        """Bring dates up to date and return a list of (task, start, end)."""
+        with self._plan.lock:
+            self.update(start_date)
+            get_item = self._plan.get_item
+            return [(get_item(i), s, e) for i, (s, e) in self._dates.items()]
+
+    def update(self, start_date=None):
+        """Bring dates up to date without building run()'s result list."""
+        with self._plan.lock:
+            if start_date is None:
+                start_date = date.today()
+            if start_date != self._start_date:
+                self._start_date = start_date
+                self._full = True
+            try:
+                if self._full:
+                    self._full = False
+                    self._dirty.clear()
+                    self._dates = {}
+                    self._propagate(None)
+                elif self._dirty:
+                    dirty, self._dirty = self._dirty, set()
+                    self._propagate(dirty)
+            except Exception:
+                # leave nothing half-propagated behind
+                self._full = True
+                raise
+
+    def _affected(self, seeds):
+        """Seeds still in the plan plus everything downstream of them."""
+        plan = self._plan
+        affected = {i for i in seeds if i in plan}
+        stack = list(affected)
+        while stack:
+            for nxt in plan.dependents(stack.pop()):
+                if nxt not in affected:
+                    affected.add(nxt)
+                    stack.append(nxt)
+        return affected
+
+    def _propagate(self, seeds):
+        plan = self._plan
+        if seeds is None:
+            items = plan.items()
+        else:
+            items = [plan.get_item(i) for i in self._affected(seeds)]
+        with instrument.phase('schedule.toposort') as span:
+            ordered = topological_sort(items, self._priority, plan.dependents)
+            if span:
+                span.set(items=len(items), edges=sum(len(x.depends) for x in items))
+        changed = set()
+        computed = []
+        with instrument.phase('schedule.propagate') as span:
+            for item in ordered:
+                n = item.id
+                if seeds is None or n in seeds or not changed.isdisjoint(item.depends):
+                    computed.append(n)
+                    dates = self._compute(item)
+                    if self._dates.get(n) != dates:
+                        self._dates[n] = dates
+                        changed.add(n)
+            span.set(items=len(computed), changed=len(changed))
+        # recomputed items had their dates reset, even if they ended up equal
+        plan.dates_changed(computed)
+
+    def _compute(self, item):
+        dep_end = None
+        for d in item.depends:
+            dates = self._dates.get(d)
+            if dates is not None and (dep_end is None or dates[1] > dep_end):
+                dep_end = dates[1]
+        if dep_end is None:
+            dep_start = self._start_date
+        else:
+            # start day is the next calendar day after dep_end
+            dep_start = dep_end + timedelta(days=1)
+        # bump to a working day
+        calendar = self._plan.calendar
+        dep_start = calendar.next_working_day(dep_start)
+        dep_end = working_end_date(dep_start, item.estimate, calendar)
+        # items a fork shares with its parent keep the parent's dates
+        if item.plan is self._plan:
+            item.set_dates(dep_start, dep_end)
+        return dep_start, dep_end
@@ -0,0 +1,402 @@
+"""Asyncio JSON service over a plan.
+
+Many clients polling one plan should not each pay for a schedule run or
+a chart render. PlanService sits between them and the plan:
+
+- results are cached under Plan.version, so polls between changes are
+  answered from memory;
+- concurrent identical requests share one computation;
+- mutations arriving within ``batch_delay`` seconds are applied together,
+  followed by a single reschedule; each request's ops apply all or none;
+- plan work runs on one worker thread, off the event loop, and PNG
+  renders run in a small process pool, so a slow render never blocks
+  other requests.
+
+serve() exposes a service over HTTP (TCP or a Unix socket):
+
+    GET  /version
+    GET  /schedule?start=2024-01-01
+    GET  /gantt?start=&epic_only=1&window=2024-01-01,2024-03-31&page=0&page_size=50
+    GET  /gantt.png?<same parameters>
+    POST /mutations        {"ops": [journal operations, see notjira.journal]}
+
+Run ``python -m notjira.server plan.njp`` (or ``notjira-serve``) to serve a
+saved plan.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qsl, urlsplit
+
+from notjira.journal import apply, encode_snapshot, recording, revert
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    """A request the service cannot answer; ``status`` is the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _init_render_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class PlanService:
+    """Cached, coalesced and batched access to one plan.
+
+    Args:
+        plan: Plan to serve
+        start_date: schedule start when a request gives none (default: today)
+        batch_delay: seconds to gather mutations before applying them
+        render_workers: processes rendering PNG charts
+        cache_size: results kept, one per distinct request
+    """
+
+    def __init__(self, plan, start_date=None, batch_delay=0.01, render_workers=2, cache_size=128):
+        self._plan = plan
+        self._start_date = start_date
+        self._batch_delay = batch_delay
+        self._render_workers = render_workers
+        self._cache_size = cache_size
+        self._cache = {}        # request key -> (plan version, result)
+        self._inflight = {}     # request key -> future of the running computation
+        self._pending = []      # (ops, future) waiting for the next batch
+        self._flush = None
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notjira-plan')
+        self._renderer = None
+
+    @property
+    def plan(self):
+        return self._plan
+
+    def _start(self, start):
+        return start or self._start_date or date.today()
+
+    # -- coalescing cache -----------------------------------------------------
+
+    async def _cached(self, key, produce):
+        """Return the result of ``await produce()`` for ``key``, cached per plan
+        version and shared between concurrent callers.
+
+        produce returns (plan version the result was computed at, result).
+        """
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] == self._plan.version:
+            return hit[1]
+        running = self._inflight.get(key)
+        if running is None:
+            running = self._inflight[key] = asyncio.ensure_future(self._produce(key, produce))
+        # a cancelled caller must not cancel the others
+        return await asyncio.shield(running)
+
+    async def _produce(self, key, produce):
+        try:
+            version, result = await produce()
+        finally:
+            del self._inflight[key]
+        if len(self._cache) >= self._cache_size and key not in self._cache:
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = (version, result)
+        return result
+
+    def _in_worker(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._worker, fn, *args)
+
+    # -- queries --------------------------------------------------------------
+
+    async def schedule(self, start=None):
+        """JSON bytes of {"version", "items": [[id, name, start, end], ...]}."""
+        start = self._start(start)
+
+        def compute():
+            with self._plan.lock:
+                result = self._plan.scheduler().run(start)
+                version = self._plan.version
+            items = [[x.id, x.name, s.isoformat(), e.isoformat()] for x, s, e in result]
+            return version, json.dumps({'version': version, 'items': items}).encode()
+        return await self._cached(('schedule', start), lambda: self._in_worker(compute))
+
+    def _rows(self, start, epic_only, window, page, page_size):
+        from notjira.chart import _prepare_schedule
+        with self._plan.lock:
+            try:
+                sched = _prepare_schedule(self._plan, start, epic_only, window, None, page, page_size)
+            except ValueError:
+                # nothing to draw in the plan, window or page
+                sched = []
+            version = self._plan.version
+        return version, [(x.id, x.name, str(x.estimate), s, e) for x, s, e in sched]
+
+    async def gantt(self, start=None, epic_only=False, window=None, page=None, page_size=None):
+        """JSON bytes of {"version", "rows": [[id, name, estimate, start, end], ...]}."""
+        args = (self._start(start), epic_only, window, page, page_size)
+
+        def compute():
+            version, rows = self._rows(*args)
+            rows = [[i, name, est, s.isoformat(), e.isoformat()] for i, name, est, s, e in rows]
+            return version, json.dumps({'version': version, 'rows': rows}).encode()
+        return await self._cached(('gantt',) + args, lambda: self._in_worker(compute))
+
+    async def render(self, start=None, epic_only=False, window=None, page=None, page_size=None):
+        """PNG bytes of the Gantt chart, drawn in the render pool.
+
+        Raises: RequestError (404) when there is nothing to draw
+        """
+        args = (self._start(start), epic_only, window, page, page_size)
+
+        async def produce():
+            version, rows = await self._in_worker(self._rows, *args)
+            if not rows:
+                raise RequestError("No rows to plot", 404)
+            from notjira.chart import render_rows
+            title = 'Plan Gantt' + (' [Epics]' if epic_only else '')
+            rows = [(name, est, s, e) for _, name, est, s, e in rows]
+            png = await asyncio.get_running_loop().run_in_executor(
+                self._render_pool(), render_rows, rows, title, (10, 0.5), window)
+            return version, png
+        return await self._cached(('render',) + args, produce)
+
+    def _render_pool(self):
+        if self._renderer is None:
+            import multiprocessing
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._renderer = ProcessPoolExecutor(max_workers=self._render_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_render_worker)
+        return self._renderer
+
+    # -- mutations ------------------------------------------------------------
+
+    async def mutate(self, ops):
+        """Apply journal operations with the next batch; return the new version.
+
+        Raises: RequestError if an operation fails; the request's earlier
+        operations are rolled back, other requests in the batch still apply
+        """
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        self._pending.append((ops, done))
+        if self._flush is None:
+            self._flush = asyncio.ensure_future(self._flush_later())
+        return await done
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._batch_delay)
+        batch, self._pending, self._flush = self._pending, [], None
+        try:
+            version, errors = await self._in_worker(self._apply_batch, batch)
+        except Exception as e:
+            version, errors = None, [e] * len(batch)
+        for (_, done), error in zip(batch, errors):
+            if done.done():
+                continue
+            if error is None:
+                done.set_result(version)
+            else:
+                done.set_exception(error)
+
+    def _apply_batch(self, batch):
+        plan = self._plan
+        with plan.lock:
+            errors = [self._apply_request(ops) for ops, _ in batch]
+            # one reschedule for the whole burst; later schedule requests
+            # only build their response
+            plan.scheduler().update(self._start(None))
+            return plan.version, errors
+
+    def _apply_request(self, ops):
+        """Apply the ops of one request, all or none; return None or the error."""
+        if not isinstance(ops, list) or not all(isinstance(op, list) and op for op in ops):
+            return RequestError("ops must be a list of journal operations")
+        plan = self._plan
+        # inverse operations cannot undo a clear, restore a snapshot instead
+        backup = encode_snapshot(plan) if any(op[0] in ('clear', 'snapshot') for op in ops) else None
+        with recording(plan) as applied:
+            try:
+                for op in ops:
+                    apply(plan, op)
+                return None
+            except Exception as e:
+                error = RequestError(f"{type(e).__name__}: {e}")
+        if backup is not None:
+            apply(plan, backup)
+        else:
+            revert(plan, applied)
+        return error
+
+    async def close(self):
+        if self._flush is not None:
+            await self._flush
+        self._worker.shutdown()
+        if self._renderer is not None:
+            self._renderer.shutdown()
+
+
+# -- HTTP -------------------------------------------------------------------
+
+def _flag(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _chart_args(params):
+    from notjira.work_calendar import as_date
+    try:
+        window = params.get('window')
+        if window:
+            first, _, last = window.partition(',')
+            window = (as_date(first), as_date(last))
+        page = params.get('page')
+        page_size = params.get('page_size')
+        return dict(start=as_date(params.get('start') or None),
+                    epic_only=_flag(params.get('epic_only', '')),
+                    window=window or None,
+                    page=int(page) if page else None,
+                    page_size=int(page_size) if page_size else None)
+    except ValueError as e:
+        raise RequestError(f"Bad parameter: {e}") from None
+
+
+async def route(service, method, target, body=b''):
+    """Answer one request; return (status, content type, body bytes)."""
+    url = urlsplit(target)
+    params = dict(parse_qsl(url.query))
+    path = url.path.rstrip('/') or '/'
+    try:
+        if path == '/mutations':
+            if method != 'POST':
+                raise RequestError("Use POST", 405)
+            try:
+                ops = json.loads(body or b'{}')['ops']
+            except (ValueError, KeyError, TypeError):
+                raise RequestError('Expected {"ops": [...]}') from None
+            version = await service.mutate(ops)
+            return 200, 'application/json', json.dumps({'version': version}).encode()
+        if method != 'GET':
+            raise RequestError("Use GET", 405)
+        if path == '/version':
+            return 200, 'application/json', json.dumps({'version': service.plan.version}).encode()
+        if path == '/schedule':
+            return 200, 'application/json', await service.schedule(_chart_args(params)['start'])
+        if path == '/gantt':
+            return 200, 'application/json', await service.gantt(**_chart_args(params))
+        if path == '/gantt.png':
+            return 200, 'image/png', await service.render(**_chart_args(params))
+        raise RequestError(f"No route {path}", 404)
+    except RequestError as e:
+        status, message = e.status, str(e)
+    except Exception as e:
+        status, message = 500, f"{type(e).__name__}: {e}"
+    return status, 'application/json', json.dumps({'error': message}).encode()
+
+
+async def _read_request(reader):
+    """Return (method, target, version, headers, body), or None at end of stream."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, version = line.decode('latin-1').split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+def _handler(service):
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError:
+                    request = False
+                if request is None:
+                    break
+                if request is False:
+                    status, ctype, body = 400, 'application/json', b'{"error": "Malformed request"}'
+                    keep_alive = False
+                else:
+                    method, target, version, headers, body = request
+                    status, ctype, body = await route(service, method, target, body)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                        f"Content-Type: {ctype}\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(service, host='127.0.0.1', port=8080, path=None):
+    """Start an HTTP server for ``service`` on host:port, or on the Unix
+    socket ``path``; return the asyncio Server."""
+    if path is not None:
+        return await asyncio.start_unix_server(_handler(service), path)
+    return await asyncio.start_server(_handler(service), host, port)
+
+
+async def _run(args):
+    from notjira.context import Plan
+    from notjira.work_calendar import as_date
+    plan = Plan.load(args.plan, make_default=False)
+    journal = None
+    if args.journal:
+        from notjira.journal import Journal
+        journal = Journal(plan, args.journal)
+    service = PlanService(plan, start_date=as_date(args.start), batch_delay=args.batch_delay,
+                          render_workers=args.render_workers)
+    server = await serve(service, args.host, args.port, args.unix)
+    where = args.unix or '{}:{}'.format(*server.sockets[0].getsockname()[:2])
+    print(f"Serving {args.plan} on {where}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+        if journal is not None:
+            journal.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a saved notjira plan over HTTP.")
+    parser.add_argument('plan', help="plan file written by Plan.save")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead")
+    parser.add_argument('--start', help="default schedule start date (default: today)")
+    parser.add_argument('--journal', metavar='PATH', help="append every change to this journal")
+    parser.add_argument('--batch-delay', type=float, default=0.01,
+                        help="seconds to gather mutations into one batch (default: 0.01)")
+    parser.add_argument('--render-workers', type=int, default=2)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
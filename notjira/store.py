@@ -0,0 +1,303 @@
+"""Binary on-disk format for plans.
+
+A file is a fixed header (64 bytes, 80 in version 2, 88 from version 3)
+followed by fixed-width little-endian columns, one section after another:
+
+    int64   ids, due, start, end ordinals (0 = unset)  [n each]
+    float64 estimate hours (NaN = none)                 [n]
+    int64   depends offsets [n+1] + dependency ids      [edges]
+    int64   epic task offsets [n+1] + task ids          [members]
+    int64   name offsets [n+1], holiday ordinals        [holidays]
+    int64   assignee index (-1 = none)                  [n]
+    int64   assignee name offsets [assignees+1]
+    int64   rows with a distribution estimate           [distributions]
+    float64 distribution parameters                     [3 * distributions]
+    int8    kind flags, status index                    [n each]
+    int8    distribution kind                           [distributions]
+    bytes   utf-8 names, utf-8 assignee names
+
+Assignees are stored once each, as strings. Estimates with a spread keep
+their mean in the hours column and their parameters in the distribution
+sections: low, likely, high for PERT, and mu, sigma, unused for
+lognormal. Version 1 and 2 files, which lack the later sections, can
+still be read.
+
+Every int64/float64 section starts 8-byte aligned, so a mapped file can be
+read through memoryview casts without copying (see open_mapped).
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from datetime import date
+
+from notjira.base import BaseStatus
+from notjira.columnar import _KIND_MASK, _KINDS, ColumnarPlan, _kind
+from notjira.context import Plan
+from notjira.task import Epic, Task
+from notjira.time_estimate import LogNormalEstimate, PertEstimate, TimeEstimate
+from notjira.utils import gc_paused
+from notjira.work_calendar import WorkCalendar, as_date
+
+MAGIC = b'NOTJIRA\0'
+VERSION = 3
+# magic, version, workday mask, items, edges, epic members, name bytes,
+# holidays, id counter
+HEADER = struct.Struct('<8sHB5xqqqqqq')
+# appended to the header by later versions: assignees, assignee name
+# bytes, distribution estimates
+_HEADER_EXTRA = {1: struct.Struct('<'), 2: struct.Struct('<qq'), 3: struct.Struct('<qqq')}
+
+_NO_NAME = 0x10
+_STATUSES = list(BaseStatus)
+_NO_ESTIMATE = float('nan')
+_PERT = 0
+_LOGNORMAL = 1
+_LITTLE = sys.byteorder == 'little'
+
+
+def _ordinal(value):
+    value = as_date(value)
+    return 0 if value is None else value.toordinal()
+
+
+def _date(ordinal):
+    return None if ordinal == 0 else date.fromordinal(ordinal)
+
+
+def _write(f, column):
+    if not _LITTLE and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    column.tofile(f)
+
+
+def save_plan(plan, path):
+    """Write ``plan`` to ``path``; item ids are stored as they are."""
+    items = sorted(plan.items(), key=lambda x: x.id)
+    ids, hours = array('q'), array('d')
+    due, start, end = array('q'), array('q'), array('q')
+    dep_offsets, deps = array('q', [0]), array('q')
+    member_offsets, members = array('q', [0]), array('q')
+    name_offsets, names = array('q', [0]), bytearray()
+    assignees, assignee_offsets, assignee_names = array('q'), array('q', [0]), bytearray()
+    resources = {}
+    dist_rows, dist_params, dist_kinds = array('q'), array('d'), array('b')
+    kinds, status = array('b'), array('b')
+    for row, item in enumerate(items):
+        ids.append(item.id)
+        estimate = item.estimate
+        hours.append(_NO_ESTIMATE if estimate is None else estimate.hours)
+        if isinstance(estimate, PertEstimate):
+            dist_rows.append(row)
+            dist_kinds.append(_PERT)
+            dist_params.extend((estimate.low, estimate.likely, estimate.high))
+        elif isinstance(estimate, LogNormalEstimate):
+            dist_rows.append(row)
+            dist_kinds.append(_LOGNORMAL)
+            dist_params.extend((estimate.mu, estimate.sigma, 0.0))
+        due.append(_ordinal(item.due_date))
+        start.append(_ordinal(item.start_date))
+        end.append(_ordinal(item.end_date))
+        deps.extend(sorted(item.depends))
+        dep_offsets.append(len(deps))
+        if isinstance(item, Epic):
+            members.extend(t.id for t in item.tasks)
+        member_offsets.append(len(members))
+        kind = _kind(type(item))
+        if item.name is None:
+            kind |= _NO_NAME
+        else:
+            names += str(item.name).encode('utf-8')
+        name_offsets.append(len(names))
+        kinds.append(kind)
+        status.append(_STATUSES.index(item.status))
+        assignee = getattr(item, 'assignee', None)
+        if assignee is None:
+            assignees.append(-1)
+        else:
+            assignee = str(assignee)
+            index = resources.get(assignee)
+            if index is None:
+                index = resources[assignee] = len(resources)
+                assignee_names += assignee.encode('utf-8')
+                assignee_offsets.append(len(assignee_names))
+            assignees.append(index)
+    calendar = plan.calendar
+    workdays = sum(1 << d for d in calendar.workdays)
+    holidays = array('q', (d.toordinal() for d in calendar.holidays))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, workdays, len(ids), len(deps), len(members),
+                            len(names), len(holidays), plan._id_counter))
+        f.write(_HEADER_EXTRA[VERSION].pack(len(resources), len(assignee_names), len(dist_rows)))
+        for column in (ids, due, start, end, hours, dep_offsets, deps, member_offsets, members,
+                       name_offsets, holidays, assignees, assignee_offsets, dist_rows, dist_params,
+                       kinds, status, dist_kinds):
+            _write(f, column)
+        f.write(names)
+        f.write(assignee_names)
+
+
+def _read_header(buf):
+    """Return (version, workdays, n, edges, members, name bytes, holidays,
+    id counter, assignees, assignee name bytes, distributions) and the
+    header size."""
+    magic, version, workdays, n, edges, members, name_bytes, holidays, counter = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError("Not a notjira plan file")
+    extra = _HEADER_EXTRA.get(version)
+    if extra is None:
+        raise ValueError(f"Unsupported plan file version {version}")
+    # fields of later versions are zero in older files
+    extra_fields = (extra.unpack_from(buf, HEADER.size) + (0, 0, 0))[:3]
+    return ((version, workdays, n, edges, members, name_bytes, holidays, counter) + extra_fields,
+            HEADER.size + extra.size)
+
+
+def _layout(version, n, edges, members, holidays, resources, distributions):
+    """Yield (name, typecode, count) for every section after the header."""
+    yield from (('ids', 'q', n), ('due', 'q', n), ('start', 'q', n), ('end', 'q', n),
+                ('hours', 'd', n), ('dep_offsets', 'q', n + 1), ('deps', 'q', edges),
+                ('member_offsets', 'q', n + 1), ('members', 'q', members),
+                ('name_offsets', 'q', n + 1), ('holidays', 'q', holidays))
+    if version >= 2:
+        yield from (('assignees', 'q', n), ('assignee_offsets', 'q', resources + 1))
+    if version >= 3:
+        yield from (('dist_rows', 'q', distributions), ('dist_params', 'd', 3 * distributions))
+    yield from (('kinds', 'b', n), ('status', 'b', n))
+    if version >= 3:
+        yield ('dist_kinds', 'b', distributions)
+
+
+def _distributions(cols):
+    """{row: PERT or lognormal estimate} from the distribution sections."""
+    if 'dist_rows' not in cols:
+        return {}
+    estimates = {}
+    params, hours = cols['dist_params'], cols['hours']
+    for i, (row, kind) in enumerate(zip(cols['dist_rows'], cols['dist_kinds'])):
+        a, b, c = params[3 * i:3 * i + 3]
+        if kind == _PERT:
+            estimates[row] = PertEstimate(a, b, c)
+        else:
+            estimates[row] = LogNormalEstimate.restore(a, b, hours[row])
+    return estimates
+
+
+def _calendar(workdays, holidays):
+    return WorkCalendar([d for d in range(7) if workdays >> d & 1],
+                        [date.fromordinal(x) for x in holidays])
+
+
+def load_plan(path, make_default=True):
+    """Read a file written by save_plan() into a new Plan of Task/Epic objects.
+
+    Items are rebuilt with Base.restore and registered under their stored
+    ids in one pass; no estimate parsing or cycle checks run.
+    """
+    with gc_paused():
+        return _load_plan(path, make_default)
+
+
+def _load_plan(path, make_default):
+    with open(path, 'rb') as f:
+        head = f.read(HEADER.size + max(x.size for x in _HEADER_EXTRA.values()))
+        (version, workdays, n, edges, members, name_bytes, holidays, counter,
+         resource_count, resource_bytes, distributions), size = _read_header(head)
+        f.seek(size)
+        cols = {}
+        for name, typecode, count in _layout(version, n, edges, members, holidays, resource_count,
+                                             distributions):
+            column = array(typecode)
+            column.fromfile(f, count)
+            if not _LITTLE and column.itemsize > 1:
+                column.byteswap()
+            cols[name] = column
+        names = f.read(name_bytes)
+        resource_names = f.read(resource_bytes)
+    plan = Plan(make_default=make_default, calendar=_calendar(workdays, cols['holidays']))
+    dep_offsets, deps = cols['dep_offsets'], cols['deps']
+    name_offsets = cols['name_offsets']
+    assignees = cols.get('assignees')
+    if assignees is not None:
+        offsets = cols['assignee_offsets']
+        resources = [resource_names[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(resource_count)]
+    spread = _distributions(cols)
+    epics = []
+    for row in range(n):
+        kind = cols['kinds'][row]
+        hours = cols['hours'][row]
+        lo, hi = dep_offsets[row], dep_offsets[row + 1]
+        cls = _KINDS[kind & _KIND_MASK]
+        if hours != hours:
+            estimate = None
+        elif spread and row in spread:
+            estimate = spread[row]
+        else:
+            estimate = TimeEstimate.intern(hours)
+        extra = {}
+        if cls is Task and assignees is not None and assignees[row] >= 0:
+            extra['assignee'] = resources[assignees[row]]
+        item = cls.restore(
+            name=None if kind & _NO_NAME else names[name_offsets[row]:name_offsets[row + 1]].decode('utf-8'),
+            depends=set(deps[lo:hi]) if hi > lo else None,
+            estimate=estimate,
+            due_date=_date(cols['due'][row]),
+            status=_STATUSES[cols['status'][row]],
+            start_date=_date(cols['start'][row]),
+            end_date=_date(cols['end'][row]),
+            **extra)
+        plan.register_item(item, item_id=cols['ids'][row])
+        if isinstance(item, Epic):
+            epics.append((item, row))
+    member_offsets, member_ids = cols['member_offsets'], cols['members']
+    for epic, row in epics:
+        epic.tasks = [plan.get_item(i) for i in member_ids[member_offsets[row]:member_offsets[row + 1]]]
+    plan._id_counter = max(plan._id_counter, counter)
+    return plan
+
+
+class _Names:
+    """Lazily decoded name column over a mapped file."""
+
+    def __init__(self, blob, offsets, kinds):
+        self._blob = blob
+        self._offsets = offsets
+        self._kinds = kinds
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def __getitem__(self, row):
+        if self._kinds[row] & _NO_NAME:
+            return None
+        return str(self._blob[self._offsets[row]:self._offsets[row + 1]], 'utf-8')
+
+
+def open_mapped(path):
+    """Memory-map a saved plan and return it as a ColumnarPlan.
+
+    Nothing is parsed up front, so opening is constant time regardless of
+    plan size. The mapping is copy-on-write: the file is never modified,
+    but the returned plan can still be scheduled in memory. Estimates are
+    read as their mean hours; load_plan keeps PERT and lognormal spreads.
+    """
+    if not _LITTLE:
+        raise NotImplementedError("Memory-mapped plans require a little-endian machine")
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(buf)
+    (version, workdays, n, edges, members, name_bytes, holidays, _,
+     resources, _, distributions), offset = _read_header(view)
+    cols = {}
+    for name, typecode, count in _layout(version, n, edges, members, holidays, resources, distributions):
+        size = count * struct.calcsize(typecode)
+        cols[name] = view[offset:offset + size].cast(typecode)
+        offset += size
+    names = _Names(view[offset:offset + name_bytes], cols['name_offsets'], cols['kinds'])
+    return ColumnarPlan.from_columns(
+        cols['ids'], names, cols['hours'], cols['status'], cols['due'],
+        cols['start'], cols['end'], cols['dep_offsets'], cols['deps'],
+        calendar=_calendar(workdays, cols['holidays']), kinds=cols['kinds'],
+        member_offsets=cols['member_offsets'], members=cols['members'])
@@ -1,18 +1,44 @@
 from notjira.base import Base
 from notjira.time_estimate import TimeEstimate
-from notjira.context import PlanContext
 
 
 class Task(Base):
-    def __init__(self, name=None, **kw):
+    __slots__ = ('_assignee',)
+
+    def __init__(self, name=None, assignee=None, **kw):
+       """
+       Args:
+           name: Task name
+           assignee: person or resource doing the task, see leveling.level
+           **kw: passed to Base
+       """
+       self._assignee = assignee
        super(Task, self).__init__(name=name, **kw)
        
+    @classmethod
+    def restore(cls, assignee=None, **fields):
+        task = super().restore(**fields)
+        task._assignee = assignee
+        return task
+
     def __repr__(self):
         return f"<Task {self._id} {self._name} {self._estimate}>"
+
+    @property
+    def assignee(self):
+        return self._assignee
+
+    @assignee.setter
+    def assignee(self, assignee):
+        with self._plan_lock():
+            old = self._assignee
+            self._assignee = assignee
+            if self._plan is not None:
+                self._plan.notify('assignee', self._id, old, assignee)
     
     def __add__(self, other):
         if isinstance(other, Task):
-            epic = Epic(tasks=[self, other])
+            epic = Epic(tasks=[self, other], plan=self._plan)
             epic.recalculate_estimate()
             return epic
         else:
@@ -20,6 +46,8 @@ class Task(Base):
 
 
 class Epic(Base):
+    __slots__ = ('_tasks',)
+
     def __init__(self, name=None, tasks=None, chain=True, **kw):
         """Epic groups tasks and aggregates their estimates.
 
@@ -28,11 +56,12 @@ class Epic(Base):
             tasks: Optional iterable of Task objects
             chain: If True, each task after the first depends on the previous
                    task (A -> B -> C). Existing dependencies are preserved.
-            **kw: Shorthand keys (n,e,...) passed to Base
+            **kw: plan, or shorthand keys (n,e,...), passed to Base
         """
+        self._tasks = []
         super(Epic, self).__init__(name=name, **kw)
         self._estimate = TimeEstimate(0)
-        self._tasks = [x for x in tasks] if tasks is not None else []
+        self.tasks = tasks if tasks is not None else []
         if chain and len(self._tasks) > 1:
             prev = None
             for t in self._tasks:
@@ -44,7 +73,7 @@ class Epic(Base):
             first = self._tasks[0]
             for dep_id in list(self.depends):
                 try:
-                    dep_item = PlanContext().default_plan.get_item(dep_id)
+                    dep_item = self._plan.get_item(dep_id)
                 except KeyError:
                     continue
                 if isinstance(dep_item, Epic) and dep_item.tasks:
@@ -52,6 +81,12 @@ class Epic(Base):
                     first.add_dependency(dep_item.tasks[-1])
         self.recalculate_estimate()
 
+    @classmethod
+    def restore(cls, tasks=(), **fields):
+        epic = super().restore(**fields)
+        epic._tasks = list(tasks)
+        return epic
+
     def add_dependency(self, item):
         """Add a dependency to the epic and propagate to its first task.
 
@@ -75,15 +110,29 @@ class Epic(Base):
         return self
 
 
+    def clone(self):
+        epic = super().clone()
+        epic._tasks = list(self._tasks)
+        return epic
+
+    def set_plan(self, plan):
+        super().set_plan(plan)
+        if plan is not None:
+            plan.add_epic_members(self._id, [t.id for t in self._tasks])
+
     def recalculate_estimate(self):
-        self._estimate = TimeEstimate(0)
-        for task in self._tasks:
-            self._estimate += task.estimate
-            
+        with self._plan_lock():
+            self.estimate = TimeEstimate.sum(self._tasks)
+
     def __add__(self, other):
         if isinstance(other, Task):
-            self._tasks.append(other)
-            self.recalculate_estimate()
+            with self._plan_lock():
+                self._tasks.append(other)
+                if self._plan is not None:
+                    self._plan.add_epic_members(self._id, [other.id])
+                    self._plan.notify('tasks', self._id, [], [other.id])
+                # keep a running total instead of re-summing every task
+                self.estimate = self._estimate + other.estimate
             return self
         elif isinstance(other, Epic):
             return self.estimate + other.estimate
@@ -102,7 +151,15 @@ class Epic(Base):
     
     @tasks.setter
     def tasks(self, tasks):
-        self.tasks = [x for x in tasks]
+        with self._plan_lock():
+            old = self._tasks
+            if self._plan is not None:
+                self._plan.remove_epic_members(self._id, [t.id for t in old])
+            self._tasks = [x for x in tasks]
+            if self._plan is not None:
+                self._plan.add_epic_members(self._id, [t.id for t in self._tasks])
+                if old or self._tasks:
+                    self._plan.notify('tasks', self._id, [t.id for t in old], [t.id for t in self._tasks])
         
     def __repr__(self):
         repr_string = f"<Epic {self.id} {self.name} tasks:\n"
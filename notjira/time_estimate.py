@@ -1,4 +1,41 @@
+import math
+from functools import lru_cache
+
+# hours per unit; days are 8h and weeks 5 days
+_UNITS = {'m': 1 / 60, 'h': 1, 'd': 8, 'w': 8 * 5}
+_NUMBER = r'(\d+(?:\.\d*)?|\.\d+)'
+
+
+@lru_cache(maxsize=None)
+def _patterns():
+    # compiled on first compound estimate; most estimates take the fast path
+    import re
+    return (re.compile(rf'(\s*{_NUMBER}\s*[mhdw])+\s*'),
+            re.compile(rf'{_NUMBER}\s*([mhdw])'))
+
+
+@lru_cache(maxsize=1024)
+def _parse_hours(text):
+    """Hours in an estimate string such as '2d', '90m' or '1w 2d 4h'."""
+    key = text.strip().lower()
+    # fast path: a single number and unit
+    try:
+        return float(key[:-1]) * _UNITS[key[-1]]
+    except (KeyError, ValueError, IndexError):
+        pass
+    compound, part = _patterns()
+    if not compound.fullmatch(key):
+        raise ValueError(f"Cannot parse time estimate {text!r}")
+    return sum(float(value) * _UNITS[unit] for value, unit in part.findall(key))
+
+
 class TimeEstimate:
+    """An immutable amount of work in hours (8h days, 5 day weeks)."""
+    __slots__ = ('_value',)
+    # Shared instances for recurring values, see intern()
+    _interned = {}
+    _interned_max = 4096
+
     def __init__(self, value_hours=0):
         self._value = value_hours
         
@@ -22,9 +59,7 @@ class TimeEstimate:
         elif other is None:
             return self
         elif isinstance(other, list):
-            for item in other:
-                self += item 
-            return self 
+            return TimeEstimate.sum([self] + other)
         else:
             try:
                 return other.estimate + self
@@ -44,6 +79,34 @@ class TimeEstimate:
     def hours(self):
         return self._value
     
+    @classmethod
+    def intern(cls, value_hours):
+        """Return a shared estimate for ``value_hours``.
+
+        Plans reuse a handful of values ('1d', '2w', ...), so parsed
+        estimates are shared instead of allocated per item.
+        """
+        estimate = cls._interned.get(value_hours)
+        if estimate is None:
+            estimate = cls(value_hours)
+            if len(cls._interned) < cls._interned_max:
+                cls._interned[value_hours] = estimate
+        return estimate
+
+    @staticmethod
+    def sum(items):
+        """Add up estimates, or items carrying one, in a single allocation.
+
+        None entries (and items without an estimate) count as zero.
+        """
+        total = 0
+        for item in items:
+            if item is not None and not isinstance(item, TimeEstimate):
+                item = item.estimate
+            if item is not None:
+                total += item._value
+        return TimeEstimate(total)
+
     @staticmethod
     def auto(input_value):
         if isinstance(input_value, TimeEstimate):
@@ -55,14 +118,70 @@ class TimeEstimate:
         else:
             raise
     
+    @staticmethod
+    def pert(low, likely, high):
+        """Three-point estimate, see PertEstimate."""
+        return PertEstimate(_hours(low), _hours(likely), _hours(high))
+
+    @staticmethod
+    def lognormal(low, high):
+        """Estimate with a 90% chance of falling between low and high, see LogNormalEstimate."""
+        return LogNormalEstimate(_hours(low), _hours(high))
+
     @staticmethod
     def from_string(string_value):
-        if string_value[-1] == 'd':
-            hours = float(string_value.split('d')[0]) * 8
-        elif string_value[-1] == 'w':
-            hours = float(string_value.split('w')[0]) * 8 * 5
-        elif string_value[-1] == 'h':
-            hours = float(string_value.split('h')[0])
-        else:
-            raise
-        return TimeEstimate(hours)
+        """Parse '4h', '2d', '1.5w', '30m' or compound '1w 2d 4h'.
+
+        Parsed strings are cached, and equal values share one instance.
+        """
+        return TimeEstimate.intern(_parse_hours(string_value))
+
+
+def _hours(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    return TimeEstimate.auto(value).hours
+
+
+class PertEstimate(TimeEstimate):
+    """Three-point estimate following a PERT (scaled beta) distribution.
+
+    Behaves as its mean, (low + 4 * likely + high) / 6 hours, everywhere
+    a single number is needed; forecast.forecast() samples the spread.
+    """
+    __slots__ = ('low', 'likely', 'high')
+
+    def __init__(self, low, likely, high):
+        if not low <= likely <= high:
+            raise ValueError(f"PERT estimate needs low <= likely <= high, got {low}, {likely}, {high}")
+        super().__init__((low + 4 * likely + high) / 6)
+        self.low = low
+        self.likely = likely
+        self.high = high
+
+
+class LogNormalEstimate(TimeEstimate):
+    """Right-skewed estimate, lognormal with 5th/95th percentiles low and high.
+
+    Behaves as its mean everywhere a single number is needed;
+    forecast.forecast() samples the spread.
+    """
+    __slots__ = ('mu', 'sigma')
+    # standard normal 95th percentile
+    _Z95 = 1.6448536269514722
+
+    def __init__(self, low, high):
+        if not 0 < low <= high:
+            raise ValueError(f"Lognormal estimate needs 0 < low <= high, got {low}, {high}")
+        self.mu = (math.log(low) + math.log(high)) / 2
+        self.sigma = (math.log(high) - math.log(low)) / (2 * self._Z95)
+        super().__init__(math.exp(self.mu + self.sigma ** 2 / 2))
+
+    @classmethod
+    def restore(cls, mu, sigma, hours):
+        """Rebuild a stored estimate from its parameters and mean hours."""
+        estimate = cls.__new__(cls)
+        estimate.mu = mu
+        estimate.sigma = sigma
+        TimeEstimate.__init__(estimate, hours)
+        return estimate
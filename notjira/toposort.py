@@ -0,0 +1,110 @@
+"""Topological ordering of planning items.
+
+Kahn's algorithm with a deque for first-in-first-out order, or a heap when a
+priority is given so that runs over the same plan are reproducible.
+"""
+
+from collections import deque
+from datetime import date
+from heapq import heapify, heappop, heappush
+
+from notjira.work_calendar import as_date
+
+
+class CycleError(RuntimeError):
+    """Raised when dependencies form a cycle.
+
+    ``cycle`` lists the ids on the cycle; each one depends on the next and
+    the last depends on the first.
+    """
+
+    def __init__(self, cycle):
+        self.cycle = list(cycle)
+        path = ' -> '.join(str(x) for x in self.cycle + self.cycle[:1])
+        super().__init__(f"Cycle detected in dependencies: {path}")
+
+    def __reduce__(self):
+        # rebuild from the cycle so the error survives pickling (process pools)
+        return (type(self), (self.cycle,))
+
+
+def _due_date_key(item):
+    due = as_date(item.due_date)
+    # undated items go last
+    return (due is None, due or date.min, item.id)
+
+
+PRIORITIES = {
+    'id': lambda item: item.id,
+    'due_date': _due_date_key,
+}
+
+
+def topological_sort(items, priority=None, dependents=None):
+    """Return items ordered so every item follows the items it depends on.
+
+    Dependencies pointing outside ``items`` are ignored.
+
+    Args:
+        items: iterable of planning items
+        priority: None for input order, 'id', 'due_date' or a key function;
+                  among ready items the smallest key comes first
+        dependents: optional callable returning the ids depending on an id,
+                    e.g. ``plan.dependents``; saves building a reverse graph
+    Raises: CycleError with the offending cycle
+    """
+    id_to_item = {x.id: x for x in items}
+    indeg = dict.fromkeys(id_to_item, 0)
+    if dependents is None:
+        graph = {i: [] for i in id_to_item}
+        for i, x in id_to_item.items():
+            for d in x.depends:
+                if d in graph:
+                    graph[d].append(i)
+                    indeg[i] += 1
+        dependents = graph.__getitem__
+    else:
+        for i, x in id_to_item.items():
+            for d in x.depends:
+                if d in indeg:
+                    indeg[i] += 1
+    ordered = []
+    if priority is None:
+        queue = deque(i for i, v in indeg.items() if v == 0)
+        pop, push = queue.popleft, queue.append
+    else:
+        key = PRIORITIES[priority] if isinstance(priority, str) else priority
+        queue = [(key(id_to_item[i]), i) for i, v in indeg.items() if v == 0]
+        heapify(queue)
+        pop = lambda: heappop(queue)[1]
+        push = lambda i: heappush(queue, (key(id_to_item[i]), i))
+    while queue:
+        n = pop()
+        ordered.append(id_to_item[n])
+        for m in dependents(n):
+            if m in indeg:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    push(m)
+    if len(ordered) != len(id_to_item):
+        raise CycleError(_find_cycle(id_to_item, indeg))
+    return ordered
+
+
+def _find_cycle(id_to_item, indeg):
+    # Every item left with a positive in-degree still waits on another such
+    # item, so following those dependencies must eventually revisit a node.
+    remaining = {i for i, v in indeg.items() if v > 0}
+    node = next(iter(remaining))
+    position = {}
+    path = []
+    while node not in position:
+        position[node] = len(path)
+        path.append(node)
+        waiting = [d for d in id_to_item[node].depends if d in remaining]
+        if not waiting:
+            # only possible when ``dependents`` misses edges of item.depends
+            raise RuntimeError(f"Item {node} was never released: the dependents index "
+                               f"disagrees with its depends {sorted(id_to_item[node].depends)}")
+        node = waiting[0]
+    return path[position[node]:]
@@ -1,107 +1,179 @@
+from notjira import instrument
 from notjira.context import PlanContext 
 from notjira.base import Base
+from notjira.columnar import ColumnarPlan
+from contextlib import contextmanager
+import gc
+from notjira.toposort import topological_sort
 from datetime import date, timedelta
 
 
-def dependency_list(task_or_task_id):
-    if isinstance(task_or_task_id, Base):
-       task_id = task_or_task_id.id
-    else:
-       task_id = task_or_task_id
-    visit_queue = list()
-    dependencies = set()
-    visit_queue.append(task_id)
-    while len(visit_queue):
-       c_item = visit_queue[0]
-       del visit_queue[0]
-       other_item = PlanContext().default_plan.get_item(c_item)
-       for x in other_item.depends:
-           if x in dependencies:
-               continue
-           dependencies.add(x)
-           visit_queue.append(x)
-    return dependencies
-
-
-def _topological_sort(items):
-   # Kahn's algorithm
-   indeg = {x.id:0 for x in items}
-   graph = {x.id:set() for x in items}
-   for x in items:
-      for d in x.depends:
-         graph[d].add(x.id)
-         indeg[x.id] += 1
-   queue = [i for i, v in indeg.items() if v == 0]
-   ordered = []
-   while queue:
-      n = queue.pop(0)
-      ordered.append(n)
-      for m in graph[n]:
-         indeg[m]-=1
-         if indeg[m]==0:
-            queue.append(m)
-   if len(ordered)!=len(items):
-      raise RuntimeError("Cycle detected in dependencies")
-   id_to_item = {x.id:x for x in items}
-   return [id_to_item[i] for i in ordered]
-
-
-def schedule(plan=None, start_date=None):
+def dependency_list(task_or_task_id, plan=None):
+   """Return the set of ids the item transitively depends on.
+
+   Answered from the plan's dependency index; closures are memoised by the
+   plan until the next edit.
+   """
+   if isinstance(task_or_task_id, Base):
+      task_id = task_or_task_id.id
+      if plan is None:
+         plan = task_or_task_id.plan
+   else:
+      task_id = task_or_task_id
+   if plan is None:
+      plan = PlanContext().default_plan
+   return set(plan.ancestors(task_id))
+
+
+@contextmanager
+def gc_paused():
+   """Suspend the cyclic garbage collector while building many objects.
+
+   Bulk loads allocate millions of objects that all stay alive; letting
+   the collector rescan them repeatedly roughly doubles the load time.
+   """
+   was_enabled = gc.isenabled()
+   gc.disable()
+   try:
+      yield
+   finally:
+      if was_enabled:
+         gc.enable()
+
+
+def _topological_sort(items, priority=None):
+   return topological_sort(items, priority=priority)
+
+
+def schedule(plan=None, start_date=None, priority=None, engine="python", workers=None):
    """Assign start/end dates to tasks in a plan using ASAP scheduling.
 
+   Dates are kept by the plan's Scheduler between calls, so only items
+   downstream of a change since the previous call are recomputed.
+
    Args:
       plan: Plan instance or None for default
       start_date: date to begin (defaults to today)
+      priority: order of ready items, see toposort.topological_sort;
+                'id' or 'due_date' give reproducible output
+      engine: "python" for the incremental Scheduler (ColumnarPlan.schedule
+              for a ColumnarPlan), or "numpy" for the vectorized
+              level-by-level pass in numpy_engine; all give the same dates
+      workers: schedule independent components in this many processes
+               (see parallel.schedule_parallel); results come in plan order
    Returns: list of (task, start_date, end_date)
    """
    if plan is None:
       plan = PlanContext().default_plan
-   if start_date is None:
-      start_date = date.today()
-   tasks = [t for t in plan.items() if isinstance(t, Base)]
-   ordered = _topological_sort(tasks)
-   id_to_task = {t.id:t for t in tasks}
-   task_dates = {}
-   for task in ordered:
-      # earliest dependency end date (if any)
-      if task.depends:
-         dep_end = None
-         for d in task.depends:
-            candidate_end = task_dates[d][1]
-            dep_end = candidate_end if dep_end is None else max(dep_end, candidate_end)
-         # start day is the next calendar day after dep_end
-         dep_start = dep_end + timedelta(days=1)
+   with instrument.phase('schedule') as span:
+      if workers is not None:
+         if engine != "python":
+            raise ValueError("workers= is only supported by the python engine")
+         if isinstance(plan, ColumnarPlan):
+            raise TypeError("workers= is not supported for a ColumnarPlan")
+         from notjira.parallel import schedule_parallel
+         result = schedule_parallel(plan, start_date, workers)
+      elif engine == "numpy":
+         from notjira.numpy_engine import schedule_numpy
+         result = schedule_numpy(plan, start_date)
+      elif engine != "python":
+         raise ValueError(f"Unknown scheduling engine: {engine}")
+      elif isinstance(plan, ColumnarPlan):
+         if priority is not None:
+            raise TypeError("priority= is not supported for a ColumnarPlan")
+         result = plan.schedule(start_date)
       else:
-         dep_start = start_date
-      # bump to weekday if weekend
-      while dep_start.weekday() >= 5:
-         dep_start += timedelta(days=1)
-      task.start_date = dep_start
-      end_date = task.compute_end_date()
-      # If computed end falls on weekend due to zero estimate handling, okay; duration calc in Base already skips weekends for counting
-      task_dates[task.id] = (task.start_date, end_date)
-   return [(id_to_task[i], *task_dates[i]) for i in task_dates]
-
-
-def gantt_ascii(plan=None, start_date=None):
-   """Return a simple ASCII Gantt chart string."""
+         scheduler = plan.scheduler()
+         scheduler.priority = priority
+         result = scheduler.run(start_date)
+      span.set(items=len(result))
+   return result
+
+
+_GRANULARITY_DAYS = {'day': 1, 'week': 7}
+_LABEL_WIDTH = 8   # "name[:7]|"
+
+
+def _month_index(d):
+   return d.year * 12 + d.month - 1
+
+
+def _auto_granularity(min_start, max_end, width):
+   """Pick the finest granularity whose columns fit in ``width``."""
+   if width is None:
+      return 'day'
+   available = max(width - _LABEL_WIDTH, 1)
+   total_days = (max_end - min_start).days + 1
+   if total_days <= available:
+      return 'day'
+   monday = min_start - timedelta(days=min_start.weekday())
+   if (max_end - monday).days // 7 + 1 <= available:
+      return 'week'
+   if _month_index(max_end) - _month_index(min_start) + 1 <= available:
+      return 'month'
+   # multi-day buckets
+   return -(-total_days // available)
+
+
+def iter_gantt_ascii(plan=None, start_date=None, granularity='day', width=None):
+   """Yield the lines of an ASCII Gantt chart one at a time.
+
+   Args:
+      plan: Plan instance or None for default
+      start_date: date to begin (defaults to today)
+      granularity: 'day', 'week', 'month', a number of days per column, or
+                   'auto' to pick the finest one that fits ``width``
+      width: maximum line length; longer lines are clipped
+   """
+   if granularity not in ('auto', 'month', *_GRANULARITY_DAYS) and not (
+         isinstance(granularity, int) and granularity > 0):
+      raise ValueError(f"granularity must be 'day', 'week', 'month', 'auto' or a positive number of days, "
+                       f"not {granularity!r}")
    sched = schedule(plan, start_date)
    if not sched:
-      return "<empty plan>"
+      yield "<empty plan>"
+      return
    min_start = min(s for _,s,_ in sched)
    max_end = max(e for _,_,e in sched)
-   total_days = (max_end - min_start).days + 1
-   lines = []
-   header = "Date    |" + ''.join((min_start + timedelta(days=i)).strftime('%d') for i in range(total_days))
-   lines.append(header)
-   lines.append('-'*len(header))
+   if granularity == 'auto':
+      granularity = _auto_granularity(min_start, max_end, width)
+   if granularity == 'month':
+      origin = _month_index(min_start)
+      column = lambda d: _month_index(d) - origin
+      column_start = lambda c: date((origin + c) // 12, (origin + c) % 12 + 1, 1)
+      label_format = '%Y-%m'
+   else:
+      days = _GRANULARITY_DAYS.get(granularity, granularity)
+      first = min_start - timedelta(days=min_start.weekday()) if days == 7 else min_start
+      column = lambda d: (d - first).days // days
+      column_start = lambda c: first + timedelta(days=c * days)
+      label_format = '%m-%d'
+   total = column(max_end) + 1
+   if granularity in ('day', 1):
+      header = "Date    |" + ''.join((min_start + timedelta(days=i)).strftime('%d') for i in range(total))
+   else:
+      # column start labels, one every len(label) + 1 columns; only whole
+      # labels, the last one must end by the last column
+      step = len(column_start(0).strftime(label_format)) + 1
+      labels = ''.join(column_start(c).strftime(label_format).ljust(step) for c in range(0, total - step + 2, step))
+      header = "Date    |" + labels.ljust(total)[:total]
+   clip = (lambda line: line[:width]) if width is not None else (lambda line: line)
+   yield clip(header)
+   yield clip('-'*len(header))
    for task, s, e in sched:
-      start_offset = (s - min_start).days
-      end_offset = (e - min_start).days
-      bar = ''.join('#' if start_offset <= i <= end_offset else ' ' for i in range(total_days))
-      lines.append(f"{task.name[:7]:7}|{bar}")
-   return '\n'.join(lines)
+      start_offset = column(s)
+      end_offset = column(e)
+      bar = ' '*start_offset + '#'*(end_offset - start_offset + 1) + ' '*(total - end_offset - 1)
+      yield clip(f"{task.name[:7]:7}|{bar}")
 
-        
-       
-    
+
+def gantt_ascii(plan=None, start_date=None, granularity='day', width=None):
+   """Return a simple ASCII Gantt chart string.
+
+   See iter_gantt_ascii for the options; iterate over that instead to
+   stream very large charts line by line.
+   """
+   with instrument.phase('gantt_ascii') as span:
+      lines = list(iter_gantt_ascii(plan, start_date, granularity, width))
+      span.set(lines=len(lines))
+   return '\n'.join(lines)
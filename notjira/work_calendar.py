@@ -0,0 +1,107 @@
+"""Working-day calendar arithmetic.
+
+Dates are mapped to a working-day index (the number of working days before
+them), which makes adding or counting working days closed-form in the work
+week and a bisect over the sorted holiday ordinals.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+
+class WorkCalendar:
+    def __init__(self, workdays=(0, 1, 2, 3, 4), holidays=()):
+        """
+        Args:
+            workdays: weekday numbers that are worked (Monday is 0)
+            holidays: dates (or ISO date strings) that are not worked
+        """
+        workdays = sorted(set(workdays))
+        if not workdays or workdays[0] < 0 or workdays[-1] > 6:
+            raise ValueError(f"Invalid work week: {workdays}")
+        self._workdays = tuple(workdays)
+        self._mask = tuple(d in workdays for d in range(7))
+        self._per_week = len(workdays)
+        # working days in weekdays [0, w)
+        self._before = tuple(sum(self._mask[:w]) for w in range(8))
+        ordinals = set()
+        for day in holidays:
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            if self._mask[day.weekday()]:
+                ordinals.add(day.toordinal())
+        self._holidays = sorted(ordinals)
+        self._holiday_set = frozenset(ordinals)
+
+    def __repr__(self):
+        return f"<WorkCalendar workdays={self._workdays} holidays={len(self._holidays)}>"
+
+    @property
+    def workdays(self):
+        return self._workdays
+
+    @property
+    def holidays(self):
+        return [date.fromordinal(x) for x in self._holidays]
+
+    def is_working_day(self, day):
+        return self._mask[day.weekday()] and day.toordinal() not in self._holiday_set
+
+    def index(self, day):
+        """Number of working days before ``day``."""
+        ordinal = day.toordinal()
+        # date.fromordinal(1) is a Monday
+        weeks, weekday = divmod(ordinal - 1, 7)
+        count = weeks * self._per_week + self._before[weekday]
+        if self._holidays:
+            count -= bisect_left(self._holidays, ordinal)
+        return count
+
+    def _plain_ordinal(self, index):
+        weeks, rem = divmod(index, self._per_week)
+        return weeks * 7 + self._workdays[rem] + 1
+
+    def from_index(self, index):
+        """Return the working day with the given index (inverse of index())."""
+        if not self._holidays:
+            return date.fromordinal(self._plain_ordinal(index))
+        # Holidays push the target right; iterate to the fixed point, which
+        # takes one step per run of holidays crossed.
+        plain = index
+        while True:
+            ordinal = self._plain_ordinal(plain)
+            shifted = index + bisect_right(self._holidays, ordinal)
+            if shifted == plain:
+                return date.fromordinal(ordinal)
+            plain = shifted
+
+    def next_working_day(self, day):
+        """Return ``day`` if it is worked, else the first working day after it."""
+        if self.is_working_day(day):
+            return day
+        return self.from_index(self.index(day))
+
+    def add_working_days(self, day, count):
+        """Return the date ``count`` working days after ``day``."""
+        if count <= 0:
+            return day
+        worked = self.index(day) + (1 if self.is_working_day(day) else 0)
+        return self.from_index(worked + count - 1)
+
+    def working_days_between(self, start, end):
+        """Count working days from ``start`` to ``end``, both inclusive."""
+        if end < start:
+            return 0
+        return self.index(end + timedelta(days=1)) - self.index(start)
+
+
+DEFAULT_CALENDAR = WorkCalendar()
+
+
+def as_date(value):
+    """Return ``value`` as a date; ISO strings are parsed, None passes through."""
+    if value is None or isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    raise TypeError(f"Cannot interpret {value!r} as a date")
@@ -0,0 +1,15 @@
+from notjira.bench import compare
+
+
+def _result(seconds, stdev=0.0):
+    return {'benchmark': 'gantt_ascii', 'shape': 'dag', 'items': 1000, 'seconds': seconds, 'stdev': stdev}
+
+
+def test_compare_ignores_slowdowns_within_the_noise_floor():
+    # a 4ms benchmark that took 2.5ms longer once
+    assert not compare([_result(0.0065)], [_result(0.004)])[0]['regression']
+    # slower by more than the floor, but repeats spread just as far
+    assert not compare([_result(0.045, stdev=0.01)], [_result(0.02)])[0]['regression']
+    assert compare([_result(0.05, stdev=0.001)], [_result(0.02)])[0]['regression']
+    # baselines saved without a stdev still compare
+    assert compare([_result(0.05)], [{**_result(0.02), 'stdev': None}])[0]['regression']
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+
+from notjira.columnar import ColumnarPlan
+from notjira.context import Plan
+from notjira.task import Epic, Task
+from notjira.utils import schedule
+
+START = date(2024, 1, 1)
+
+
+def _plan():
+    plan = Plan(make_default=False)
+    a = Task('a', e='2d', plan=plan)
+    b = Task('b', e='1d', d=a, plan=plan)
+    Epic('epic', tasks=[a, b], chain=False, plan=plan)
+    return plan
+
+
+def _dates(result):
+    return {x.id: (s, e) for x, s, e in result}
+
+
+def test_the_default_engine_schedules_a_columnar_plan():
+    plan = _plan()
+    columns = ColumnarPlan.from_plan(plan)
+    assert _dates(schedule(columns, START)) == _dates(schedule(plan, START))
+    with pytest.raises(TypeError):
+        schedule(columns, START, priority='id')
+    with pytest.raises(TypeError):
+        schedule(columns, START, workers=2)
+
+
+def test_views_show_the_kind_of_their_item(tmp_path):
+    plan = _plan()
+    columns = ColumnarPlan.from_plan(plan)
+    assert [repr(x).split()[0] for x in columns.items()] == ['<Task', '<Task', '<Epic']
+    path = tmp_path / 'plan.njp'
+    plan.save(path)
+    mapped = Plan.load(path, mmap=True)
+    assert [repr(x).split()[0] for x in mapped.items()] == ['<Task', '<Task', '<Epic']
+
+
+def test_epic_windows_match_the_object_plan(tmp_path):
+    plan = _plan()
+    a, b, epic = plan.items()
+    c = Task('c', e='3d', d=b, plan=plan)
+    Epic('outer', tasks=[epic, c], chain=False, plan=plan)
+    schedule(plan, START)
+    columns = ColumnarPlan.from_plan(plan)
+    schedule(columns, START)
+    assert columns.epic_windows() == plan.epic_windows()
+    path = tmp_path / 'plan.njp'
+    plan.save(path)
+    assert Plan.load(path, mmap=True).epic_windows() == plan.epic_windows()
+
+
+def test_epic_only_charts_accept_a_columnar_plan():
+    from notjira.chart import _prepare_schedule
+    plan = _plan()
+    rows = _prepare_schedule(ColumnarPlan.from_plan(plan), START, epic_only=True)
+    assert [(x.id, s, e) for x, s, e in rows] == [(x.id, s, e) for x, s, e in _prepare_schedule(plan, START, True)]
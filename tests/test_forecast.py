@@ -0,0 +1,24 @@
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.task import Epic, Task
+from notjira.time_estimate import TimeEstimate
+
+np = pytest.importorskip('numpy')
+from notjira.forecast import forecast  # noqa: E402
+
+START = date(2024, 1, 1)
+
+
+def test_epics_finish_with_their_tasks_and_take_no_time_of_their_own():
+    plan = Plan(make_default=False)
+    tasks = [Task(f't{i}', e=TimeEstimate.pert('1d', '2d', '5d'), plan=plan) for i in range(10)]
+    epic = Epic('epic', tasks=tasks, plan=plan)
+    result = forecast(plan, START, samples=2000, percentiles=(5, 50, 95), seed=4)
+    # the tasks are chained, so the last one decides everything
+    last = result.items[tasks[-1].id]
+    assert result.epics[epic.id] == last
+    assert result.finish == last
+    assert epic.id not in result.items
@@ -0,0 +1,124 @@
+import random
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.leveling import level
+from notjira.task import Task
+from notjira.utils import schedule
+
+START = date(2024, 1, 1)
+
+
+def _plan():
+    plan = Plan(make_default=False)
+    a = Task('a', e='1w', assignee='ann', plan=plan)
+    b = Task('b', e='2d', d=a, assignee='ann', plan=plan)
+    c = Task('c', e='3d', d=b, plan=plan)
+    Task('d', e='1d', plan=plan)
+    schedule(plan, START)
+    return plan, a, b, c
+
+
+def _numpy(plan):
+    pytest.importorskip('numpy')
+    return schedule(plan, START, engine='numpy')
+
+
+ENGINES = {
+    'python': lambda plan: schedule(plan, START),
+    'numpy': _numpy,
+    'parallel': lambda plan: schedule(plan, START, workers=2),
+    'level': lambda plan: level(plan, START),
+}
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_scheduling_a_fork_leaves_the_parent_alone(engine):
+    plan, a, b, c = _plan()
+    before = {x.id: (x.start_date, x.end_date) for x in plan.items()}
+    fork = plan.fork()
+    fork.edit(a.id).estimate = '3w'
+    ENGINES[engine](fork)
+    assert {x.id: (x.start_date, x.end_date) for x in plan.items()} == before
+    assert fork.dates(b.id)[0] > plan.dates(b.id)[0]
+    assert fork.dates(c.id)[0] > plan.dates(c.id)[0]
+    assert set(plan.diff(fork)) == {a.id, b.id, c.id}
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_fork_dates_match_the_python_engine(engine):
+    plan, a, b, c = _plan()
+    expected = plan.fork()
+    expected.edit(a.id).estimate = '3w'
+    schedule(expected, START)
+    fork = plan.fork()
+    fork.edit(a.id).estimate = '3w'
+    ENGINES[engine](fork)
+    assert fork.diff(expected) == {}
+
+
+def _full_diff(one, other):
+    mine, theirs = one._all_dates(), other._all_dates()
+    changes = {i: (d, theirs.get(i)) for i, d in mine.items() if d != theirs.get(i)}
+    changes.update((i, (None, d)) for i, d in theirs.items() if i not in mine)
+    return changes
+
+
+def test_diff_compares_only_what_changed_but_misses_nothing():
+    rnd = random.Random(7)
+    plan = Plan(make_default=False)
+    tasks = []
+    for i in range(300):
+        deps = rnd.sample(tasks, min(len(tasks), 2))
+        tasks.append(Task(f't{i}', e=f'{rnd.randint(1, 24)}h', d=deps or None, plan=plan))
+    schedule(plan, START)
+    first = plan.fork()
+    plan.edit(tasks[10].id).estimate = '5d'
+    plan.scheduler().update(START)
+    second = plan.fork()
+    for fork in (first, second):
+        for task in rnd.sample(tasks, 5):
+            fork.edit(task.id).estimate = f'{rnd.randint(1, 40)}h'
+        fork.deregister_item(rnd.choice(tasks).id)
+        fork.scheduler().update(START)
+    plan.edit(tasks[3].id).estimate = '2w'
+    plan.scheduler().update(START)
+    for one, other in ((plan, first), (second, plan), (first, second)):
+        expected = _full_diff(one, other)
+        assert expected
+        assert one.diff(other) == expected
+    assert len(first._diff_candidates(second)) < len(tasks)
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_a_fork_starts_from_the_dates_of_any_engine(engine):
+    plan, a, b, c = _plan()
+    plan.edit(a.id).estimate = '3w'
+    ENGINES[engine](plan)
+    fork = plan.fork()
+    assert {x.id: fork.dates(x.id) for x in plan.items()} == {x.id: plan.dates(x.id) for x in plan.items()}
+
+
+def test_changing_the_parent_leaves_a_fork_alone():
+    plan, a, b, c = _plan()
+    d = plan.get_item(c.id + 1)
+    fork = plan.fork()
+    before = {x.id: fork.dates(x.id) for x in fork.items()}
+    dependents = {x.id: set(fork.dependents(x.id)) for x in fork.items()}
+    depends = {x.id: set(x.depends) for x in fork.items()}
+    plan.add_dependency(d.id, c.id)
+    a.estimate = '4w'
+    b.name = 'renamed'
+    plan.remove_dependency(c.id, b.id)
+    schedule(plan, START)
+    assert {x.id: fork.dates(x.id) for x in fork.items()} == before
+    assert {x.id: set(fork.dependents(x.id)) for x in fork.items()} == dependents
+    assert {x.id: set(x.depends) for x in fork.items()} == depends
+    assert fork.get_item(b.id).name == 'b'
+    # the fork still schedules to the dates it was forked with
+    fork.scheduler().invalidate()
+    schedule(fork, START)
+    assert {x.id: fork.dates(x.id) for x in fork.items()} == before
+    assert plan.get_item(d.id).start_date > plan.get_item(c.id).end_date
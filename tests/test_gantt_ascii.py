@@ -0,0 +1,31 @@
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.task import Task
+from notjira.utils import gantt_ascii
+
+START = date(2024, 1, 1)
+
+
+def _plan():
+    plan = Plan(make_default=False)
+    a = Task('a', e='3w', plan=plan)
+    Task('b', e='30w', d=a, plan=plan)
+    return plan
+
+
+@pytest.mark.parametrize('granularity, label', [('week', '01-01'), ('month', '2024-01'), (3, '01-01')])
+def test_header_labels_are_never_cut(granularity, label):
+    header, rule, *rows = gantt_ascii(_plan(), START, granularity).splitlines()
+    labels = header[len('Date    |'):]
+    bars = rows[0].split('|')[1]
+    assert len(header) == len(rule) and len(labels) == len(bars)
+    assert labels.startswith(label)
+    assert all(len(word) == len(label) for word in labels.split())
+
+
+def test_unknown_granularity_names_the_options():
+    with pytest.raises(ValueError, match="'day', 'week', 'month'"):
+        gantt_ascii(_plan(), START, 'year')
@@ -0,0 +1,16 @@
+from notjira import instrument
+
+
+def test_allocations_are_a_gauge_that_can_go_down():
+    sink = instrument.PrometheusSink()
+    garbage = [object() for _ in range(10000)]
+    with instrument.instrumented(sink):
+        with instrument.phase('free', items=1):
+            del garbage[:]
+    text = sink.render()
+    assert '# TYPE notjira_phase_allocated_blocks_delta gauge' in text
+    delta = next(line for line in text.splitlines()
+                 if line.startswith('notjira_phase_allocated_blocks_delta{phase="free"}'))
+    assert int(delta.split()[-1]) < 0
+    counts = [line for line in text.splitlines() if line.startswith('notjira_phase_count_total')]
+    assert counts == ['notjira_phase_count_total{phase="free",count="items"} 1']
@@ -0,0 +1,85 @@
+import random
+from datetime import date, timedelta
+
+from notjira.base import BaseStatus
+from notjira.context import Plan
+from notjira.journal import Journal, encode_snapshot, replay
+from notjira.task import Epic, Task
+from notjira.time_estimate import TimeEstimate
+
+START = date(2024, 1, 1)
+ESTIMATES = [None, '1h', '2d', TimeEstimate.pert('1d', '2d', '1w'), TimeEstimate.lognormal('1d', '2w')]
+
+
+def _state(plan):
+    # calendar and items; undo does not hand out ids again, so the id
+    # counter is left out
+    return encode_snapshot(plan)[2:]
+
+
+def _plan(rnd):
+    plan = Plan(make_default=False)
+    tasks = [Task(f't{i}', e=rnd.choice(ESTIMATES), plan=plan) for i in range(20)]
+    Epic('epic', tasks=tasks[:5], plan=plan)
+    return plan
+
+
+def _edit(plan, rnd):
+    tasks = [x for x in plan.items() if isinstance(x, Task)]
+    task = rnd.choice(tasks)
+    action = rnd.randrange(7)
+    if action == 0:
+        task.estimate = rnd.choice(ESTIMATES)
+    elif action == 1:
+        task.status = rnd.choice(list(BaseStatus))
+    elif action == 2:
+        task.name = f'{task.name}!'
+    elif action == 3:
+        task.due_date = START + timedelta(days=rnd.randrange(30))
+    elif action == 4:
+        dep = rnd.choice(tasks)
+        if dep is not task and not plan.creates_cycle(task.id, dep.id):
+            plan.add_dependency(task.id, dep.id)
+    elif action == 5:
+        Task(f'new {rnd.random()}', e=rnd.choice(ESTIMATES), d=rnd.sample(tasks, 1), plan=plan)
+    elif not plan.dependents(task.id) and plan.epic_of(task.id) is None:
+        plan.deregister_item(task.id)
+
+
+def test_replay_rebuilds_the_plan(tmp_path):
+    rnd = random.Random(5)
+    plan = _plan(rnd)
+    path = str(tmp_path / 'plan.journal')
+    memory = Journal(plan)
+    with Journal(plan, path, snapshot_every=7):
+        for _ in range(100):
+            _edit(plan, rnd)
+    assert encode_snapshot(replay(path)) == encode_snapshot(plan)
+    assert encode_snapshot(replay(memory)) == encode_snapshot(plan)
+
+
+def test_undo_and_redo_round_trip():
+    rnd = random.Random(6)
+    plan = _plan(rnd)
+    journal = Journal(plan)
+    states = [_state(plan)]
+    for step in range(60):
+        if step % 10 == 0:
+            with journal.group():
+                _edit(plan, rnd)
+                _edit(plan, rnd)
+        else:
+            _edit(plan, rnd)
+        if _state(plan) != states[-1]:
+            states.append(_state(plan))
+    # every state is passed again on the way back, and on the way forward
+    undone = [states[-1]]
+    while journal.undo():
+        if _state(plan) != undone[-1]:
+            undone.append(_state(plan))
+    assert undone == states[::-1]
+    redone = [states[0]]
+    while journal.redo():
+        if _state(plan) != redone[-1]:
+            redone.append(_state(plan))
+    assert redone == states
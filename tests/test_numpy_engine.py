@@ -0,0 +1,35 @@
+from datetime import date
+
+import pytest
+
+from notjira.bench import generate
+from notjira.columnar import ColumnarPlan
+from notjira.numpy_engine import schedule_numpy
+from notjira.toposort import CycleError
+
+pytest.importorskip('numpy')
+
+START = date(2024, 1, 1)
+
+
+def _dates(result):
+    return {x.id: (s, e) for x, s, e in result}
+
+
+@pytest.mark.parametrize('shape', ['dag', 'chain', 'fanout', 'epics'])
+def test_numpy_dates_match_the_scheduler(shape):
+    plan = generate(shape, 2000, seed=4)
+    expected = _dates(plan.scheduler().run(START))
+    columns = ColumnarPlan.from_plan(plan)
+    assert _dates(schedule_numpy(plan, START)) == expected
+    assert _dates(schedule_numpy(columns, START)) == expected
+
+
+def test_numpy_reports_a_cycle():
+    plan = generate('dag', 200, seed=4)
+    a, b = plan.items()[150], plan.items()[151]
+    plan.add_dependency(a.id, b.id, check_cycle=False)
+    plan.add_dependency(b.id, a.id, check_cycle=False)
+    with pytest.raises(CycleError) as caught:
+        schedule_numpy(plan, START)
+    assert sorted(caught.value.cycle) == sorted([a.id, b.id])
@@ -0,0 +1,46 @@
+import random
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.parallel import components, schedule_parallel
+from notjira.task import Task
+from notjira.toposort import CycleError
+
+START = date(2024, 1, 1)
+
+
+def _plan(n=400, seed=3):
+    rnd = random.Random(seed)
+    plan = Plan(make_default=False)
+    tasks = []
+    for i in range(n):
+        # dependencies only within blocks of 40, so there are many components
+        block = tasks[i - i % 40:]
+        deps = rnd.sample(block, min(len(block), rnd.randint(0, 2)))
+        estimate = rnd.choice([None, '1h', '8h', '9h', '3d', '2w'])
+        tasks.append(Task(f't{i}', e=estimate, d=deps or None, plan=plan))
+    # a dependency on an id outside the plan is ignored
+    plan.add_dependency(tasks[5].id, 10 ** 6)
+    return plan
+
+
+def test_parallel_dates_match_the_scheduler():
+    plan = _plan()
+    expected = {x.id: (s, e) for x, s, e in plan.scheduler().run(START)}
+    result = schedule_parallel(plan, START, workers=2)
+    assert [x.id for x, _, _ in result] == [x.id for x in plan.items()]
+    assert {x.id: (s, e) for x, s, e in result} == expected
+    assert {x.id: (x.start_date, x.end_date) for x in plan.items()} == expected
+    assert len(components(plan)) >= 10
+
+
+def test_a_cycle_is_reported_with_item_ids():
+    plan = _plan(n=80)
+    a, b = plan.get_item(41), plan.get_item(42)
+    plan.add_dependency(a.id, b.id, check_cycle=False)
+    plan.add_dependency(b.id, a.id, check_cycle=False)
+    with pytest.raises(CycleError) as caught:
+        schedule_parallel(plan, START, workers=2)
+    assert sorted(caught.value.cycle) == [a.id, b.id]
@@ -0,0 +1,85 @@
+import random
+from datetime import date, timedelta
+
+from notjira.base import BaseStatus
+from notjira.context import Plan
+from notjira.query import name_tokens
+from notjira.task import Task
+from notjira.utils import schedule
+
+START = date(2024, 1, 1)
+WORDS = ['deploy', 'api', 'docs', 'design', 'db', 'fix']
+ESTIMATES = ['1h', '8h', '2d', '1w']
+
+
+def _due(rnd):
+    return None if rnd.random() < 0.3 else START + timedelta(days=rnd.randrange(60))
+
+
+def _name(rnd):
+    return '-'.join(rnd.sample(WORDS, rnd.randint(1, 3)))
+
+
+def _brute_force(plan, status=None, name=None, due_before=None, due_after=None, overlaps=None):
+    ids = set()
+    for item in plan.items():
+        if status is not None and item.status not in status:
+            continue
+        words = name_tokens(item.name)
+        if name is not None and not all(any(w.startswith(p) for w in words) for p in name_tokens(name)):
+            continue
+        due = item.due_date
+        if (due_before is not None or due_after is not None) and (
+                due is None or (due_before and due >= due_before) or (due_after and due <= due_after)):
+            continue
+        if overlaps is not None and (item.start_date is None or item.start_date > overlaps[1]
+                                     or item.end_date < overlaps[0]):
+            continue
+        ids.add(item.id)
+    return ids
+
+
+def _random_query(rnd):
+    query = {}
+    if rnd.random() < 0.4:
+        query['status'] = set(rnd.sample(list(BaseStatus), rnd.randint(1, 2)))
+    if rnd.random() < 0.4:
+        query['name'] = rnd.choice(WORDS)[:rnd.randint(1, 4)]
+    if rnd.random() < 0.3:
+        query['due_before'] = START + timedelta(days=rnd.randrange(60))
+    if rnd.random() < 0.3:
+        query['due_after'] = START + timedelta(days=rnd.randrange(60))
+    if rnd.random() < 0.4:
+        first = START + timedelta(days=rnd.randrange(30))
+        query['overlaps'] = (first, first + timedelta(days=rnd.randrange(10)))
+    return query
+
+
+def test_indexed_queries_match_a_scan_after_edits():
+    rnd = random.Random(11)
+    plan = Plan(make_default=False)
+    tasks = []
+    for _ in range(150):
+        deps = rnd.sample(tasks, min(len(tasks), rnd.randint(0, 1)))
+        tasks.append(Task(_name(rnd), e=rnd.choice(ESTIMATES), d=deps or None, due_date=_due(rnd), plan=plan))
+    schedule(plan, START)
+    for step in range(150):
+        items = plan.items()
+        item = rnd.choice(items)
+        action = rnd.randrange(6)
+        if action == 0:
+            item.status = rnd.choice(list(BaseStatus))
+        elif action == 1:
+            item.name = _name(rnd)
+        elif action == 2:
+            item.due_date = _due(rnd)
+        elif action == 3:
+            Task(_name(rnd), e=rnd.choice(ESTIMATES), due_date=_due(rnd), plan=plan)
+        elif action == 4 and not plan.dependents(item.id):
+            plan.deregister_item(item.id)
+        else:
+            item.estimate = rnd.choice(ESTIMATES)
+            schedule(plan, START)
+        for _ in range(3):
+            query = _random_query(rnd)
+            assert {x.id for x in plan.query(**query)} == _brute_force(plan, **query), (step, query)
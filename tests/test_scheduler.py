@@ -0,0 +1,50 @@
+import random
+from datetime import date
+
+from notjira.context import Plan
+from notjira.scheduler import Scheduler
+from notjira.task import Task
+
+START = date(2024, 1, 1)
+ESTIMATES = [None, '1h', '8h', '9h', '2d', '1w']
+
+
+def _dates(result):
+    return {x.id: (s, e) for x, s, e in result}
+
+
+def _edit(plan, rnd):
+    items = plan.items()
+    item = rnd.choice(items)
+    action = rnd.randrange(5)
+    if action == 0:
+        item.estimate = rnd.choice(ESTIMATES)
+    elif action == 1:
+        dep = rnd.choice(items)
+        if dep is not item and not plan.creates_cycle(item.id, dep.id):
+            plan.add_dependency(item.id, dep.id)
+    elif action == 2 and item.depends:
+        plan.remove_dependency(item.id, rnd.choice(sorted(item.depends)))
+    elif action == 3:
+        deps = rnd.sample(items, min(2, len(items)))
+        Task(f'new {len(items)}', e=rnd.choice(ESTIMATES), d=deps, plan=plan)
+    elif len(items) > 10:
+        plan.deregister_item(item.id)
+
+
+def test_incremental_updates_match_a_fresh_run():
+    rnd = random.Random(7)
+    plan = Plan(make_default=False)
+    tasks = []
+    for i in range(60):
+        deps = rnd.sample(tasks, min(len(tasks), rnd.randint(0, 2)))
+        tasks.append(Task(f't{i}', e=rnd.choice(ESTIMATES), d=deps or None, plan=plan))
+    scheduler = plan.scheduler()
+    scheduler.update(START)
+    for _ in range(200):
+        for _ in range(rnd.randint(1, 3)):
+            _edit(plan, rnd)
+        incremental = _dates(scheduler.run(START))
+        fresh = Scheduler(plan)
+        assert incremental == _dates(fresh.run(START))
+        plan.remove_listener(fresh._on_change)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.server import PlanService, RequestError, route
+from notjira.task import Task
+
+START = date(2024, 1, 1)
+
+
+def _service():
+    plan = Plan(make_default=False)
+    a = Task('a', e='1d', plan=plan)
+    b = Task('b', e='2d', d=a, plan=plan)
+    return PlanService(plan, start_date=START, batch_delay=0.01), a, b
+
+
+def _run(service, *coroutines):
+    async def main():
+        try:
+            return await asyncio.gather(*coroutines, return_exceptions=True)
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+def test_a_failing_request_is_rolled_back_and_the_batch_applies():
+    service, a, b = _service()
+    before = service.plan.version
+    bad = [['set', a.id, 'name', 'a', 'renamed'],
+           ['set', a.id, 'estimate', 8.0, 40.0],
+           ['remove_dependency', b.id, a.id],
+           ['set', 999, 'name', 'x', 'y']]
+    good = [['set', b.id, 'name', 'b', 'B']]
+    failed, version = _run(service, service.mutate(bad), service.mutate(good))
+    assert isinstance(failed, RequestError)
+    assert (a.name, a.estimate.hours, b.depends) == ('a', 8.0, {a.id})
+    assert b.name == 'B'
+    assert version > before
+
+
+def test_a_failing_clear_is_rolled_back():
+    service, a, b = _service()
+    failed, = _run(service, service.mutate([['clear', True], ['deregister', a.id, None, None]]))
+    assert isinstance(failed, RequestError)
+    plan = service.plan
+    assert sorted(x.name for x in plan.items()) == ['a', 'b']
+    assert plan.get_item(b.id).depends == {a.id}
+
+
+@pytest.mark.parametrize('body', [b'{"ops": 3}', b'{"ops": [5]}', b'{"ops": [[]]}', b'[]'])
+def test_malformed_mutations_are_bad_requests(body):
+    service, _, _ = _service()
+    (status, _, payload), = _run(service, route(service, 'POST', '/mutations', body))
+    assert status == 400
+    assert 'error' in json.loads(payload)
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.leveling import level
+from notjira.task import Epic, Task
+from notjira.time_estimate import LogNormalEstimate, PertEstimate, TimeEstimate
+
+START = date(2024, 1, 1)
+
+
+def _plan():
+    plan = Plan(make_default=False)
+    a = Task('a', e='2d', assignee='ann', plan=plan)
+    b = Task('b', e='1d', assignee='ann', plan=plan)
+    c = Task('c', e='3d', assignee='bob', d=a, plan=plan)
+    d = Task('d', e='1d', plan=plan)
+    Epic('epic', tasks=[a, b, c, d], chain=False, plan=plan)
+    return plan
+
+
+def _dates(result):
+    return {x.id: (s, e) for x, s, e in result}
+
+
+def test_assignees_survive_a_round_trip(tmp_path):
+    plan = _plan()
+    path = tmp_path / 'plan.njp'
+    plan.save(path)
+    loaded = Plan.load(path, make_default=False)
+    assert ({x.id: getattr(x, 'assignee', None) for x in loaded.items()}
+            == {x.id: getattr(x, 'assignee', None) for x in plan.items()})
+    # ann works on a and b one after the other on both plans
+    assert _dates(level(loaded, START)) == _dates(level(plan, START))
+
+
+def test_a_mapped_plan_reads_past_the_assignee_sections(tmp_path):
+    plan = _plan()
+    path = tmp_path / 'plan.njp'
+    plan.save(path)
+    mapped = Plan.load(path, mmap=True)
+    assert [x.name for x in mapped.items()] == [x.name for x in sorted(plan.items(), key=lambda x: x.id)]
+    assert [x.status for x in mapped.items()] == [x.status for x in plan.items()]
+
+
+def test_estimate_spreads_survive_a_round_trip(tmp_path):
+    plan = Plan(make_default=False)
+    a = Task('a', e=TimeEstimate.pert('1d', '2d', '2w'), plan=plan)
+    b = Task('b', e=TimeEstimate.lognormal('1d', '3w'), d=a, plan=plan)
+    Task('c', e='1d', d=b, plan=plan)
+    path = tmp_path / 'plan.njp'
+    plan.save(path)
+    loaded = Plan.load(path, make_default=False)
+    pert, lognormal, fixed = (loaded.get_item(x.id).estimate for x in sorted(plan.items(), key=lambda x: x.id))
+    assert isinstance(pert, PertEstimate)
+    assert (pert.low, pert.likely, pert.high, pert.hours) == (a.estimate.low, a.estimate.likely,
+                                                               a.estimate.high, a.estimate.hours)
+    assert isinstance(lognormal, LogNormalEstimate)
+    assert (lognormal.mu, lognormal.sigma, lognormal.hours) == (b.estimate.mu, b.estimate.sigma, b.estimate.hours)
+    assert type(fixed) is TimeEstimate
+    mapped = Plan.load(path, mmap=True)
+    assert [x.estimate.hours for x in mapped.items()] == [pert.hours, lognormal.hours, fixed.hours]
+    pytest.importorskip('numpy')
+    from notjira.forecast import forecast
+    spread = forecast(loaded, START, samples=2000, seed=1)
+    assert spread.finish[0] < spread.finish[-1]
+    assert spread.finish == forecast(plan, START, samples=2000, seed=1).finish
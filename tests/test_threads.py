@@ -0,0 +1,73 @@
+import random
+import sys
+import threading
+from datetime import date
+
+import pytest
+
+from notjira.context import Plan
+from notjira.task import Epic, Task
+from notjira.time_estimate import TimeEstimate
+from notjira.utils import schedule
+
+
+@pytest.fixture
+def fast_switching():
+    # switch threads as often as possible to expose races
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _run(*targets):
+    threads = [threading.Thread(target=t) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_concurrent_estimate_changes_keep_epic_rollups_exact(fast_switching):
+    plan = Plan(make_default=False)
+    tasks = [Task(f't{i}', e='1h', plan=plan) for i in range(8)]
+    inner = Epic('inner', tasks=tasks[4:], chain=False, plan=plan)
+    outer = Epic('outer', tasks=tasks[:4] + [inner], chain=False, plan=plan)
+    stop = threading.Event()
+
+    def edit(seed):
+        rnd = random.Random(seed)
+        for _ in range(2000):
+            # two threads per task, so edits of one task race too
+            rnd.choice(tasks).estimate = TimeEstimate(rnd.randint(0, 16))
+
+    def reschedule():
+        while not stop.is_set():
+            schedule(plan, date(2024, 1, 1))
+
+    scheduler = threading.Thread(target=reschedule)
+    scheduler.start()
+    try:
+        _run(*[lambda seed=seed: edit(seed) for seed in range(16)])
+    finally:
+        stop.set()
+        scheduler.join()
+    assert inner.estimate.hours == sum(t.estimate.hours for t in tasks[4:])
+    assert outer.estimate.hours == sum(t.estimate.hours for t in tasks)
+    # the incremental schedule agrees with one computed from scratch
+    incremental = {x.id: (s, e) for x, s, e in schedule(plan, date(2024, 1, 1))}
+    plan.scheduler().invalidate()
+    assert {x.id: (s, e) for x, s, e in schedule(plan, date(2024, 1, 1))} == incremental
+
+
+def test_concurrent_epic_appends_sum_every_task(fast_switching):
+    plan = Plan(make_default=False)
+    epic = Epic('epic', plan=plan)
+
+    def add(i):
+        for j in range(200):
+            epic + Task(f't{i}-{j}', e='1h', plan=plan)
+
+    _run(*[lambda i=i: add(i) for i in range(8)])
+    assert len(epic.tasks) == 1600
+    assert epic.estimate.hours == 1600
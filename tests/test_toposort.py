@@ -0,0 +1,33 @@
+import pytest
+
+from notjira.context import Plan
+from notjira.task import Task
+from notjira.toposort import CycleError, topological_sort
+
+
+def test_a_dependents_index_missing_edges_is_reported():
+    plan = Plan(make_default=False)
+    a = Task('a', plan=plan)
+    b = Task('b', d=a, plan=plan)
+    with pytest.raises(RuntimeError, match='never released'):
+        topological_sort([a, b], dependents=lambda item_id: ())
+
+
+@pytest.mark.parametrize('priority', [None, 'id', 'due_date'])
+@pytest.mark.parametrize('use_index', [False, True])
+def test_cycle_error_lists_the_cycle_in_dependency_order(priority, use_index):
+    plan = Plan(make_default=False)
+    root = Task('root', plan=plan)
+    a = Task('a', d=root, plan=plan)
+    b = Task('b', d=a, plan=plan)
+    c = Task('c', d=b, plan=plan)
+    Task('after', d=c, plan=plan)
+    plan.add_dependency(a.id, c.id, check_cycle=False)
+    dependents = plan.dependents if use_index else None
+    with pytest.raises(CycleError) as caught:
+        topological_sort(plan.items(), priority, dependents)
+    cycle = caught.value.cycle
+    assert sorted(cycle) == sorted([a.id, b.id, c.id])
+    for item_id, next_id in zip(cycle, cycle[1:] + cycle[:1]):
+        assert next_id in plan.get_item(item_id).depends
+    assert str(caught.value).endswith(f"{cycle[0]}")
@@ -0,0 +1,36 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from notjira.work_calendar import WorkCalendar
+
+ORIGIN = date(2023, 12, 1)
+
+
+def _calendar(seed):
+    rnd = random.Random(seed)
+    workdays = rnd.sample(range(7), rnd.randint(1, 7))
+    holidays = [ORIGIN + timedelta(days=rnd.randrange(120)) for _ in range(rnd.randint(0, 40))]
+    return WorkCalendar(workdays, holidays), set(holidays)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_calendar_matches_walking_day_by_day(seed):
+    calendar, holidays = _calendar(seed)
+    days = [ORIGIN + timedelta(days=i) for i in range(140)]
+    worked = [d for d in days if d.weekday() in calendar.workdays and d not in holidays]
+    for d in days:
+        assert calendar.is_working_day(d) == (d in worked)
+        before = [w for w in worked if w < d]
+        assert calendar.index(d) - calendar.index(ORIGIN) == len(before)
+        later = [w for w in worked if w >= d]
+        if later:
+            assert calendar.next_working_day(d) == later[0]
+        after = [w for w in worked if w > d]
+        assert calendar.add_working_days(d, 0) == d
+        for count in range(1, min(4, len(after)) + 1):
+            assert calendar.add_working_days(d, count) == after[count - 1]
+    for w in worked:
+        assert calendar.from_index(calendar.index(w)) == w
+    assert calendar.working_days_between(days[10], days[100]) == len([w for w in worked if days[10] <= w <= days[100]])